@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Submit ComfyUI jobs grouped by the models they load, within a fairness window"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from ltx2_quota import model_names
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_SERVER = "http://127.0.0.1:8188"
+# How many later jobs may run ahead of any one job
+DEFAULT_WINDOW = 8
+# Prompts kept in ComfyUI's own queue; the rest wait here where they can still be regrouped
+DEFAULT_INFLIGHT = 2
+POLL_INTERVAL = 0.5
+HTTP_TIMEOUT = 10
+
+# Nodes whose output is a set of weights held in VRAM/RAM between prompts
+LOADER_CLASS = re.compile(r"Load(er|Model)|Checkpoint|LoraSelect|Lora Loader")
+# Widget values that do not change what gets loaded, by exact name: text_encoder and the like select weights
+FREE_INPUT = re.compile(r"text(_[gl])?|prompt|seed|noise_seed", re.IGNORECASE)
+LORA_SLOT = re.compile(r"^lora_(\d+)$")
+
+
+def _is_link(value) -> bool:
+    return isinstance(value, list) and len(value) == 2 and isinstance(value[0], str)
+
+
+def _unused_loras(inputs: dict) -> set:
+    """Keys of empty LoRA stack slots and switched-off Power Lora entries, which load nothing"""
+    unused = set()
+    for key, value in inputs.items():
+        match = LORA_SLOT.match(key)
+        if not match:
+            continue
+        if value == "None":
+            unused |= {key, f"strength_{match.group(1)}"}
+        elif isinstance(value, dict) and not value.get("on", True):
+            unused.add(key)
+    return unused
+
+
+def loader_nodes(graph: dict) -> List[Tuple[str, dict]]:
+    """(class_type, literal inputs) of every node that loads weights"""
+    found = []
+    for node in graph.values():
+        if not isinstance(node, dict):
+            continue
+        class_type = node.get("class_type", "")
+        inputs = node.get("inputs", {})
+        unused = _unused_loras(inputs)
+        literal = {k: v for k, v in inputs.items()
+                   if not _is_link(v) and not FREE_INPUT.fullmatch(k) and k not in unused}
+        # Model-name widgets catch loaders from node packs with unusual class names
+        if LOADER_CLASS.search(class_type) or (model_names(literal) and "Download" not in class_type):
+            found.append((class_type, literal))
+    return sorted(found, key=lambda item: json.dumps(item, sort_keys=True))
+
+
+def fingerprint(graph: dict) -> str:
+    """Same value for two prompts exactly when ComfyUI can keep its loaded weights between them
+
+    Covers checkpoint, UNet, VAE and text encoder loaders and the LoRA stack
+    with strengths, since a changed strength re-patches the model too.
+    """
+    data = json.dumps(loader_nodes(graph), sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+class Job:
+    """One API-format prompt waiting to be submitted"""
+
+    def __init__(self, prompt: dict, job_id: str = "", client_id: str = ""):
+        self.prompt = prompt
+        self.id = job_id or uuid.uuid4().hex[:8]
+        self.client_id = client_id or "comfy-batch"
+        self.fingerprint = fingerprint(prompt)
+        self.models = sorted(model_names([literal for _, literal in loader_nodes(prompt)]))
+        self.overtaken = 0
+        self.prompt_id = ""
+        self.error = ""
+
+
+class BatchQueue:
+    """Jobs in arrival order, handed out so that equal loader fingerprints run back to back
+
+    next() prefers the oldest job that reuses the weights loaded by the
+    previous one, looking at most window jobs ahead. A job that has been
+    overtaken window times is handed out next regardless, so nothing waits
+    behind a long run of another model forever.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, loaded: str = ""):
+        self.window = window
+        self.loaded = loaded
+        self.pending: List[Job] = []
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def add(self, job: Job):
+        self.pending.append(job)
+
+    def next(self) -> Job:
+        pick = 0
+        for i, job in enumerate(self.pending[:self.window + 1]):
+            if job.fingerprint == self.loaded:
+                pick = i
+                break
+            if job.overtaken >= self.window:
+                # Cannot be skipped again; neither can anything behind it jump the line
+                pick = i
+                break
+        for job in self.pending[:pick]:
+            job.overtaken += 1
+        job = self.pending.pop(pick)
+        self.loaded = job.fingerprint
+        return job
+
+
+def batch_order(jobs: Iterable[Job], window: int = DEFAULT_WINDOW, loaded: str = "") -> List[Job]:
+    """The order a BatchQueue would submit these jobs in"""
+    queue = BatchQueue(window, loaded)
+    for job in jobs:
+        queue.add(job)
+    return [queue.next() for _ in range(len(queue))]
+
+
+def reloads(jobs: Iterable[Job], loaded: str = "") -> int:
+    """How many times the loaded weights change when jobs run in this order"""
+    count = 0
+    for job in jobs:
+        if job.fingerprint != loaded:
+            count += 1
+            loaded = job.fingerprint
+    return count
+
+
+class SubmitError(Exception):
+    pass
+
+
+def _request(server: str, path: str, body: Optional[dict] = None) -> dict:
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(server.rstrip("/") + path, data=data,
+                                 headers={"Content-Type": "application/json"} if data else {})
+    try:
+        with urllib.request.urlopen(req, timeout=HTTP_TIMEOUT) as resp:
+            return json.loads(resp.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        # ComfyUI explains a rejected prompt (node_errors) in the body
+        raise SubmitError(f"{path}: HTTP {e.code}: {e.read().decode('utf-8', 'replace')[:500]}")
+    except (OSError, ValueError) as e:
+        raise SubmitError(f"{path}: {e}")
+
+
+def queue_depth(server: str) -> int:
+    """Prompts running or waiting in ComfyUI's own queue"""
+    queue = _request(server, "/queue")
+    return len(queue.get("queue_running", [])) + len(queue.get("queue_pending", []))
+
+
+def submit(server: str, job: Job) -> str:
+    """POST one job to /prompt; returns the prompt_id"""
+    result = _request(server, "/prompt", {"prompt": job.prompt, "client_id": job.client_id})
+    if "prompt_id" not in result:
+        raise SubmitError(f"/prompt: no prompt_id in {result}")
+    return result["prompt_id"]
+
+
+def dispatch(server: str, queue: BatchQueue, inflight: int = DEFAULT_INFLIGHT,
+             poll: float = POLL_INTERVAL, log: Callable[[str], None] = print) -> List[Job]:
+    """Feed ComfyUI from queue, keeping at most inflight prompts in its own queue
+
+    Holding jobs back here instead of queueing them all at once is what lets
+    jobs that arrive later still be grouped with the models already loaded.
+    Returns the jobs in submission order with prompt_id or error set.
+    """
+    done = []
+    while queue:
+        while queue_depth(server) >= inflight:
+            time.sleep(poll)
+        job = queue.next()
+        try:
+            job.prompt_id = submit(server, job)
+            log(f"[SUBMIT] {job.id} models={job.fingerprint[:8]} prompt_id={job.prompt_id}")
+        except SubmitError as e:
+            job.error = str(e)
+            log(f"[FAIL] {job.id}: {job.error}")
+        done.append(job)
+    return done
+
+
+def _workflow_path(name: str, base: Path) -> Path:
+    """A workflow path relative to the jobs file, or a bundled workflow by name"""
+    for candidate in (base / name, SCRIPT_DIR / name, SCRIPT_DIR / f"{name}.json"):
+        if candidate.is_file():
+            return candidate
+    raise FileNotFoundError(f"workflow not found: {name}")
+
+
+def load_jobs(path: Path) -> List[Job]:
+    """Jobs from a JSON-lines file: {"id", "client_id", and "prompt" (a graph) or "workflow" (a path or name)}"""
+    jobs = []
+    base = path.parent
+    for n, line in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        prompt = item.get("prompt")
+        if prompt is None:
+            prompt = json.loads(_workflow_path(item["workflow"], base).read_text(encoding="utf-8"))
+        jobs.append(Job(prompt, str(item.get("id", n)), item.get("client_id", "")))
+    return jobs
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Submit ComfyUI prompts grouped by the models they load")
+    parser.add_argument("jobs", type=Path, help="JSON-lines file of jobs")
+    parser.add_argument("--server", default=DEFAULT_SERVER)
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help="how many later jobs may run ahead of any one job (0 keeps arrival order)")
+    parser.add_argument("--inflight", type=int, default=DEFAULT_INFLIGHT,
+                        help="prompts to keep queued inside ComfyUI")
+    parser.add_argument("--dry-run", action="store_true", help="print the order and reload count only")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = load_jobs(args.jobs)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[X] {args.jobs}: {e}", file=sys.stderr)
+        return 2
+    ordered = batch_order(jobs, args.window)
+    print(f"{len(jobs)} jobs, {reloads(jobs)} model loads in arrival order, {reloads(ordered)} batched")
+    if args.dry_run:
+        for job in ordered:
+            print(f"  {job.id}  {job.fingerprint[:8]}  {', '.join(job.models)}")
+        return 0
+
+    queue = BatchQueue(args.window)
+    for job in jobs:
+        queue.add(job)
+    try:
+        done = dispatch(args.server, queue, args.inflight)
+    except SubmitError as e:
+        print(f"[X] {args.server}: {e}", file=sys.stderr)
+        return 1
+    return 1 if any(job.error for job in done) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""Asyncio ComfyUI client: one /ws subscription, per-prompt futures and step progress"""
+
+import argparse
+import asyncio
+import json
+import sys
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+DEFAULT_SERVER = "http://127.0.0.1:8188"
+CONNECTION_LIMIT = 16
+HTTP_TIMEOUT = 30
+# Per request, so the long-lived websocket on the same session is not cut off
+TIMEOUT = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+RECONNECT_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+# Events for prompt_ids we have not registered yet (the /prompt reply is still in flight)
+EARLY_EVENT_LIMIT = 1000
+
+
+class ComfyError(Exception):
+    pass
+
+
+class Update:
+    """One change in a prompt's state, as yielded by ComfyClient.updates()"""
+
+    def __init__(self, event: str, node: Optional[str] = None, value: int = 0, max: int = 0,
+                 fraction: float = 0.0):
+        self.event = event
+        self.node = node
+        self.value = value
+        self.max = max
+        self.fraction = fraction
+
+    def as_dict(self) -> dict:
+        return {"event": self.event, "node": self.node, "value": self.value, "max": self.max,
+                "fraction": round(self.fraction, 4)}
+
+
+class PromptState:
+    """What the websocket has told us about one prompt so far"""
+
+    def __init__(self, prompt_id: str, nodes: int):
+        self.prompt_id = prompt_id
+        self.nodes = max(nodes, 1)
+        self.status = "queued"
+        # Set once _finish is under way; both execution_success and executing(None) mean done
+        self.finishing = False
+        self.node: Optional[str] = None
+        self.value = 0
+        self.max = 0
+        self.finished_nodes: set = set()
+        self.outputs: Dict[str, dict] = {}
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.listeners: List[asyncio.Queue] = []
+
+    @property
+    def fraction(self) -> float:
+        """Share of the graph done: finished nodes plus the current node's step progress"""
+        if self.status == "done":
+            return 1.0
+        step = self.value / self.max if self.max else 0.0
+        return min((len(self.finished_nodes) + step) / self.nodes, 0.999)
+
+    def publish(self, event: str):
+        update = Update(event, self.node, self.value, self.max, self.fraction)
+        for queue in self.listeners:
+            queue.put_nowait(update)
+
+
+class ComfyClient:
+    """Pooled HTTP plus a single websocket to one ComfyUI server
+
+    Submit with submit() or run(); await wait() for the outputs, or iterate
+    updates() for real step progress. /history is only fetched once a prompt
+    has finished, to read its outputs. Use as "async with ComfyClient(...)".
+    """
+
+    def __init__(self, server: str = DEFAULT_SERVER, client_id: str = "",
+                 session: Optional[aiohttp.ClientSession] = None):
+        self.server = server.rstrip("/")
+        self.client_id = client_id or uuid.uuid4().hex
+        self.session = session
+        self.own_session = session is None
+        self.prompts: Dict[str, PromptState] = {}
+        self.early: Dict[str, List[dict]] = {}
+        self.queue_remaining = 0
+        self.connected = asyncio.Event()
+        self.listener: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "ComfyClient":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def start(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=CONNECTION_LIMIT))
+        self.listener = asyncio.create_task(self._listen())
+        await self.connected.wait()
+
+    async def close(self):
+        if self.listener:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except asyncio.CancelledError:
+                pass
+        for state in self.prompts.values():
+            if not state.future.done():
+                state.future.set_exception(ComfyError("client closed"))
+        if self.own_session and self.session:
+            await self.session.close()
+
+    async def _json(self, method: str, path: str, **kwargs):
+        async with self.session.request(method, self.server + path, timeout=TIMEOUT, **kwargs) as resp:
+            if resp.status >= 400:
+                # A rejected prompt carries node_errors in the body
+                raise ComfyError(f"{path}: HTTP {resp.status}: {(await resp.text())[:500]}")
+            return await resp.json(content_type=None)
+
+    async def submit(self, prompt: dict) -> str:
+        """Queue an API-format prompt; returns its prompt_id"""
+        result = await self._json("POST", "/prompt", json={"prompt": prompt, "client_id": self.client_id})
+        prompt_id = result.get("prompt_id")
+        if not prompt_id:
+            raise ComfyError(f"/prompt: no prompt_id in {result}")
+        self.prompts[prompt_id] = PromptState(prompt_id, len(prompt))
+        for message in self.early.pop(prompt_id, []):
+            self._handle(message)
+        return prompt_id
+
+    async def history(self, prompt_id: str) -> Optional[dict]:
+        data = await self._json("GET", f"/history/{prompt_id}")
+        return data.get(prompt_id)
+
+    async def view(self, filename: str, subfolder: str = "", type: str = "output") -> bytes:
+        params = {"filename": filename, "subfolder": subfolder, "type": type}
+        async with self.session.get(self.server + "/view", params=params, timeout=TIMEOUT) as resp:
+            if resp.status >= 400:
+                raise ComfyError(f"/view {filename}: HTTP {resp.status}")
+            return await resp.read()
+
+    async def wait(self, prompt_id: str, timeout: Optional[float] = None) -> Dict[str, dict]:
+        """Outputs of a submitted prompt by node id, once it has finished"""
+        return await asyncio.wait_for(asyncio.shield(self.prompts[prompt_id].future), timeout)
+
+    async def run(self, prompt: dict, timeout: Optional[float] = None) -> Dict[str, dict]:
+        return await self.wait(await self.submit(prompt), timeout)
+
+    async def updates(self, prompt_id: str) -> AsyncIterator[Update]:
+        """Every state change of a prompt until it finishes or fails"""
+        state = self.prompts[prompt_id]
+        queue: asyncio.Queue = asyncio.Queue()
+        state.listeners.append(queue)
+        try:
+            yield Update(state.status, state.node, state.value, state.max, state.fraction)
+            while not state.future.done() or not queue.empty():
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, state.future}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield getter.result()
+                else:
+                    getter.cancel()
+        finally:
+            state.listeners.remove(queue)
+        if state.future.exception():
+            raise state.future.exception()
+
+    async def _listen(self):
+        delay = RECONNECT_DELAY
+        url = self.server.replace("http", "ws", 1) + f"/ws?clientId={self.client_id}"
+        while True:
+            try:
+                async with self.session.ws_connect(url, heartbeat=30) as ws:
+                    delay = RECONNECT_DELAY
+                    if self.connected.is_set():
+                        # Anything that finished while we were away has no events left to send
+                        await self._resync()
+                    self.connected.set()
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self._handle(json.loads(msg.data))
+                        elif msg.type == aiohttp.WSMsgType.ERROR:
+                            break
+                        # BINARY messages are latent previews; nothing to do with them
+            except asyncio.CancelledError:
+                raise
+            except (aiohttp.ClientError, OSError, asyncio.TimeoutError, ValueError):
+                pass
+            self.connected.set()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    async def _resync(self):
+        for state in list(self.prompts.values()):
+            if state.future.done():
+                continue
+            try:
+                entry = await self.history(state.prompt_id)
+            except (ComfyError, aiohttp.ClientError, asyncio.TimeoutError):
+                continue
+            if entry and not state.finishing:
+                state.status = "done"
+                state.finishing = True
+                await self._finish(state, entry)
+
+    def _handle(self, message: dict):
+        kind = message.get("type")
+        data = message.get("data") or {}
+        if kind == "status":
+            self.queue_remaining = data.get("status", {}).get("exec_info", {}).get("queue_remaining", 0)
+            return
+        prompt_id = data.get("prompt_id")
+        if not prompt_id:
+            return
+        state = self.prompts.get(prompt_id)
+        if state is None:
+            if len(self.early) < EARLY_EVENT_LIMIT:
+                self.early.setdefault(prompt_id, []).append(message)
+            return
+        if state.future.done():
+            return
+
+        if kind == "execution_start":
+            state.status = "running"
+        elif kind == "execution_cached":
+            state.finished_nodes.update(data.get("nodes", []))
+        elif kind == "executing":
+            if state.node is not None:
+                state.finished_nodes.add(state.node)
+            state.node = data.get("node")
+            state.value = state.max = 0
+            if state.node is None:
+                # executing with node None is how ComfyUI says the prompt is done
+                state.status = "done"
+        elif kind == "progress":
+            state.value, state.max = data.get("value", 0), data.get("max", 0)
+        elif kind == "executed":
+            state.outputs[str(data.get("node"))] = data.get("output") or {}
+        elif kind == "execution_success":
+            state.status = "done"
+        elif kind in ("execution_error", "execution_interrupted"):
+            state.status = "error"
+            detail = data.get("exception_message") or kind.replace("execution_", "")
+            state.publish(kind)
+            state.future.set_exception(ComfyError(f"node {data.get('node_id')} ({data.get('node_type')}): {detail}"))
+            return
+        else:
+            return
+
+        state.publish(kind)
+        if state.status == "done" and not state.finishing:
+            state.finishing = True
+            asyncio.ensure_future(self._finish(state))
+
+    async def _finish(self, state: PromptState, entry: Optional[dict] = None):
+        """Resolve a finished prompt with its outputs, read once from /history"""
+        if state.future.done():
+            return
+        try:
+            entry = entry or await self.history(state.prompt_id)
+        except (ComfyError, aiohttp.ClientError, asyncio.TimeoutError):
+            entry = None
+        outputs = dict(state.outputs)
+        if entry:
+            outputs.update(entry.get("outputs", {}))
+        if not state.future.done():
+            state.future.set_result(outputs)
+        state.publish("done")
+
+
+def output_files(outputs: Dict[str, dict]) -> List[dict]:
+    """{filename, subfolder, type} for every image, video or audio in a prompt's outputs"""
+    files = []
+    for node_output in outputs.values():
+        for key in ("images", "gifs", "videos", "audio"):
+            for item in node_output.get(key, []) or []:
+                if isinstance(item, dict) and "filename" in item:
+                    files.append(item)
+    return files
+
+
+async def _main(args) -> int:
+    prompt = json.loads(args.workflow.read_text(encoding="utf-8"))
+    async with ComfyClient(args.server) as client:
+        prompt_id = await client.submit(prompt)
+        print(f"[QUEUED] {prompt_id}", file=sys.stderr)
+        try:
+            async for update in client.updates(prompt_id):
+                if args.json:
+                    print(json.dumps({"prompt_id": prompt_id, **update.as_dict()}), flush=True)
+                else:
+                    step = f" {update.value}/{update.max}" if update.max else ""
+                    print(f"[{update.fraction:6.1%}] {update.event} node={update.node}{step}", file=sys.stderr)
+        except ComfyError as e:
+            print(f"[FAIL] {prompt_id}: {e}", file=sys.stderr)
+            return 1
+        outputs = await client.wait(prompt_id)
+    for item in output_files(outputs):
+        print(f"[DONE] {item.get('subfolder', '')}/{item['filename']}".replace("//", "/"), file=sys.stderr)
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Run one API-format workflow and follow its progress")
+    parser.add_argument("workflow", type=Path)
+    parser.add_argument("--server", default=DEFAULT_SERVER)
+    parser.add_argument("--json", action="store_true", help="JSON-lines progress on stdout")
+    return asyncio.run(_main(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
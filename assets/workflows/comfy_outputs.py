@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""SQLite index of the ComfyUI output tree, updated incrementally instead of re-walked"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ltx2_inventory import IGNORED_SUFFIXES, MTIME_SLACK_NS, _Inotify
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+# The hub's ComfyUI sits next to fanvue-hub at the repository root
+OUTPUT_DIR = Path(os.environ.get("COMFY_OUTPUT_DIR", SCRIPT_DIR.parent.parent / "ComfyUI" / "output"))
+INDEX_NAME = ".outputs.sqlite"
+WATCH_INTERVAL = 2.0
+# Files this young may still be being written; their folder is looked at again next pass
+SETTLE_NS = 10_000_000_000
+HEADER_BYTES = 64 * 1024
+
+MEDIA_TYPES = {
+    ".png": "image", ".jpg": "image", ".jpeg": "image", ".webp": "image", ".gif": "image",
+    ".mp4": "video", ".mov": "video", ".webm": "video", ".mkv": "video", ".avi": "video",
+    ".wav": "audio", ".mp3": "audio", ".flac": "audio", ".ogg": "audio", ".m4a": "audio",
+    ".txt": "text", ".json": "text",
+}
+# zimage/{slug}_{timestamp}_ from the generate route, then ComfyUI's counter
+CHARACTER_PREFIX = re.compile(r"^(?P<slug>[a-z0-9][a-z0-9_-]*?)_(?P<ts>\d{13})_")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    subfolder TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    media TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    duration REAL,
+    prompt_id TEXT,
+    character TEXT,
+    created_ms INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_filename ON files (filename);
+CREATE INDEX IF NOT EXISTS files_subfolder ON files (subfolder);
+CREATE INDEX IF NOT EXISTS files_character ON files (character, mtime_ns DESC, path DESC);
+CREATE INDEX IF NOT EXISTS files_prompt ON files (prompt_id);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    rescan INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+COLUMNS = ("path", "filename", "subfolder", "size", "mtime_ns", "media", "width", "height",
+           "duration", "prompt_id", "character", "created_ms")
+
+
+def _png_size(head: bytes) -> Optional[Tuple[int, int]]:
+    if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    return None
+
+
+def _gif_size(head: bytes) -> Optional[Tuple[int, int]]:
+    if head[:4] == b"GIF8":
+        return struct.unpack("<HH", head[6:10])
+    return None
+
+
+def _jpeg_size(head: bytes) -> Optional[Tuple[int, int]]:
+    if head[:2] != b"\xff\xd8":
+        return None
+    offset = 2
+    while offset + 9 < len(head):
+        if head[offset] != 0xFF:
+            offset += 1
+            continue
+        marker = head[offset + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        length = struct.unpack(">H", head[offset + 2:offset + 4])[0]
+        # Start-of-frame markers, minus DHT/JPG/DAC which share the range
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", head[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def _webp_size(head: bytes) -> Optional[Tuple[int, int]]:
+    if head[:4] != b"RIFF" or head[8:12] != b"WEBP":
+        return None
+    chunk = head[12:16]
+    if chunk == b"VP8X":
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    if chunk == b"VP8L":
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    return None
+
+
+def _wav_duration(head: bytes) -> Optional[float]:
+    if head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return None
+    offset, byte_rate = 12, 0
+    while offset + 8 <= len(head):
+        chunk, size = head[offset:offset + 4], struct.unpack("<I", head[offset + 4:offset + 8])[0]
+        if chunk == b"fmt ":
+            byte_rate = struct.unpack("<I", head[offset + 16:offset + 20])[0]
+        elif chunk == b"data":
+            return size / byte_rate if byte_rate else None
+        offset += 8 + size + (size & 1)
+    return None
+
+
+def _mp4_boxes(f, start: int, end: int):
+    """(type, payload offset, payload end) for the boxes between start and end"""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(16)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack(">I4s", header[:8])
+        payload = offset + 8
+        if size == 1:
+            size = struct.unpack(">Q", header[8:16])[0]
+            payload += 8
+        elif size == 0:
+            size = end - offset
+        if size < 8:
+            return
+        yield kind, payload, min(offset + size, end)
+        offset += size
+
+
+def _mp4_info(path: Path, file_size: int) -> Tuple[Optional[int], Optional[int], Optional[float]]:
+    """(width, height, duration) from the moov box; reads a few hundred bytes wherever moov is"""
+    width = height = duration = None
+    with open(path, "rb") as f:
+        for kind, start, end in _mp4_boxes(f, 0, file_size):
+            if kind != b"moov":
+                continue
+            for child, cstart, cend in _mp4_boxes(f, start, end):
+                if child == b"mvhd":
+                    f.seek(cstart)
+                    data = f.read(32)
+                    if data[0] == 1:
+                        timescale, length = struct.unpack(">IQ", data[20:32])
+                    else:
+                        timescale, length = struct.unpack(">II", data[12:20])
+                    duration = length / timescale if timescale else None
+                elif child == b"trak" and not width:
+                    for box, tstart, _ in _mp4_boxes(f, cstart, cend):
+                        if box == b"tkhd":
+                            f.seek(tstart)
+                            data = f.read(96)
+                            at = 84 if data[0] == 1 else 72
+                            w, h = struct.unpack(">II", data[at:at + 8])
+                            if w and h:
+                                width, height = w >> 16, h >> 16
+            break
+    return width, height, duration
+
+
+def _ffprobe(path: Path) -> Tuple[Optional[int], Optional[int], Optional[float]]:
+    """Fallback for containers we do not parse (webm, mkv, mp3...), when ffprobe is installed"""
+    if not shutil.which("ffprobe"):
+        return None, None, None
+    try:
+        out = subprocess.run(["ffprobe", "-v", "error", "-print_format", "json", "-show_format",
+                              "-show_streams", str(path)], capture_output=True, timeout=30).stdout
+        info = json.loads(out or b"{}")
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None, None, None
+    video = next((s for s in info.get("streams", []) if s.get("codec_type") == "video"), {})
+    duration = info.get("format", {}).get("duration")
+    return video.get("width"), video.get("height"), float(duration) if duration else None
+
+
+def media_info(path: Path, size: int) -> Tuple[str, Optional[int], Optional[int], Optional[float]]:
+    """(media type, width, height, duration) from the file header"""
+    suffix = path.suffix.lower()
+    media = MEDIA_TYPES.get(suffix, "other")
+    if media not in ("image", "video", "audio"):
+        return media, None, None, None
+    try:
+        if suffix in (".mp4", ".mov", ".m4a"):
+            return (media,) + _mp4_info(path, size)
+        with open(path, "rb") as f:
+            head = f.read(HEADER_BYTES)
+        if media == "image":
+            dims = _png_size(head) or _jpeg_size(head) or _webp_size(head) or _gif_size(head)
+            return (media,) + (dims or (None, None)) + (None,)
+        if suffix == ".wav":
+            return media, None, None, _wav_duration(head)
+    except (OSError, struct.error, IndexError):
+        return media, None, None, None
+    return (media,) + _ffprobe(path)
+
+
+def parse_name(filename: str) -> Tuple[Optional[str], Optional[int]]:
+    """(character slug, creation time in ms) from a {slug}_{timestamp}_ prefixed name"""
+    match = CHARACTER_PREFIX.match(filename)
+    if not match:
+        return None, None
+    return match.group("slug"), int(match.group("ts"))
+
+
+class OutputIndex:
+    """The output tree as SQLite rows, refreshed by looking only at folders that changed
+
+    A folder whose mtime has not moved has the same entries as last time, so
+    an update costs one stat() per folder plus a scan of the folders that
+    did change. Rows for files still being written are refreshed on the
+    next update.
+    """
+
+    def __init__(self, root: Path = OUTPUT_DIR, db_path: Optional[Path] = None):
+        self.root = Path(root)
+        self.db_path = Path(db_path) if db_path else self.root / INDEX_NAME
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _full(self, rel: str) -> Path:
+        return self.root / rel if rel else self.root
+
+    def _forget(self, rel: str) -> int:
+        """Drop a folder that no longer exists, with everything below it; returns rows removed"""
+        prefix = rel + "/"
+        removed = self.db.execute("DELETE FROM files WHERE subfolder = ? OR substr(subfolder, 1, ?) = ?",
+                        (rel, len(prefix), prefix))
+        self.db.execute("DELETE FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?", (rel, len(prefix), prefix))
+        return removed.rowcount
+
+    def _scan_dir(self, rel: str, mtime_ns: int, now_ns: int, known_children: List[str]) -> Tuple[List[str], int, int]:
+        """Sync one folder's rows with disk; returns (subfolders, rows added/changed, rows removed)"""
+        stored = {row["filename"]: (row["size"], row["mtime_ns"]) for row in
+                  self.db.execute("SELECT filename, size, mtime_ns FROM files WHERE subfolder = ?", (rel,))}
+        subdirs, seen, changed, settling = [], set(), 0, False
+        with os.scandir(self._full(rel)) as it:
+            for entry in it:
+                if entry.name.startswith(".") or entry.name.endswith(IGNORED_SUFFIXES):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(f"{rel}/{entry.name}" if rel else entry.name)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                seen.add(entry.name)
+                settling |= now_ns - st.st_mtime_ns < SETTLE_NS
+                if stored.get(entry.name) == (st.st_size, st.st_mtime_ns):
+                    continue
+                media, width, height, duration = media_info(Path(entry.path), st.st_size)
+                character, created = parse_name(entry.name)
+                path = f"{rel}/{entry.name}" if rel else entry.name
+                # Keep a prompt_id learned from /history across rewrites of the same file
+                self.db.execute(
+                    "INSERT INTO files (path, filename, subfolder, size, mtime_ns, media, width, height, duration,"
+                    " character, created_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns,"
+                    " media = excluded.media, width = excluded.width, height = excluded.height,"
+                    " duration = excluded.duration",
+                    (path, entry.name, rel, st.st_size, st.st_mtime_ns, media, width, height, duration,
+                     character, created))
+                changed += 1
+        gone = [name for name in stored if name not in seen]
+        self.db.executemany("DELETE FROM files WHERE subfolder = ? AND filename = ?", [(rel, n) for n in gone])
+        removed = len(gone) + sum(self._forget(child) for child in set(known_children) - set(subdirs))
+        # Coarse mtimes (FAT, SMB) can hide a change made in the same tick as our scan
+        rescan = settling or now_ns - mtime_ns < MTIME_SLACK_NS
+        self.db.execute("INSERT OR REPLACE INTO dirs (path, mtime_ns, rescan) VALUES (?, ?, ?)",
+                        (rel, mtime_ns, int(rescan)))
+        return subdirs, changed, removed
+
+    def update(self, force: bool = False) -> Tuple[int, int]:
+        """Bring the index up to date; returns (rows added or changed, rows removed)"""
+        with self.lock, self.db:
+            dirs = {row["path"]: (row["mtime_ns"], row["rescan"]) for row in self.db.execute("SELECT * FROM dirs")}
+            children: Dict[str, List[str]] = {}
+            for path in dirs:
+                if path:
+                    children.setdefault(path.rsplit("/", 1)[0] if "/" in path else "", []).append(path)
+            added = removed = 0
+            now_ns = time.time_ns()
+            stack = [""]
+            while stack:
+                rel = stack.pop()
+                try:
+                    mtime_ns = os.stat(self._full(rel)).st_mtime_ns
+                except OSError:
+                    removed += self._forget(rel)
+                    continue
+                known = dirs.get(rel)
+                if force or known is None or known[0] != mtime_ns or known[1]:
+                    subdirs, a, r = self._scan_dir(rel, mtime_ns, now_ns, children.get(rel, []))
+                    added, removed = added + a, removed + r
+                else:
+                    subdirs = children.get(rel, [])
+                stack.extend(subdirs)
+        return added, removed
+
+    def folders(self) -> List[Path]:
+        return [self._full(row["path"]) for row in self.db.execute("SELECT path FROM dirs")]
+
+    def attach_history(self, history: dict) -> int:
+        """Record prompt_ids from a ComfyUI /history document on the files they produced"""
+        pairs = []
+        for prompt_id, item in history.items():
+            for output in (item.get("outputs") or {}).values():
+                for items in output.values():
+                    for entry in items if isinstance(items, list) else []:
+                        if isinstance(entry, dict) and entry.get("filename") and entry.get("type", "output") == "output":
+                            sub = entry.get("subfolder", "").strip("/")
+                            pairs.append((prompt_id, f"{sub}/{entry['filename']}" if sub else entry["filename"]))
+        with self.lock, self.db:
+            self.db.executemany("UPDATE files SET prompt_id = ? WHERE path = ?", pairs)
+        return len(pairs)
+
+    def _rows(self, sql: str, params=()) -> List[dict]:
+        with self.lock:
+            return [dict(row) for row in self.db.execute(sql, params)]
+
+    def find(self, filename: str, subfolder: Optional[str] = None) -> List[dict]:
+        """Files with this name, newest first; subfolder narrows it to one"""
+        if subfolder is not None:
+            return self._rows("SELECT * FROM files WHERE filename = ? AND subfolder = ?",
+                              (filename, subfolder.strip("/")))
+        return self._rows("SELECT * FROM files WHERE filename = ? ORDER BY mtime_ns DESC", (filename,))
+
+    def by_prompt(self, prompt_id: str) -> List[dict]:
+        return self._rows("SELECT * FROM files WHERE prompt_id = ? ORDER BY path", (prompt_id,))
+
+    def library(self, character: str, media: Optional[str] = None, limit: int = 50,
+                cursor: str = "") -> Tuple[List[dict], str]:
+        """One page of a character's outputs, newest first, and the cursor for the next page
+
+        Keyset pagination on (mtime, path), so page 500 costs the same as page 1.
+        """
+        sql = "SELECT * FROM files WHERE character = ?"
+        params: list = [character]
+        if media:
+            sql += " AND media = ?"
+            params.append(media)
+        if cursor:
+            mtime, _, path = cursor.partition(":")
+            sql += " AND (mtime_ns < ? OR (mtime_ns = ? AND path < ?))"
+            params += [int(mtime), int(mtime), path]
+        sql += " ORDER BY mtime_ns DESC, path DESC LIMIT ?"
+        rows = self._rows(sql, params + [limit])
+        next_cursor = f"{rows[-1]['mtime_ns']}:{rows[-1]['path']}" if len(rows) == limit else ""
+        return rows, next_cursor
+
+    def characters(self) -> List[dict]:
+        return self._rows("SELECT character, COUNT(*) AS files, MAX(mtime_ns) AS latest FROM files"
+                          " WHERE character IS NOT NULL GROUP BY character ORDER BY latest DESC")
+
+
+def fetch_history(server: str, timeout: float = 10) -> dict:
+    with urllib.request.urlopen(server.rstrip("/") + "/history", timeout=timeout) as resp:
+        return json.loads(resp.read())
+
+
+def watch(index: OutputIndex, interval: float = WATCH_INTERVAL, log=print):
+    """Keep the index current until interrupted; inotify lets idle passes skip the stat walk"""
+    notify = None
+    if sys.platform.startswith("linux"):
+        try:
+            notify = _Inotify()
+        except (OSError, AttributeError):
+            notify = None
+    pending = True
+    while True:
+        if pending:
+            added, removed = index.update()
+            if added or removed:
+                log(f"[INDEX] +{added} -{removed}")
+            if notify:
+                watched = set(notify.wds.values())
+                for folder in index.folders():
+                    if folder not in watched:
+                        notify.watch(folder)
+        time.sleep(interval)
+        if notify:
+            dirty = notify.changed()
+            with index.lock:
+                settling = index.db.execute("SELECT 1 FROM dirs WHERE rescan LIMIT 1").fetchone()
+            pending = dirty is None or bool(dirty) or bool(settling)
+        else:
+            pending = True
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Index the ComfyUI output folder in SQLite")
+    parser.add_argument("--root", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--db", type=Path, help=f"index file (default: <root>/{INDEX_NAME})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("update", help="bring the index up to date")
+    p.add_argument("--force", action="store_true", help="rescan every folder")
+    p.add_argument("--history", metavar="URL", help="also record prompt_ids from this ComfyUI's /history")
+    p = sub.add_parser("watch", help="keep the index up to date until interrupted")
+    p.add_argument("--interval", type=float, default=WATCH_INTERVAL)
+    p = sub.add_parser("find", help="locate a file by name")
+    p.add_argument("filename")
+    p.add_argument("--subfolder")
+    p = sub.add_parser("library", help="a character's outputs, newest first")
+    p.add_argument("character")
+    p.add_argument("--media", choices=sorted(set(MEDIA_TYPES.values())))
+    p.add_argument("--limit", type=int, default=50)
+    p.add_argument("--cursor", default="")
+    p = sub.add_parser("prompt", help="files produced by a prompt_id")
+    p.add_argument("prompt_id")
+    sub.add_parser("characters", help="characters with outputs and their file counts")
+    args = parser.parse_args(argv)
+
+    if not args.root.is_dir():
+        print(f"[X] {args.root} does not exist", file=sys.stderr)
+        return 2
+    index = OutputIndex(args.root, args.db)
+    try:
+        if args.command == "update":
+            started = time.perf_counter()
+            added, removed = index.update(args.force)
+            linked = index.attach_history(fetch_history(args.history)) if args.history else 0
+            print(f"[OK] +{added} -{removed}, {linked} history outputs, {time.perf_counter() - started:.2f}s")
+        elif args.command == "watch":
+            try:
+                watch(index, args.interval)
+            except KeyboardInterrupt:
+                pass
+        elif args.command == "find":
+            rows = index.find(args.filename, args.subfolder)
+            print(json.dumps(rows, indent=2))
+            return 0 if rows else 1
+        elif args.command == "library":
+            rows, cursor = index.library(args.character, args.media, args.limit, args.cursor)
+            print(json.dumps({"files": rows, "next": cursor}, indent=2))
+        elif args.command == "prompt":
+            print(json.dumps(index.by_prompt(args.prompt_id), indent=2))
+        elif args.command == "characters":
+            print(json.dumps(index.characters(), indent=2))
+    except OSError as e:
+        print(f"[X] {e}", file=sys.stderr)
+        return 1
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""A ComfyUI-compatible front for several ComfyUI backends, placed by queue depth and loaded models"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from comfy_batch import fingerprint
+from comfy_validate import Validator, installed_models, load_object_info, node_errors
+
+DEFAULT_PORT = 8189
+POLL_INTERVAL = 1.0
+HTTP_TIMEOUT = 10
+BUFFER_SIZE = 1024 * 1024
+# A model switch is worth this many queued prompts when choosing a backend
+RELOAD_COST = 2.0
+# prompt_id -> backend entries kept for /history and /view lookups
+OWNER_LIMIT = 100_000
+# Sent to every backend rather than one
+BROADCAST = ("/interrupt", "/free", "/upload/image", "/upload/mask")
+# Broadcasts answered with {backend: status}; the rest return the first backend's own reply
+STATUS_REPLY = ("/interrupt", "/free")
+
+
+class Backend:
+    """One ComfyUI server and what the router knows about its queue"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.lock = threading.Lock()
+        self.depth = 0
+        # Submitted since the last /queue poll, so bursts spread out before the next poll
+        self.recent = 0
+        self.loaded = ""
+        self.healthy = True
+
+    def estimate(self, models: str, reload_cost: float = RELOAD_COST) -> float:
+        with self.lock:
+            return self.depth + self.recent + (0 if models == self.loaded else reload_cost)
+
+    def poll(self):
+        try:
+            queue = _call(self.url + "/queue")
+        except OSError:
+            with self.lock:
+                self.healthy = False
+            return
+        with self.lock:
+            self.depth = len(queue.get("queue_running", [])) + len(queue.get("queue_pending", []))
+            self.recent = 0
+            self.healthy = True
+
+
+def _call(url: str) -> dict:
+    """GET a JSON document from a backend"""
+    with urllib.request.urlopen(url, timeout=HTTP_TIMEOUT) as resp:
+        return json.loads(resp.read() or b"{}")
+
+
+class Router:
+    """Places prompts and remembers which backend owns each prompt_id"""
+
+    def __init__(self, urls: List[str], reload_cost: float = RELOAD_COST,
+                 log: Callable[[str], None] = print, validator: Optional[Validator] = None):
+        self.backends = [Backend(u) for u in urls]
+        # Bad prompts are refused here instead of taking a queue slot
+        self.validator = validator
+        self.reload_cost = reload_cost
+        self.log = log
+        self.lock = threading.Lock()
+        self.owners: "OrderedDict[str, Backend]" = OrderedDict()
+        # Output filenames seen in /history replies, for /view
+        self.files: "OrderedDict[Tuple[str, str], Backend]" = OrderedDict()
+        self.stop = threading.Event()
+
+    def start(self):
+        for backend in self.backends:
+            backend.poll()
+        threading.Thread(target=self._poll_loop, daemon=True).start()
+
+    def _poll_loop(self):
+        while not self.stop.wait(POLL_INTERVAL):
+            for backend in self.backends:
+                backend.poll()
+
+    def _remember(self, table: OrderedDict, key, backend: Backend):
+        with self.lock:
+            table[key] = backend
+            table.move_to_end(key)
+            while len(table) > OWNER_LIMIT:
+                table.popitem(last=False)
+
+    def owner(self, prompt_id: str) -> Optional[Backend]:
+        with self.lock:
+            backend = self.owners.get(prompt_id)
+        if backend:
+            return backend
+        # Submitted before a router restart, or straight to the backend
+        for backend in self.backends:
+            try:
+                if prompt_id in _call(f"{backend.url}/history/{prompt_id}"):
+                    self._remember(self.owners, prompt_id, backend)
+                    return backend
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def choose(self, models: str) -> List[Backend]:
+        """Healthy backends, best first: shortest estimated queue counting a model reload"""
+        healthy = [b for b in self.backends if b.healthy] or self.backends
+        return sorted(healthy, key=lambda b: b.estimate(models, self.reload_cost))
+
+    def submit(self, body: bytes) -> Tuple[int, bytes]:
+        """Forward a /prompt body to the best backend, falling back to the next on connection errors"""
+        try:
+            prompt = json.loads(body).get("prompt", {})
+            models = fingerprint(prompt)
+        except (ValueError, AttributeError):
+            prompt, models = None, ""
+        if self.validator and isinstance(prompt, dict):
+            problems = self.validator.validate(prompt)
+            if problems:
+                self.log(f"[REJECT] {problems[0]}")
+                return 400, json.dumps(node_errors(problems)).encode("utf-8")
+        error = b""
+        for backend in self.choose(models):
+            try:
+                req = urllib.request.Request(backend.url + "/prompt", data=body,
+                                             headers={"Content-Type": "application/json"})
+                with urllib.request.urlopen(req, timeout=HTTP_TIMEOUT) as resp:
+                    reply = resp.read()
+            except urllib.error.HTTPError as e:
+                # The backend validated and rejected the prompt; another one would too
+                return e.code, e.read()
+            except OSError as e:
+                backend.healthy = False
+                error = json.dumps({"error": f"{backend.url}: {e}"}).encode("utf-8")
+                continue
+            with backend.lock:
+                backend.recent += 1
+                backend.loaded = models
+            prompt_id = json.loads(reply).get("prompt_id", "")
+            if prompt_id:
+                self._remember(self.owners, prompt_id, backend)
+            self.log(f"[ROUTE] {prompt_id} -> {backend.url} (models={models[:8]})")
+            return 200, reply
+        return 502, error or b'{"error": "no backend available"}'
+
+    def queue(self) -> dict:
+        merged = {"queue_running": [], "queue_pending": []}
+        for backend in self.backends:
+            try:
+                queue = _call(backend.url + "/queue")
+            except (OSError, ValueError):
+                continue
+            for key in merged:
+                merged[key] += queue.get(key, [])
+        return merged
+
+    def history(self, prompt_id: str = "") -> dict:
+        """One prompt from its owner, or everything from every backend"""
+        backends = [self.owner(prompt_id)] if prompt_id else self.backends
+        merged = {}
+        for backend in filter(None, backends):
+            try:
+                entries = _call(f"{backend.url}/history/{prompt_id}" if prompt_id else backend.url + "/history")
+            except (OSError, ValueError):
+                continue
+            for pid, entry in entries.items():
+                self._remember(self.owners, pid, backend)
+                for output in entry.get("outputs", {}).values():
+                    for items in output.values():
+                        for item in items if isinstance(items, list) else []:
+                            if isinstance(item, dict) and "filename" in item:
+                                self._remember(self.files, (item.get("subfolder", ""), item["filename"]), backend)
+            merged.update(entries)
+        return merged
+
+    def file_owners(self, subfolder: str, filename: str) -> List[Backend]:
+        """The backend that produced a file first, then the rest"""
+        with self.lock:
+            known = self.files.get((subfolder, filename))
+        return ([known] if known else []) + [b for b in self.backends if b is not known]
+
+    def broadcast(self, path: str, body: bytes, headers: dict) -> Tuple[dict, Optional[Tuple[bytes, str]]]:
+        """Send to every backend; returns ({url: status or error}, first successful (body, content type))"""
+        results, first = {}, None
+        for backend in self.backends:
+            try:
+                req = urllib.request.Request(backend.url + path, data=body, headers=headers)
+                with urllib.request.urlopen(req, timeout=HTTP_TIMEOUT) as resp:
+                    results[backend.url] = resp.status
+                    reply = resp.read()
+                    if first is None:
+                        first = reply, resp.headers.get("Content-Type", "application/json")
+            except urllib.error.HTTPError as e:
+                results[backend.url] = e.code
+            except OSError as e:
+                results[backend.url] = str(e)
+        if path == "/free":
+            for backend in self.backends:
+                backend.loaded = ""
+        return results, first
+
+
+class _RouterHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    router: Router = None
+
+    def _reply(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, data, status: int = 200):
+        self._reply(status, json.dumps(data).encode("utf-8"))
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _proxy(self, backend: Backend, path: str, body: Optional[bytes] = None) -> bool:
+        """Stream a backend's reply to the client; False if the backend does not have it"""
+        headers = {k: v for k, v in self.headers.items() if k.lower() in ("content-type", "range")}
+        req = urllib.request.Request(backend.url + path, data=body, headers=headers, method=self.command)
+        try:
+            resp = urllib.request.urlopen(req, timeout=HTTP_TIMEOUT)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return False
+            self._reply(e.code, e.read())
+            return True
+        except OSError:
+            return False
+        with resp:
+            self.send_response(resp.status)
+            for key in ("Content-Type", "Content-Length", "Content-Range", "Content-Disposition", "Accept-Ranges"):
+                if resp.headers.get(key):
+                    self.send_header(key, resp.headers[key])
+            self.end_headers()
+            while True:
+                block = resp.read(BUFFER_SIZE)
+                if not block:
+                    break
+                self.wfile.write(block)
+        return True
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path
+        if path == "/queue":
+            self._json(self.router.queue())
+        elif path == "/history" or path.startswith("/history/"):
+            self._json(self.router.history(path[len("/history/"):] if path != "/history" else ""))
+        elif path.startswith("/_router/owner/"):
+            backend = self.router.owner(path[len("/_router/owner/"):])
+            self._json({"backend": backend.url} if backend else {}, 200 if backend else 404)
+        elif path == "/_router/backends":
+            self._json([{"url": b.url, "depth": b.depth, "recent": b.recent, "loaded": b.loaded,
+                         "healthy": b.healthy} for b in self.router.backends])
+        elif path == "/view":
+            query = parse_qs(parts.query)
+            subfolder = query.get("subfolder", [""])[0]
+            filename = query.get("filename", [""])[0]
+            for backend in self.router.file_owners(subfolder, filename):
+                if self._proxy(backend, self.path):
+                    return
+            self._reply(404, b"")
+        else:
+            # object_info, system_stats, embeddings...: the backends run the same nodes
+            for backend in self.router.choose(""):
+                if self._proxy(backend, self.path):
+                    return
+            self._reply(502, b'{"error": "no backend available"}')
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = self._body()
+        if path == "/prompt":
+            self._reply(*self.router.submit(body))
+        elif path in BROADCAST or path in ("/queue", "/history"):
+            # Uploads must be on whichever backend the next prompt lands on; queue and
+            # history edits ({"delete": [ids]}, {"clear": true}) apply wherever the ids live
+            headers = {"Content-Type": self.headers.get("Content-Type", "application/json")}
+            results, first = self.router.broadcast(path, body, headers)
+            if path in STATUS_REPLY:
+                ok = any(status == 200 for status in results.values())
+                self._json(results, 200 if ok else 502)
+            elif first:
+                # Clients read ComfyUI's own reply, e.g. {name, subfolder, type} for an upload
+                self._reply(200, *first)
+            else:
+                self._json({"error": "no backend accepted the request", "backends": results}, 502)
+        else:
+            for backend in self.router.choose(""):
+                if self._proxy(backend, self.path, body):
+                    return
+            self._reply(502, b'{"error": "no backend available"}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(router: Router, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Start the router on a daemon thread; call shutdown() on the result to stop it"""
+    router.start()
+    handler = type("RouterHandler", (_RouterHandler,), {"router": router})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Route ComfyUI prompts across several backends")
+    parser.add_argument("backends", nargs="*", help="backend URLs (default: $COMFY_BACKENDS, comma separated)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--reload-cost", type=float, default=RELOAD_COST,
+                        help="queued prompts a model switch is worth when choosing a backend")
+    parser.add_argument("--validate", action="store_true",
+                        help="refuse prompts that fail comfy_validate against the cached /object_info")
+    args = parser.parse_args(argv)
+
+    urls = args.backends or [u.strip() for u in os.environ.get("COMFY_BACKENDS", "").split(",") if u.strip()]
+    if not urls:
+        parser.error("no backends given")
+    validator = None
+    if args.validate:
+        try:
+            validator = Validator(load_object_info(), installed_models())
+        except (OSError, ValueError) as e:
+            parser.error(f"no /object_info snapshot ({e}); run: comfy_validate.py refresh")
+    server = serve(Router(urls, args.reload_cost, validator=validator), args.host, args.port)
+    print(f"[SERVE] http://{args.host}:{args.port} -> {', '.join(urls)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
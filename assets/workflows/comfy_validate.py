@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""Check API-format workflows against a cached /object_info and the installed models"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Container, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from ltx2_inventory import Inventory
+from ltx2_paths import COMFY_URL, FOLDERS, MODELS_DIR, SCRIPT_DIR
+from ltx2_quota import MODEL_SUFFIXES
+
+OBJECT_INFO_FILE = SCRIPT_DIR / ".object_info.json"
+FETCH_TIMEOUT = 60
+
+
+class NodeSpec:
+    """What one node class accepts and produces, precompiled from its /object_info entry"""
+
+    __slots__ = ("required", "inputs", "outputs", "output_node")
+
+    def __init__(self, info: dict):
+        self.inputs: Dict[str, Tuple[Optional[str], Optional[FrozenSet]]] = {}
+        sections = info.get("input", {})
+        for section in ("required", "optional"):
+            for name, spec in (sections.get(section) or {}).items():
+                self.inputs[name] = _input_type(spec)
+        self.required = tuple((sections.get("required") or {}).keys())
+        self.outputs = tuple(info.get("output", ()))
+        self.output_node = bool(info.get("output_node"))
+
+
+def _input_type(spec) -> Tuple[Optional[str], Optional[FrozenSet]]:
+    """(type name, None) for sockets and typed widgets, (None, choices) for combos"""
+    kind = spec[0] if isinstance(spec, (list, tuple)) and spec else spec
+    if isinstance(kind, list):
+        return None, frozenset(v for v in kind if isinstance(v, (str, int, float)))
+    if kind == "COMBO" and len(spec) > 1 and isinstance(spec[1], dict):
+        return None, frozenset(spec[1].get("options", ()))
+    return str(kind), None
+
+
+def _type_matches(received: str, expected: str) -> bool:
+    """ComfyUI's socket rule: '*' matches anything, and types may be comma-separated unions"""
+    if received == "*" or expected == "*" or received == expected:
+        return True
+    return bool(set(received.split(",")) & set(expected.split(",")))
+
+
+def _model_name(value) -> str:
+    """Filename part of a widget value that names a model file, or ''"""
+    if isinstance(value, str) and value.lower().endswith(MODEL_SUFFIXES):
+        return value.replace("\\", "/").rsplit("/", 1)[-1]
+    return ""
+
+
+class Problem:
+    """One reason a workflow would be rejected"""
+
+    def __init__(self, node: str, class_type: str, kind: str, message: str):
+        self.node = node
+        self.class_type = class_type
+        self.kind = kind
+        self.message = message
+
+    def as_dict(self) -> dict:
+        return {"node": self.node, "class_type": self.class_type, "type": self.kind, "message": self.message}
+
+    def __str__(self) -> str:
+        return f"node {self.node} ({self.class_type}): {self.message}"
+
+
+class Validator:
+    """Validates prompts in memory; build once, call validate() per job
+
+    object_info is ComfyUI's /object_info document. models holds the model
+    filenames on disk (a set, or a live InstalledModels): a model named in a
+    workflow is accepted if ComfyUI listed it when the snapshot was taken or
+    it is on disk now.
+    """
+
+    def __init__(self, object_info: dict, models: Optional[Container[str]] = None):
+        self.specs = {name: NodeSpec(info) for name, info in object_info.items()}
+        self.models = models
+
+    def validate(self, prompt: dict) -> List[Problem]:
+        problems = []
+        has_output = False
+        for node_id, node in prompt.items():
+            if not isinstance(node, dict) or not isinstance(node.get("inputs"), dict):
+                problems.append(Problem(node_id, "", "invalid_node", "not an API-format node"))
+                continue
+            class_type = node.get("class_type", "")
+            spec = self.specs.get(class_type)
+            if spec is None:
+                problems.append(Problem(node_id, class_type, "missing_node_type",
+                                        f"unknown node type {class_type!r} (custom node not installed?)"))
+                continue
+            has_output |= spec.output_node
+            inputs = node["inputs"]
+            for name in spec.required:
+                if name not in inputs:
+                    problems.append(Problem(node_id, class_type, "required_input_missing",
+                                            f"required input {name!r} is missing"))
+            for name, value in inputs.items():
+                expected = spec.inputs.get(name)
+                if expected is None:
+                    continue
+                if isinstance(value, list) and len(value) == 2 and isinstance(value[0], str):
+                    problems += self._check_link(prompt, node_id, class_type, name, value, expected[0])
+                elif expected[1] is not None:
+                    problem = self._check_choice(value, expected[1])
+                    if problem:
+                        problems.append(Problem(node_id, class_type, "value_not_in_list", f"{name}: {problem}"))
+        if not has_output and not any(p.kind == "missing_node_type" for p in problems):
+            problems.append(Problem("", "", "prompt_no_outputs", "prompt has no output nodes"))
+        return problems
+
+    def _check_link(self, prompt: dict, node_id: str, class_type: str, name: str, link: list,
+                    expected: Optional[str]) -> List[Problem]:
+        source_id, index = link
+        source = prompt.get(source_id)
+        if not isinstance(source, dict):
+            return [Problem(node_id, class_type, "bad_link", f"{name}: links to missing node {source_id}")]
+        source_spec = self.specs.get(source.get("class_type", ""))
+        if source_spec is None:
+            # Already reported on the source node itself
+            return []
+        if not isinstance(index, int) or not 0 <= index < len(source_spec.outputs):
+            return [Problem(node_id, class_type, "bad_link",
+                            f"{name}: node {source_id} has no output {index} "
+                            f"({len(source_spec.outputs)} outputs)")]
+        received = source_spec.outputs[index]
+        if expected and not isinstance(received, list) and not _type_matches(str(received), expected):
+            return [Problem(node_id, class_type, "return_type_mismatch",
+                            f"{name}: expects {expected}, node {source_id} output {index} is {received}")]
+        return []
+
+    def _check_choice(self, value, choices: FrozenSet) -> str:
+        if value in choices:
+            return ""
+        # Downloaded since the snapshot was taken
+        model = _model_name(value)
+        if model and self.models is not None and model in self.models:
+            return ""
+        if model:
+            return f"model file {value!r} is not installed"
+        text = repr(value)
+        return f"{text[:80] + '...' if len(text) > 80 else text} not in the {len(choices)} allowed values"
+
+
+def model_folders() -> List[Path]:
+    """FOLDERS plus any other folder directly under models/ (clip_vision, upscale_models...)"""
+    folders = list(FOLDERS.values())
+    if MODELS_DIR.is_dir():
+        folders += [p for p in sorted(MODELS_DIR.iterdir()) if p.is_dir() and p not in folders
+                    and not p.name.startswith(".")]
+    return folders
+
+
+class InstalledModels:
+    """Model filenames on disk, one level deep in each model folder (plus one subfolder level)
+
+    Lookups go through an Inventory, so a long-running process sees files
+    added or deleted since it started at the cost of one refresh per second.
+    """
+
+    def __init__(self, inventory: Optional[Inventory] = None):
+        folders = model_folders()
+        # Widgets like "ltx2/model.safetensors" live one level down
+        folders += [sub for folder in folders if folder.is_dir()
+                    for sub in folder.iterdir() if sub.is_dir() and not sub.name.startswith(".")]
+        self.folders = folders
+        self.inventory = inventory or Inventory(folders)
+
+    def __contains__(self, name) -> bool:
+        return any(self.inventory.exists(folder / name) for folder in self.folders)
+
+
+def installed_models(inventory: Optional[Inventory] = None) -> Optional[InstalledModels]:
+    """Live view of the model files on disk; None when there is no models folder here at all"""
+    if not MODELS_DIR.is_dir():
+        return None
+    return InstalledModels(inventory)
+
+
+def fetch_object_info(server: str = COMFY_URL, path: Path = OBJECT_INFO_FILE) -> dict:
+    """Download /object_info from a running ComfyUI and keep it as the snapshot"""
+    with urllib.request.urlopen(server.rstrip("/") + "/object_info", timeout=FETCH_TIMEOUT) as resp:
+        info = json.loads(resp.read())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(info), encoding="utf-8")
+    os.replace(tmp, path)
+    return info
+
+
+def load_object_info(path: Path = OBJECT_INFO_FILE) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def node_errors(problems: List[Problem]) -> dict:
+    """The body ComfyUI's /prompt returns for an invalid prompt, so clients need no new handling"""
+    errors: Dict[str, dict] = {}
+    for problem in problems:
+        if not problem.node:
+            continue
+        entry = errors.setdefault(problem.node, {"errors": [], "dependent_outputs": [],
+                                                 "class_type": problem.class_type})
+        entry["errors"].append({"type": problem.kind, "message": problem.message, "details": ""})
+    first = problems[0]
+    return {
+        "error": {"type": first.kind, "message": str(first), "details": "", "extra_info": {}},
+        "node_errors": errors,
+    }
+
+
+def validate_files(validator: Validator, files: Iterable[Path]) -> Dict[str, List[Problem]]:
+    """Problems per file; UI-format files and unreadable JSON are reported, not raised"""
+    results = {}
+    for path in files:
+        try:
+            prompt = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            results[str(path)] = [Problem("", "", "unreadable", str(e))]
+            continue
+        if not isinstance(prompt, dict) or "nodes" in prompt:
+            results[str(path)] = [Problem("", "", "not_api_format", 'export with "Save (API)"')]
+            continue
+        results[str(path)] = validator.validate(prompt)
+    return results
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Validate workflows before they take a ComfyUI queue slot")
+    parser.add_argument("--object-info", type=Path, default=OBJECT_INFO_FILE, help="cached /object_info snapshot")
+    parser.add_argument("--server", default=COMFY_URL)
+    parser.add_argument("--json", action="store_true")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("refresh", help="fetch /object_info from ComfyUI into the snapshot")
+    p = sub.add_parser("validate", help="validate the given workflow files")
+    p.add_argument("files", nargs="+", type=Path)
+    p = sub.add_parser("validate-all", help="validate every workflow in a folder")
+    p.add_argument("folder", nargs="?", type=Path, default=SCRIPT_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "refresh":
+        try:
+            info = fetch_object_info(args.server, args.object_info)
+        except (OSError, ValueError) as e:
+            print(f"[X] {args.server}: {e}", file=sys.stderr)
+            return 1
+        print(f"[OK] {len(info)} node types saved to {args.object_info}")
+        return 0
+
+    try:
+        object_info = load_object_info(args.object_info)
+    except (OSError, ValueError) as e:
+        print(f"[X] no /object_info snapshot ({e}); run: {Path(__file__).name} refresh", file=sys.stderr)
+        return 2
+    validator = Validator(object_info, installed_models())
+    # Dotfiles are caches such as the /object_info snapshot itself, not workflows
+    files = args.files if args.command == "validate" else \
+        sorted(p for p in args.folder.glob("*.json") if not p.name.startswith("."))
+
+    started = time.perf_counter()
+    results = validate_files(validator, files)
+    elapsed = time.perf_counter() - started
+    bad = {path: problems for path, problems in results.items() if problems}
+    if args.json:
+        print(json.dumps({path: [p.as_dict() for p in problems] for path, problems in results.items()}, indent=2))
+    else:
+        for path, problems in results.items():
+            name = Path(path).name
+            if not problems:
+                print(f"[OK] {name}")
+                continue
+            print(f"[BAD] {name}")
+            for problem in problems:
+                print(f"      {problem}")
+        per_file = elapsed / len(files) * 1000 if files else 0
+        print(f"{len(files)} workflows, {len(bad)} invalid ({per_file:.2f} ms each incl. reading)")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
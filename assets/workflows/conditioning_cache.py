@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""Disk cache of text-encoder outputs, keyed by (encoder file hash, exact prompt text)"""
+
+import abc
+import argparse
+import csv
+import hashlib
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import torch
+from safetensors.torch import load_file, save_file
+
+from ltx2_paths import MODELS_DIR, SCRIPT_DIR
+from ltx2_verify import VerifyIndex
+
+CACHE_DIR = Path(os.environ.get("LTX2_CONDITIONING_DIR", MODELS_DIR / ".conditioning"))
+CACHE_GB = float(os.environ.get("LTX2_CONDITIONING_GB", "4"))
+# Eviction stops once the cache is back under this share of its limit, so it does not run on every put
+LOW_WATER = 0.9
+STYLES_FILE = SCRIPT_DIR.parent / "styles.csv"
+COMPILED_DIR = SCRIPT_DIR / "compiled"
+# Slots whose template defaults are worth encoding ahead of time
+PROMPT_SLOTS = ("positive_prompt", "negative_prompt")
+# Shared with ltx2_manager, so weights it already verified are not hashed again
+INDEX_FILE = MODELS_DIR / ".verified.json"
+
+_index: Optional[VerifyIndex] = None
+
+
+class Encoder(abc.ABC):
+    """A text encoder the cache can wrap
+
+    path is the weights file (its hash is part of every key); encoders
+    without one must set name to something that changes with their output.
+    options names anything else that changes the output of the same weights
+    (e.g. clip type and clip skip) and is appended to the key.
+    encode() returns named tensors, e.g. {"cond": ..., "pooled_output": ...}.
+    """
+
+    name = ""
+    path: Optional[Path] = None
+    options = ""
+
+    @abc.abstractmethod
+    def encode(self, text: str) -> Dict[str, torch.Tensor]:
+        ...
+
+
+class DummyEncoder(Encoder):
+    """Deterministic CPU stand-in: same text, same tensors, no weights needed"""
+
+    def __init__(self, tokens: int = 77, dim: int = 768, pooled: int = 768):
+        self.tokens = tokens
+        self.dim = dim
+        self.pooled = pooled
+        self.name = f"dummy-{tokens}x{dim}-{pooled}"
+        self.calls = 0
+
+    def encode(self, text: str) -> Dict[str, torch.Tensor]:
+        self.calls += 1
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little") & (2 ** 63 - 1)
+        generator = torch.Generator().manual_seed(seed)
+        return {
+            "cond": torch.randn(1, self.tokens, self.dim, generator=generator),
+            "pooled_output": torch.randn(1, self.pooled, generator=generator),
+        }
+
+
+def encoder_id(encoder: Encoder) -> str:
+    """SHA-256 of the encoder's weights file (from the verify index when unchanged) plus its options, else its name"""
+    global _index
+    if encoder.path:
+        path = Path(encoder.path)
+        if _index is None:
+            _index = VerifyIndex(INDEX_FILE)
+        digest = _index.known_digest(path)
+        if not digest:
+            digest = _index.digest(path)
+            _index.save()
+        return f"{digest}-{encoder.options}" if encoder.options else digest
+    if not encoder.name:
+        raise ValueError("encoder has neither a weights path nor a name")
+    return encoder.name
+
+
+def cache_key(encoder: str, text: str) -> str:
+    return hashlib.sha256(f"{encoder}\0{text}".encode("utf-8")).hexdigest()
+
+
+def to_conditioning(tensors: Dict[str, torch.Tensor]) -> list:
+    """ComfyUI CONDITIONING ([[cond, {extras}]]) from cached tensors"""
+    extras = {k: v for k, v in tensors.items() if k != "cond"}
+    return [[tensors["cond"], extras]]
+
+
+def from_conditioning(conditioning: list) -> Dict[str, torch.Tensor]:
+    """Tensors of a single-entry ComfyUI CONDITIONING; non-tensor extras are not cacheable and are dropped"""
+    cond, extras = conditioning[0]
+    tensors = {"cond": cond}
+    tensors.update({k: v for k, v in extras.items() if isinstance(v, torch.Tensor)})
+    return tensors
+
+
+class ConditioningCache:
+    """Encoded prompts as one safetensors file each, evicted least recently used first
+
+    A file's mtime is its last use: get() touches it, so the LRU order
+    survives restarts and is shared by every process using the folder.
+    """
+
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: int = int(CACHE_GB * 1024 ** 3)):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.used: Optional[int] = None
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.safetensors"
+
+    def _files(self) -> List[Tuple[int, int, Path]]:
+        """(mtime_ns, size, path) of every cached file, oldest use first"""
+        files = []
+        if self.root.is_dir():
+            for sub in self.root.iterdir():
+                if not sub.is_dir():
+                    continue
+                for path in sub.glob("*.safetensors"):
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime_ns, st.st_size, path))
+        return sorted(files)
+
+    def size(self) -> int:
+        with self.lock:
+            if self.used is None:
+                self.used = sum(size for _, size, _ in self._files())
+            return self.used
+
+    def contains(self, encoder: str, text: str) -> bool:
+        return self._path(cache_key(encoder, text)).exists()
+
+    def get(self, encoder: str, text: str, device: str = "cpu") -> Optional[Dict[str, torch.Tensor]]:
+        """Cached tensors for this exact text and encoder, or None"""
+        path = self._path(cache_key(encoder, text))
+        try:
+            tensors = load_file(str(path), device=device)
+            os.utime(path)
+        except (OSError, ValueError, RuntimeError):
+            # Missing, evicted by another process, or a truncated file from a crash
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return tensors
+
+    def put(self, encoder: str, text: str, tensors: Dict[str, torch.Tensor]):
+        path = self._path(cache_key(encoder, text))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        # safetensors refuses views and shared storage
+        save_file({k: v.detach().to("cpu").contiguous().clone() for k, v in tensors.items()}, str(tmp),
+                  metadata={"encoder": encoder, "text": text, "created": str(int(time.time()))})
+        old = path.stat().st_size if path.exists() else 0
+        os.replace(tmp, path)
+        used = self.size() + path.stat().st_size - old
+        with self.lock:
+            self.used = used
+        if used > self.max_bytes:
+            self.evict()
+
+    def evict(self, target: Optional[int] = None) -> int:
+        """Delete least recently used files until under target bytes; returns files deleted"""
+        target = int(self.max_bytes * LOW_WATER) if target is None else target
+        with self.lock:
+            files = self._files()
+            used = sum(size for _, size, _ in files)
+            deleted = 0
+            for _, size, path in files:
+                if used <= target:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                used -= size
+                deleted += 1
+            self.used = used
+        return deleted
+
+    def encode(self, encoder: Encoder, text: str, device: str = "cpu",
+               encoder_key: str = "") -> Dict[str, torch.Tensor]:
+        """Cached conditioning for text, running the encoder only on a miss"""
+        encoder_key = encoder_key or encoder_id(encoder)
+        tensors = self.get(encoder_key, text, device)
+        if tensors is None:
+            tensors = encoder.encode(text)
+            self.put(encoder_key, text, tensors)
+        return tensors
+
+
+def style_prompts(path: Path = STYLES_FILE) -> List[str]:
+    """Every non-empty prompt and negative prompt in a styles.csv"""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    return [row[col].strip() for row in rows for col in ("prompt", "negative_prompt") if (row.get(col) or "").strip()]
+
+
+def template_prompts(folder: Path = COMPILED_DIR) -> List[str]:
+    """Default prompt texts baked into the compiled workflow templates (e.g. node 34's negative prompt)"""
+    texts = []
+    for path in sorted(folder.glob("*.manifest.json")):
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        graph = manifest.get("graph", {})
+        for slot in PROMPT_SLOTS:
+            for target in manifest.get("slots", {}).get(slot, []):
+                value = graph.get(target[0], {}).get("inputs", {}).get(target[1])
+                if isinstance(value, str) and value.strip():
+                    texts.append(value.strip())
+    return texts
+
+
+def load_encoder(spec: str, weights: Optional[Path] = None, clip_type: str = "stable_diffusion",
+                 clip_skip: int = 0) -> Encoder:
+    """'dummy', 'clip' or 'module:factory'; the factory is called with the weights path
+
+    'clip' loads the weights through ComfyUI exactly as the CachedTextEncode
+    node does, so what it caches is what the node looks up.
+    """
+    if spec == "dummy":
+        return DummyEncoder()
+    if spec == "clip":
+        if not weights:
+            raise ValueError("--encoder clip needs --weights")
+        from conditioning_node import ClipEncoder
+        return ClipEncoder(weights, clip_type, clip_skip)
+    module, _, factory = spec.partition(":")
+    if not factory:
+        raise ValueError(f"encoder must be 'dummy' or 'module:factory', got {spec!r}")
+    encoder = getattr(importlib.import_module(module), factory)(weights)
+    if weights and not getattr(encoder, "path", None):
+        encoder.path = weights
+    return encoder
+
+
+def precompute(cache: ConditioningCache, encoder: Encoder, texts: Iterable[str],
+               log: Callable[[str], None] = print) -> Tuple[int, int]:
+    """Encode every text not cached yet; returns (encoded, already cached)"""
+    key = encoder_id(encoder)
+    encoded = cached = 0
+    for text in dict.fromkeys(texts):
+        if cache.contains(key, text):
+            cached += 1
+            continue
+        cache.put(key, text, encoder.encode(text))
+        encoded += 1
+        log(f"[OK] {text[:70]}{'...' if len(text) > 70 else ''}")
+    return encoded, cached
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Cache text-encoder outputs for recurring prompts")
+    parser.add_argument("--cache", type=Path, default=CACHE_DIR)
+    parser.add_argument("--max-gb", type=float, default=CACHE_GB)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("precompute", help="encode every styles.csv prompt and template default")
+    p.add_argument("--encoder", help="'clip' (default with --weights), 'dummy' (default without) "
+                                      "or module:factory (called with --weights)")
+    p.add_argument("--weights", type=Path, help="text encoder file; its hash keys the cache")
+    p.add_argument("--clip-type", default="stable_diffusion", help="ComfyUI CLIPLoader type, e.g. ltxv or wan")
+    p.add_argument("--clip-skip", type=int, default=0, help="CLIPSetLastLayer value, 0 to leave as loaded")
+    p.add_argument("--styles", type=Path, default=STYLES_FILE)
+    p.add_argument("--no-templates", action="store_true", help="skip prompts baked into compiled templates")
+    p.add_argument("--text", action="append", default=[], help="extra prompt to encode (repeatable)")
+    sub.add_parser("stats", help="size and file count")
+    p = sub.add_parser("evict", help="trim the cache to --max-gb")
+    p.add_argument("--all", action="store_true", help="delete everything")
+    args = parser.parse_args(argv)
+
+    cache = ConditioningCache(args.cache, int(args.max_gb * 1024 ** 3))
+    if args.command == "stats":
+        files = cache._files()
+        print(f"{len(files)} prompts, {sum(s for _, s, _ in files) / 1024 ** 2:.1f} MB "
+              f"of {args.max_gb:g} GB in {args.cache}")
+        return 0
+    if args.command == "evict":
+        print(f"[OK] {cache.evict(0 if args.all else cache.max_bytes)} files deleted")
+        return 0
+
+    texts = list(args.text)
+    try:
+        if args.styles.is_file():
+            texts += style_prompts(args.styles)
+        if not args.no_templates:
+            texts += template_prompts()
+        encoder = load_encoder(args.encoder or ("clip" if args.weights else "dummy"), args.weights,
+                               args.clip_type, args.clip_skip)
+    except (OSError, ValueError, ImportError, AttributeError) as e:
+        print(f"[X] {e}", file=sys.stderr)
+        return 2
+    started = time.perf_counter()
+    try:
+        encoded, cached = precompute(cache, encoder, texts)
+    except (OSError, ImportError, RuntimeError) as e:
+        # 'clip' only imports ComfyUI and loads the weights on the first prompt not cached yet
+        print(f"[X] {e}", file=sys.stderr)
+        return 1
+    print(f"{encoded} encoded, {cached} already cached, {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""ComfyUI node: text encoding backed by the on-disk conditioning cache
+
+install.ps1 drops a one-line loader into ComfyUI/custom_nodes that puts this
+folder on sys.path and re-exports NODE_CLASS_MAPPINGS from here.
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+import torch
+
+from conditioning_cache import ConditioningCache, Encoder, to_conditioning
+from ltx2_paths import COMFY_DIR, MODELS_DIR
+
+_cache = ConditioningCache()
+# The encoder used last, kept so consecutive misses do not reload its weights
+_last: Optional["ClipEncoder"] = None
+
+
+def _comfy_sd():
+    """comfy.sd, from the running ComfyUI or from the ComfyUI checkout next to this file"""
+    try:
+        import comfy.sd
+    except ImportError:
+        sys.path.insert(0, str(COMFY_DIR))
+        import comfy.sd
+    return comfy.sd
+
+
+class ClipEncoder(Encoder):
+    """A ComfyUI text encoder file, loaded only when a prompt is not cached yet
+
+    The cache key is the file's SHA-256 (from the verify index) plus the clip
+    type and clip skip, so conditioning_cache.py precompute --weights and the
+    node share entries. Tokenizer options are always ComfyUI's defaults here,
+    since the encoder is loaded fresh rather than taken from another node.
+    """
+
+    def __init__(self, path: Path, clip_type: str = "stable_diffusion", clip_skip: int = 0):
+        self.path = Path(path)
+        self.clip_type = clip_type
+        self.clip_skip = clip_skip
+        self.options = f"{clip_type}-{clip_skip}"
+        self.clip = None
+
+    def load(self):
+        if self.clip is None:
+            sd = _comfy_sd()
+            clip = sd.load_clip(ckpt_paths=[str(self.path)], embedding_directory=str(MODELS_DIR / "embeddings"),
+                                clip_type=getattr(sd.CLIPType, self.clip_type.upper(), sd.CLIPType.STABLE_DIFFUSION))
+            if self.clip_skip:
+                clip = clip.clone()
+                clip.clip_layer(self.clip_skip)
+            self.clip = clip
+        return self.clip
+
+    def encode(self, text: str) -> Dict[str, torch.Tensor]:
+        clip = self.load()
+        out = clip.encode_from_tokens(clip.tokenize(text), return_pooled=True, return_dict=True)
+        return {k: v for k, v in out.items() if isinstance(v, torch.Tensor)}
+
+
+class CachedTextEncode:
+    """Loader plus CLIPTextEncode in one: a cached prompt never loads the text encoder at all"""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        import folder_paths
+        return {
+            "required": {
+                "text": ("STRING", {"multiline": True, "dynamicPrompts": True}),
+                "clip_name": (folder_paths.get_filename_list("text_encoders"),),
+                "type": ([t.name.lower() for t in _comfy_sd().CLIPType],),
+                "clip_skip": ("INT", {"default": 0, "min": -24, "max": 0, "step": 1}),
+            }
+        }
+
+    RETURN_TYPES = ("CONDITIONING",)
+    FUNCTION = "encode"
+    CATEGORY = "conditioning"
+
+    def encode(self, text: str, clip_name: str, type: str, clip_skip: int):
+        global _last
+        import folder_paths
+        path = Path(folder_paths.get_full_path("text_encoders", clip_name))
+        if _last is None or (_last.path, _last.clip_type, _last.clip_skip) != (path, type, clip_skip):
+            _last = ClipEncoder(path, type, clip_skip)
+        return (to_conditioning(_cache.encode(_last, text)),)
+
+
+NODE_CLASS_MAPPINGS = {"CachedTextEncode": CachedTextEncode}
+NODE_DISPLAY_NAME_MAPPINGS = {"CachedTextEncode": "Text Encode (Cached)"}
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""Read GGUF headers without loading tensors, and pick a quant that fits in memory"""
+
+import json
+import mmap
+import os
+import re
+import struct
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+GGUF_MAGIC = b"GGUF"
+DEFAULT_ALIGNMENT = 32
+MAX_STRING = 16 * 1024 * 1024
+MAX_DIMS = 8
+
+# Room for activations, VAE and CUDA context on top of the weights
+DEFAULT_HEADROOM = 3 * 1024 ** 3
+# LTX-2 19B, used when no local file or cached remote size tells us better
+DEFAULT_PARAMS = 19_000_000_000
+
+# ggml tensor type id -> (name, elements per block, bytes per block)
+GGML_TYPES = {
+    0: ("F32", 1, 4), 1: ("F16", 1, 2), 2: ("Q4_0", 32, 18), 3: ("Q4_1", 32, 20),
+    6: ("Q5_0", 32, 22), 7: ("Q5_1", 32, 24), 8: ("Q8_0", 32, 34), 9: ("Q8_1", 32, 36),
+    10: ("Q2_K", 256, 84), 11: ("Q3_K", 256, 110), 12: ("Q4_K", 256, 144),
+    13: ("Q5_K", 256, 176), 14: ("Q6_K", 256, 210), 15: ("Q8_K", 256, 292),
+    16: ("IQ2_XXS", 256, 66), 17: ("IQ2_XS", 256, 74), 18: ("IQ3_XXS", 256, 98),
+    19: ("IQ1_S", 256, 50), 20: ("IQ4_NL", 32, 18), 21: ("IQ3_S", 256, 110),
+    22: ("IQ2_S", 256, 82), 23: ("IQ4_XS", 256, 136), 24: ("I8", 1, 1),
+    25: ("I16", 1, 2), 26: ("I32", 1, 4), 27: ("I64", 1, 8), 28: ("F64", 1, 8),
+    29: ("IQ1_M", 256, 56), 30: ("BF16", 1, 2), 34: ("TQ1_0", 256, 54), 35: ("TQ2_0", 256, 66),
+}
+UNQUANTIZED = {"F32", "F16", "BF16", "F64", "I8", "I16", "I32", "I64"}
+
+# Average bits per weight of each published variant, worst quality first.
+# K-quants beat the legacy formats at a similar size, hence the order is not by size alone.
+QUANT_BPW = {
+    "Q3_K_S": 3.50, "Q3_K_M": 3.91, "Q4_0": 4.55, "Q4_K_S": 4.58, "Q4_1": 5.00,
+    "Q4_K_M": 4.85, "Q5_0": 5.54, "Q5_K_S": 5.54, "Q5_1": 6.00, "Q5_K_M": 5.69,
+    "Q6_K": 6.56, "Q8_0": 8.50,
+}
+QUANT_QUALITY = list(QUANT_BPW)
+
+# GGUF metadata value types
+_SCALARS = {0: "<B", 1: "<b", 2: "<H", 3: "<h", 4: "<I", 5: "<i", 6: "<f", 7: "<?", 10: "<Q", 11: "<q", 12: "<d"}
+_STRING = 8
+_ARRAY = 9
+
+
+class GGUFReport:
+    """What the header says about one file, and whether it adds up"""
+
+    def __init__(self, path: Path, size: int):
+        self.path = path
+        self.size = size
+        self.version = 0
+        self.tensors = 0
+        self.params = 0
+        self.tensor_bytes = 0
+        self.types: Dict[str, int] = {}  # ggml type -> bytes
+        self.metadata: Dict[str, object] = {}
+        self.errors: List[str] = []
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @property
+    def quant(self) -> str:
+        """The quantized type holding the most bytes, else the largest type overall"""
+        quantized = {t: n for t, n in self.types.items() if t not in UNQUANTIZED}
+        pool = quantized or self.types
+        return max(pool, key=pool.get) if pool else ""
+
+    @property
+    def bpw(self) -> float:
+        return self.tensor_bytes * 8 / self.params if self.params else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "path": str(self.path),
+            "size": self.size,
+            "ok": self.ok,
+            "errors": self.errors,
+            "version": self.version,
+            "tensors": self.tensors,
+            "params": self.params,
+            "tensor_bytes": self.tensor_bytes,
+            "quant": self.quant,
+            "bpw": round(self.bpw, 2),
+            "types": self.types,
+            "metadata": self.metadata,
+        }
+
+
+class _Reader:
+    """Little-endian cursor over a memory map"""
+
+    def __init__(self, buf, offset: int = 0):
+        self.buf = buf
+        self.offset = offset
+
+    def unpack(self, fmt: str):
+        (value,) = struct.unpack_from(fmt, self.buf, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return value
+
+    def string(self, wide: bool = True) -> str:
+        length = self.unpack("<Q" if wide else "<I")
+        if length > MAX_STRING or self.offset + length > len(self.buf):
+            raise ValueError(f"string of {length} bytes at {self.offset} runs past the header")
+        raw = self.buf[self.offset:self.offset + length]
+        self.offset += length
+        return raw.decode("utf-8", errors="replace")
+
+    def value(self, vtype: int, wide: bool = True):
+        if vtype in _SCALARS:
+            return self.unpack(_SCALARS[vtype])
+        if vtype == _STRING:
+            return self.string(wide)
+        if vtype == _ARRAY:
+            item_type = self.unpack("<I")
+            count = self.unpack("<Q" if wide else "<I")
+            if item_type in _SCALARS:
+                # Skip numeric arrays (tokenizer scores and the like); only their length matters here
+                step = struct.calcsize(_SCALARS[item_type])
+                if self.offset + count * step > len(self.buf):
+                    raise ValueError("array runs past the end of the file")
+                self.offset += count * step
+                return f"<{count} x {_SCALARS[item_type][1]}>"
+            return [self.value(item_type, wide) for _ in range(count)]
+        raise ValueError(f"unknown metadata type {vtype}")
+
+
+def tensor_nbytes(type_id: int, count: int) -> int:
+    """Bytes a tensor of count elements takes in a ggml type"""
+    _, block, size = GGML_TYPES[type_id]
+    return (count + block - 1) // block * size
+
+
+def inspect(path: Path) -> GGUFReport:
+    """Parse and sanity-check the header and tensor table of one .gguf file"""
+    path = Path(path)
+    try:
+        size = path.stat().st_size
+    except OSError as e:
+        report = GGUFReport(path, -1)
+        report.errors.append(str(e))
+        return report
+
+    report = GGUFReport(path, size)
+    if size < 24:
+        report.errors.append("file is shorter than a GGUF header")
+        return report
+
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            _parse(mm, report)
+    except (OSError, ValueError, struct.error) as e:
+        report.errors.append(f"unreadable header: {e}")
+    return report
+
+
+def _parse(mm, report: GGUFReport):
+    r = _Reader(mm)
+    if mm[:4] != GGUF_MAGIC:
+        raise ValueError("missing GGUF magic")
+    r.offset = 4
+    report.version = r.unpack("<I")
+    if report.version not in (1, 2, 3):
+        raise ValueError(f"unsupported GGUF version {report.version}")
+    wide = report.version >= 2
+    tensor_count = r.unpack("<Q" if wide else "<I")
+    kv_count = r.unpack("<Q" if wide else "<I")
+
+    for _ in range(kv_count):
+        key = r.string(wide)
+        report.metadata[key] = r.value(r.unpack("<I"), wide)
+
+    infos = []
+    for _ in range(tensor_count):
+        name = r.string(wide)
+        n_dims = r.unpack("<I")
+        if n_dims > MAX_DIMS:
+            raise ValueError(f"{name}: {n_dims} dimensions")
+        dims = [r.unpack("<Q" if wide else "<I") for _ in range(n_dims)]
+        infos.append((name, dims, r.unpack("<I"), r.unpack("<Q")))
+
+    alignment = report.metadata.get("general.alignment", DEFAULT_ALIGNMENT)
+    if not isinstance(alignment, int) or alignment <= 0:
+        alignment = DEFAULT_ALIGNMENT
+    data_start = (r.offset + alignment - 1) // alignment * alignment
+    data_size = report.size - data_start
+
+    spans = []
+    for name, dims, type_id, offset in infos:
+        count = 1
+        for dim in dims:
+            count *= dim
+        report.tensors += 1
+        report.params += count
+        if type_id not in GGML_TYPES:
+            report.errors.append(f"{name}: unknown ggml type {type_id}")
+            continue
+        nbytes = tensor_nbytes(type_id, count)
+        type_name = GGML_TYPES[type_id][0]
+        report.types[type_name] = report.types.get(type_name, 0) + nbytes
+        report.tensor_bytes += nbytes
+        if offset % alignment:
+            report.errors.append(f"{name}: offset {offset} is not {alignment}-byte aligned")
+        elif offset + nbytes > data_size:
+            report.errors.append(f"{name}: ends at {offset + nbytes}, data section is only {data_size} bytes (truncated?)")
+        spans.append((offset, offset + nbytes, name))
+
+    spans.sort()
+    for (_, prev_end, prev), (begin, _, name) in zip(spans, spans[1:]):
+        if begin < prev_end:
+            report.errors.append(f"{name} overlaps {prev}")
+            break
+
+
+def gguf_files(roots: Iterable[Path]) -> List[Path]:
+    """Every .gguf file directly inside the given folders (or the files themselves)"""
+    files = []
+    for root in roots:
+        root = Path(root)
+        if root.is_file():
+            files.append(root)
+        elif root.is_dir():
+            files.extend(sorted(p for p in root.iterdir() if p.suffix == ".gguf" and p.is_file()))
+    return files
+
+
+def variant_quant(name: str) -> str:
+    """Quant label in a variant filename, e.g. Q4_K_M"""
+    match = re.search(r"(Q\d_K_[SM]|Q\d_K|Q\d_\d)", name)
+    return match.group(1) if match else ""
+
+
+def estimate_size(variant: str, params: int = DEFAULT_PARAMS) -> int:
+    """Rough file size of a variant from its quant's average bits per weight"""
+    bpw = QUANT_BPW.get(variant_quant(variant), 16.0)
+    return int(params * bpw / 8)
+
+
+def recommend(variants: Iterable[str], budget: int, sizes: Optional[Dict[str, int]] = None,
+              params: int = DEFAULT_PARAMS, headroom: int = DEFAULT_HEADROOM) -> Optional[str]:
+    """Best-quality variant whose weights plus headroom fit in budget bytes
+
+    sizes holds known file sizes (local or cached remote) and wins over the
+    bits-per-weight estimate. Returns None if not even the smallest fits.
+    """
+    sizes = sizes or {}
+    best = None
+    best_rank = -1
+    for variant in variants:
+        quant = variant_quant(variant)
+        if quant not in QUANT_BPW:
+            continue
+        size = sizes.get(variant, -1)
+        if size < 0:
+            size = estimate_size(variant, params)
+        rank = QUANT_QUALITY.index(quant)
+        if size + headroom <= budget and rank > best_rank:
+            best, best_rank = variant, rank
+    return best
+
+
+def _nvidia_vram() -> int:
+    """Total memory of the largest NVIDIA GPU in bytes, 0 if unknown"""
+    try:
+        out = subprocess.run(["nvidia-smi", "--query-gpu=memory.total", "--format=csv,noheader,nounits"],
+                             capture_output=True, text=True, timeout=10).stdout
+        return max(int(line) for line in out.split() if line.strip().isdigit()) * 1024 ** 2
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return 0
+
+
+def _system_ram() -> int:
+    """Physical memory in bytes, 0 if unknown"""
+    if os.name == "nt":
+        import ctypes
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [("length", ctypes.c_ulong), ("load", ctypes.c_ulong),
+                        ("total_phys", ctypes.c_ulonglong), ("avail_phys", ctypes.c_ulonglong),
+                        ("total_page", ctypes.c_ulonglong), ("avail_page", ctypes.c_ulonglong),
+                        ("total_virtual", ctypes.c_ulonglong), ("avail_virtual", ctypes.c_ulonglong),
+                        ("avail_extended", ctypes.c_ulonglong)]
+
+        status = MemoryStatus()
+        status.length = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.total_phys
+        return 0
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def detect_memory() -> Tuple[int, int]:
+    """(VRAM, RAM) in bytes; either is 0 when it cannot be detected"""
+    return _nvidia_vram(), _system_ram()
+
+
+def format_report(report: GGUFReport) -> str:
+    """One-line summary"""
+    if not report.ok:
+        return f"[BAD] {report.path.name} - {report.errors[0]}"
+    return (f"[OK] {report.path.name} - {report.quant}, {report.bpw:.2f} bpw, "
+            f"{report.params / 1e9:.2f}B params, {report.tensor_bytes / 1073741824:.2f} GB tensors")
+
+
+if __name__ == "__main__":
+    as_json = "--json" in sys.argv
+    roots = [Path(a) for a in sys.argv[1:] if a != "--json"] or [Path(".")]
+    reports = [inspect(p) for p in gguf_files(roots)]
+    if as_json:
+        print(json.dumps([r.as_dict() for r in reports], indent=2))
+    else:
+        for r in reports:
+            print(format_report(r))
+    sys.exit(0 if all(r.ok for r in reports) else 1)
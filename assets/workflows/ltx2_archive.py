@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""Stream zip archives straight into place: entries are inflated as bytes arrive, no temp zip"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+import urllib.error
+import zlib
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, Iterable, List, Optional
+
+from ltx2_download import (BUFFER_SIZE, RETRIES, DownloadError, ProgressCallback, RateLimiter, RetryCallback,
+                           _open)
+from ltx2_mirror import Mirrors
+from ltx2_store import hash_file
+
+MANIFEST_NAME = ".archive.json"
+RETRY_DELAY = 2.0
+
+LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+LOCAL_SIGNATURE = b"PK\x03\x04"
+DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+# Central directory and end records follow the last entry; nothing left to extract
+END_SIGNATURES = (b"PK\x01\x02", b"PK\x05\x06", b"PK\x06\x06", b"PK\x06\x07")
+FLAG_ENCRYPTED = 0x1
+FLAG_DESCRIPTOR = 0x8
+STORED, DEFLATED = 0, 8
+ZIP64_EXTRA = 0x0001
+
+
+class Archive:
+    """A zip asset and the folder its entries belong in
+
+    files lists the entries a complete install has; sha256 maps entry names
+    to known digests. Entries are always checked against the CRC-32 stored
+    in the archive itself.
+    """
+
+    def __init__(self, name: str, url: str, dest: Path, files: Iterable[str] = (),
+                 sha256: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.url = url
+        self.dest = Path(dest)
+        self.files = tuple(files)
+        self.sha256 = sha256 or {}
+
+
+INSIGHTFACE_DIR = Path(os.environ.get("INSIGHTFACE_HOME", Path.home() / ".insightface")) / "models"
+ARCHIVES = {
+    "buffalo_l": Archive(
+        "buffalo_l",
+        "https://github.com/deepinsight/insightface/releases/download/v0.7/buffalo_l.zip",
+        INSIGHTFACE_DIR / "buffalo_l",
+        ("1k3d68.onnx", "2d106det.onnx", "det_10g.onnx", "genderage.onnx", "w600k_r50.onnx"),
+    ),
+}
+
+
+class _Stream:
+    """Sequential reads over the first source that answers, resuming with Range after a dropped connection"""
+
+    def __init__(self, url: str, mirrors: Mirrors, progress: Optional[ProgressCallback] = None,
+                 limiter: Optional[RateLimiter] = None, on_retry: Optional[RetryCallback] = None):
+        self.url = url
+        self.progress = progress
+        self.limiter = limiter
+        self.on_retry = on_retry
+        self.local = mirrors.local(url)
+        self.remotes = mirrors.remotes(url)
+        if not self.local and not self.remotes:
+            raise DownloadError(f"{url}: not in any local mirror (offline)")
+        self.offset = 0
+        self.total = -1
+        self.pending = b""
+        self.source = None
+        self.resp = None
+
+    def close(self):
+        if self.resp is not None:
+            self.resp.close()
+            self.resp = None
+
+    def _connect(self):
+        """Open the next source at self.offset"""
+        errors = []
+        if self.local:
+            self.resp = open(self.local, "rb")
+            self.resp.seek(self.offset)
+            self.total = self.local.stat().st_size
+            self.source = str(self.local)
+            return
+        for candidate in self.remotes:
+            for attempt in range(RETRIES):
+                try:
+                    resp = _open(candidate, {"Range": f"bytes={self.offset}-"} if self.offset else None)
+                    if self.offset and resp.status != 206:
+                        # Server ignored the range; throw away what we already have
+                        skip = self.offset
+                        while skip:
+                            block = resp.read(min(skip, BUFFER_SIZE))
+                            if not block:
+                                raise OSError(f"body ended before byte {self.offset}")
+                            skip -= len(block)
+                except (urllib.error.URLError, OSError, ValueError) as e:
+                    errors.append(f"{candidate}: {e}")
+                    if isinstance(e, urllib.error.HTTPError) and e.code < 500 and e.code != 429:
+                        # Not there; retrying will not change that
+                        break
+                    if self.on_retry:
+                        self.on_retry(errors[-1])
+                    time.sleep(RETRY_DELAY * (attempt + 1))
+                    continue
+                length = int(resp.headers.get("Content-Length") or -1)
+                if self.total < 0 and length >= 0:
+                    self.total = self.offset + length
+                self.resp = resp
+                self.source = candidate
+                return
+        raise DownloadError(errors[-1] if errors else f"{self.url}: no source")
+
+    def _fill(self, n: int) -> bytes:
+        """Up to n new bytes from the source, b'' at the end"""
+        failures = 0
+        while True:
+            if self.resp is None:
+                self._connect()
+            try:
+                block = self.resp.read(n)
+            except (urllib.error.URLError, OSError) as e:
+                self.close()
+                failures += 1
+                if self.local or failures > RETRIES:
+                    raise DownloadError(f"{self.source}: {e}") from e
+                if self.on_retry:
+                    self.on_retry(f"{self.source}: {e}; resuming at {self.offset}")
+                continue
+            if not block and 0 <= self.offset < self.total and not self.local:
+                # Connection closed early without an error
+                self.close()
+                failures += 1
+                if failures > RETRIES:
+                    raise DownloadError(f"{self.source}: ended at {self.offset} of {self.total} bytes")
+                if self.on_retry:
+                    self.on_retry(f"{self.source}: connection closed; resuming at {self.offset}")
+                continue
+            self.offset += len(block)
+            if self.limiter:
+                self.limiter.consume(len(block))
+            if self.progress:
+                self.progress(self.offset, self.total)
+            return block
+
+    def read_some(self, n: int = BUFFER_SIZE) -> bytes:
+        if self.pending:
+            block, self.pending = self.pending[:n], self.pending[n:]
+            return block
+        return self._fill(n)
+
+    def read(self, n: int) -> bytes:
+        """Exactly n bytes, or DownloadError if the archive ends first"""
+        parts, need = [], n
+        while need:
+            block = self.read_some(need)
+            if not block:
+                raise DownloadError(f"{self.url}: archive truncated")
+            parts.append(block)
+            need -= len(block)
+        return b"".join(parts)
+
+    def unread(self, data: bytes):
+        self.pending = data + self.pending
+
+
+def _zip64_sizes(extra: bytes, compressed: int, size: int):
+    """Real sizes from the zip64 extra field when the header holds 0xFFFFFFFF placeholders"""
+    offset = 0
+    while offset + 4 <= len(extra):
+        tag, length = struct.unpack_from("<HH", extra, offset)
+        if tag == ZIP64_EXTRA:
+            values = iter(struct.unpack_from(f"<{length // 8}Q", extra, offset + 4))
+            if size == 0xFFFFFFFF:
+                size = next(values)
+            if compressed == 0xFFFFFFFF:
+                compressed = next(values)
+            return compressed, size, True
+        offset += 4 + length
+    return compressed, size, False
+
+
+def _entry_path(name: str, dest: Path) -> Optional[PurePosixPath]:
+    """Where an entry goes below dest; a leading folder named like dest is dropped; None for folders"""
+    parts = PurePosixPath(name.replace("\\", "/")).parts
+    if not parts or name.endswith("/"):
+        return None
+    if parts[0] in ("/", "..") or ".." in parts or ":" in parts[0]:
+        raise DownloadError(f"unsafe path in archive: {name}")
+    if len(parts) > 1 and parts[0] == dest.name:
+        parts = parts[1:]
+    return PurePosixPath(*parts)
+
+
+def _write_entry(stream: _Stream, dest: Path, rel: PurePosixPath, flags: int, method: int,
+                 compressed: int, expected_crc: int, zip64: bool) -> dict:
+    """Inflate one entry into dest/rel through a .part file; returns its size and SHA-256"""
+    target = dest / rel
+    target.parent.mkdir(parents=True, exist_ok=True)
+    part = target.with_name(target.name + ".part")
+    inflater = zlib.decompressobj(-15) if method == DEFLATED else None
+    sized = not flags & FLAG_DESCRIPTOR or compressed not in (0, 0xFFFFFFFF)
+    if not sized and inflater is None:
+        raise DownloadError(f"{rel}: stored entry without sizes cannot be streamed")
+    crc, size, digest = 0, 0, hashlib.sha256()
+    remaining = compressed
+    try:
+        with open(part, "wb") as f:
+            while True:
+                if sized:
+                    if not remaining:
+                        break
+                    block = stream.read_some(min(remaining, BUFFER_SIZE))
+                    if not block:
+                        raise DownloadError(f"{rel}: archive truncated")
+                    remaining -= len(block)
+                else:
+                    block = stream.read_some()
+                    if not block:
+                        raise DownloadError(f"{rel}: archive truncated")
+                data = inflater.decompress(block) if inflater else block
+                if inflater and inflater.unused_data and not sized:
+                    # Deflate marks its own end; the rest belongs to the next record
+                    stream.unread(inflater.unused_data)
+                f.write(data)
+                crc = zlib.crc32(data, crc)
+                size += len(data)
+                digest.update(data)
+                if inflater and inflater.eof:
+                    break
+            if inflater and not inflater.eof:
+                raise DownloadError(f"{rel}: deflate stream incomplete")
+            if sized and remaining:
+                stream.read(remaining)
+        if flags & FLAG_DESCRIPTOR:
+            head = stream.read(4)
+            if head != DESCRIPTOR_SIGNATURE:
+                stream.unread(head)
+            expected_crc = struct.unpack("<I", stream.read(4))[0]
+            stream.read(16 if zip64 else 8)
+        if crc != expected_crc:
+            raise DownloadError(f"{rel}: CRC-32 mismatch")
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    return {"part": part, "target": target, "size": size, "sha256": digest.hexdigest()}
+
+
+def extract_stream(stream: _Stream, dest: Path, sha256: Optional[Dict[str, str]] = None,
+                   log: Callable[[str], None] = print) -> Dict[str, dict]:
+    """Extract every entry of a zip read front to back; returns {name: {size, sha256}}
+
+    Each entry is moved into place only after its CRC-32 (and SHA-256, if
+    known) checks out, so an interrupted run never leaves a half-written file
+    under its real name.
+    """
+    sha256 = sha256 or {}
+    files = {}
+    while True:
+        # Only a central directory or end record ends the archive; running out of data first is truncation
+        try:
+            signature = stream.read(4)
+        except DownloadError as e:
+            raise DownloadError(f"{e} after {len(files)} entries, before the central directory") from e
+        if signature in END_SIGNATURES:
+            break
+        if signature != LOCAL_SIGNATURE:
+            raise DownloadError(f"not a zip archive (record {signature!r} at {stream.offset - 4})")
+        header = LOCAL_HEADER.unpack(signature + stream.read(LOCAL_HEADER.size - 4))
+        _, _, flags, method, _, _, crc, compressed, size, name_length, extra_length = header
+        name = stream.read(name_length).decode("utf-8" if flags & 0x800 else "cp437")
+        extra = stream.read(extra_length)
+        compressed, size, zip64 = _zip64_sizes(extra, compressed, size)
+        if flags & FLAG_ENCRYPTED:
+            raise DownloadError(f"{name}: encrypted entries are not supported")
+        if method not in (STORED, DEFLATED):
+            raise DownloadError(f"{name}: compression method {method} is not supported")
+        rel = _entry_path(name, dest)
+        if rel is None:
+            if compressed:
+                stream.read(compressed)
+            continue
+        entry = _write_entry(stream, dest, rel, flags, method, compressed, crc, zip64)
+        expected = sha256.get(str(rel), "")
+        if expected and entry["sha256"] != expected:
+            entry["part"].unlink(missing_ok=True)
+            raise DownloadError(f"{rel}: SHA-256 mismatch: expected {expected}, got {entry['sha256']}")
+        os.replace(entry["part"], entry["target"])
+        files[str(rel)] = {"size": entry["size"], "sha256": entry["sha256"],
+                           "mtime_ns": entry["target"].stat().st_mtime_ns}
+        log(f"[OK] {rel} ({entry['size'] / 1024 ** 2:.1f} MB)")
+    return files
+
+
+def read_manifest(dest: Path) -> dict:
+    try:
+        return json.loads((dest / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def is_complete(archive: Archive) -> bool:
+    """Every expected entry is on disk with the SHA-256 it should have
+
+    Pinned digests (archive.sha256) win over the ones our last extraction
+    recorded in the manifest; an entry with neither is not trusted. A file
+    is only rehashed when its size or mtime moved since that extraction.
+    """
+    recorded = read_manifest(archive.dest).get("files", {})
+    names = set(archive.files) | set(recorded)
+    if not names:
+        return False
+    for name in names:
+        path = archive.dest / name
+        entry = recorded.get(name, {})
+        expected = archive.sha256.get(name) or entry.get("sha256")
+        if not expected:
+            return False
+        try:
+            st = path.stat()
+        except OSError:
+            return False
+        if st.st_size == entry.get("size") and st.st_mtime_ns == entry.get("mtime_ns"):
+            digest = entry.get("sha256")
+        else:
+            digest = hash_file(path)
+        if digest != expected:
+            return False
+    return True
+
+
+def fetch(archive: Archive, mirrors: Optional[Mirrors] = None, force: bool = False,
+          progress: Optional[ProgressCallback] = None, limiter: Optional[RateLimiter] = None,
+          on_retry: Optional[RetryCallback] = None, log: Callable[[str], None] = print) -> bool:
+    """Install an archive unless it already is; returns True if anything was downloaded"""
+    if not force and is_complete(archive):
+        return False
+    archive.dest.mkdir(parents=True, exist_ok=True)
+    stream = _Stream(archive.url, mirrors or Mirrors.from_env(), progress, limiter, on_retry)
+    try:
+        files = extract_stream(stream, archive.dest, archive.sha256, log)
+    finally:
+        stream.close()
+    missing = [name for name in archive.files if name not in files]
+    if missing:
+        raise DownloadError(f"{archive.url}: archive lacks {', '.join(missing)}")
+    manifest = {"url": archive.url, "files": files}
+    tmp = archive.dest / (MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, archive.dest / MANIFEST_NAME)
+    return True
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Download and extract zip assets in one streaming pass")
+    parser.add_argument("names", nargs="*", help=f"archives to install ({', '.join(ARCHIVES)}; default: all)")
+    parser.add_argument("--url", help="any zip URL instead of a named archive (needs --dest)")
+    parser.add_argument("--dest", type=Path)
+    parser.add_argument("--force", action="store_true", help="download even if already complete")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        if not args.dest:
+            parser.error("--url needs --dest")
+        archives = [Archive(args.dest.name, args.url, args.dest)]
+    else:
+        unknown = [n for n in args.names if n not in ARCHIVES]
+        if unknown:
+            parser.error(f"unknown archive: {', '.join(unknown)}")
+        archives = [ARCHIVES[n] for n in args.names or ARCHIVES]
+
+    failed = 0
+    for archive in archives:
+        try:
+            if fetch(archive, force=args.force,
+                     on_retry=lambda msg: print(f"[RETRY] {msg}", file=sys.stderr)):
+                print(f"[OK] {archive.name} -> {archive.dest}")
+            else:
+                print(f"[SKIP] {archive.name}: already complete in {archive.dest}")
+        except (DownloadError, OSError) as e:
+            failed += 1
+            print(f"[FAIL] {archive.name}: {e}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
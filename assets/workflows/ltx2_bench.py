@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""Benchmark the download engine against a local Hugging Face-style stub server
+
+Everything runs on localhost. The stub answers /<repo>/resolve/main/<file>
+with a 302 to a /cdn/ path (carrying X-Linked-Etag like HF does), serves
+byte ranges from a sparse file, and can throttle each connection and inject
+connection resets and stalls. It runs in its own process so its CPU time
+does not count against the client. Results are saved as JSON and compared
+with the previous run to catch regressions.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from ltx2_download import DownloadError, download, head, part_path, resumable_bytes, sidecar_path
+
+SCRIPT_DIR = Path(__file__).parent
+RESULTS_DIR = SCRIPT_DIR / "bench_results"
+STUB_FILE = "bench.safetensors"
+BLOCK = 256 * 1024
+REGRESSION_THRESHOLD = 0.10
+
+# Fault profiles for the stub: per-connection cap in bytes/s, resets and stalls per MB sent
+PROFILES = {
+    "clean": {},
+    "throttled": {"throttle": 40 * 1024 * 1024},
+    "resets": {"reset_rate": 0.002},
+    "stalls": {"stall_rate": 0.001, "stall_seconds": 2.0},
+}
+
+
+class _StubState:
+    """Fault settings and counters shared by every stub connection"""
+
+    def __init__(self, path: Path, sha256: str):
+        self.path = path
+        self.size = path.stat().st_size
+        self.sha256 = sha256
+        self.lock = threading.Lock()
+        self.random = random.Random(1234)
+        self.configure({})
+
+    def configure(self, settings: dict):
+        with self.lock:
+            self.throttle = settings.get("throttle", 0)
+            self.reset_rate = settings.get("reset_rate", 0.0)
+            self.stall_rate = settings.get("stall_rate", 0.0)
+            self.stall_seconds = settings.get("stall_seconds", 0.0)
+            self.sent = 0
+            self.requests = 0
+            self.resets = 0
+            self.stalls = 0
+
+    def roll(self, rate: float, nbytes: int) -> bool:
+        """True with probability rate per MB of nbytes"""
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.random.random() < rate * nbytes / 1048576
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"sent": self.sent, "requests": self.requests, "resets": self.resets, "stalls": self.stalls}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: _StubState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, data: dict):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _redirect(self):
+        state = self.state
+        self.send_response(302)
+        self.send_header("Location", f"/cdn/{STUB_FILE}?Expires={int(time.time()) + 3600}&Signature=stub")
+        self.send_header("X-Linked-Etag", f'"{state.sha256}"')
+        self.send_header("X-Linked-Size", str(state.size))
+        self.send_header("ETag", '"stub-git-oid"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _reset(self):
+        """Drop the connection with a TCP RST, like a flaky CDN edge"""
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        self.close_connection = True
+        self.connection.close()
+
+    def _serve(self, body: bool):
+        state = self.state
+        with state.lock:
+            state.requests += 1
+        start, end = 0, state.size - 1
+        rng = self.headers.get("Range", "")
+        if rng.startswith("bytes="):
+            first, _, last = rng[6:].partition("-")
+            start, end = int(first), min(int(last), state.size - 1) if last else state.size - 1
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{state.size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{state.sha256}"')
+        self.end_headers()
+        if not body:
+            return
+
+        began = time.monotonic()
+        sent = 0
+        with open(state.path, "rb") as f:
+            f.seek(start)
+            pos = start
+            while pos <= end:
+                block = f.read(min(BLOCK, end - pos + 1))
+                if not block:
+                    break
+                if state.roll(state.stall_rate, len(block)):
+                    with state.lock:
+                        state.stalls += 1
+                    time.sleep(state.stall_seconds)
+                if state.roll(state.reset_rate, len(block)):
+                    with state.lock:
+                        state.resets += 1
+                    self._reset()
+                    return
+                try:
+                    self.wfile.write(block)
+                except OSError:
+                    return
+                pos += len(block)
+                sent += len(block)
+                with state.lock:
+                    state.sent += len(block)
+                if state.throttle:
+                    ahead = sent / state.throttle - (time.monotonic() - began)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+    def do_HEAD(self):
+        path = urlsplit(self.path).path
+        if "/resolve/main/" in path:
+            self._redirect()
+        elif path.startswith("/cdn/"):
+            self._serve(False)
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/_stats":
+            self._json(self.state.stats())
+        elif "/resolve/main/" in path:
+            self._redirect()
+        elif path.startswith("/cdn/"):
+            self._serve(True)
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.state.configure(json.loads(self.rfile.read(length) or b"{}"))
+        self._json({"ok": True})
+
+
+def zero_sha256(size: int) -> str:
+    """SHA-256 of size zero bytes, which is what a sparse file reads back as"""
+    sha = hashlib.sha256()
+    block = bytes(8 * 1024 * 1024)
+    left = size
+    while left > 0:
+        sha.update(block[:min(left, len(block))])
+        left -= len(block)
+    return sha.hexdigest()
+
+
+def make_sparse(path: Path, size: int) -> Path:
+    """A file of size bytes that takes (almost) no disk space"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not path.exists() or path.stat().st_size != size:
+        with open(path, "wb") as f:
+            f.truncate(size)
+    return path
+
+
+def run_stub(path: Path, port: int):
+    """Child-process entry point: serve path until killed, announcing the port on stdout"""
+    state = _StubState(path, zero_sha256(path.stat().st_size))
+    handler = type("StubHandler", (_StubHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    print(f"PORT {server.server_port}", flush=True)
+    server.serve_forever()
+
+
+class _Interrupt(Exception):
+    """Raised from the progress callback to simulate a killed download"""
+
+
+class _RssSampler:
+    """Peak resident memory of this process while a case runs"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def rss() -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            pass
+        try:
+            import resource
+            scale = 1 if sys.platform == "darwin" else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        except ImportError:
+            return 0
+
+    def _run(self):
+        while not self.stop.is_set():
+            self.peak = max(self.peak, self.rss())
+            self.stop.wait(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+        self.peak = max(self.peak, self.rss())
+
+
+class Stub:
+    """Handle on the stub server child process"""
+
+    def __init__(self, path: Path):
+        self.proc = subprocess.Popen([sys.executable, __file__, "stub", str(path)],
+                                     stdout=subprocess.PIPE, text=True)
+        line = self.proc.stdout.readline()
+        if not line.startswith("PORT "):
+            self.proc.kill()
+            raise RuntimeError("stub server did not start")
+        self.base = f"http://127.0.0.1:{int(line.split()[1])}"
+        self.url = f"{self.base}/bench/stub/resolve/main/{STUB_FILE}"
+
+    def configure(self, settings: dict):
+        request = urllib.request.Request(self.base + "/_config", data=json.dumps(settings).encode(),
+                                         method="POST")
+        urllib.request.urlopen(request, timeout=10).read()
+
+    def stats(self) -> dict:
+        return json.loads(urllib.request.urlopen(self.base + "/_stats", timeout=10).read())
+
+    def close(self):
+        self.proc.kill()
+        self.proc.wait()
+
+
+def _clean(dest: Path):
+    for path in (dest, part_path(dest), sidecar_path(dest)):
+        path.unlink(missing_ok=True)
+
+
+def fetch_once(stub: Stub, dest: Path, connections: int, chunks: int,
+               interrupt_at: float = 0) -> dict:
+    """One download (or partial download) with timing, CPU, memory and retry figures"""
+    first = []
+    retries = []
+    sent_before = stub.stats()["sent"]
+
+    def progress(done: int, total: int):
+        if not first:
+            first.append(time.perf_counter())
+        if interrupt_at and done >= total * interrupt_at:
+            raise _Interrupt()
+
+    cpu = os.times()
+    start = time.perf_counter()
+    interrupted = False
+    error = ""
+    with _RssSampler() as rss:
+        try:
+            download(stub.url, dest, connections, chunks, progress, None, "", retries.append)
+        except _Interrupt:
+            interrupted = True
+        except DownloadError as e:
+            error = str(e)
+    elapsed = time.perf_counter() - start
+    cpu_after = os.times()
+    return {
+        "seconds": round(elapsed, 3),
+        "ttfb": round(first[0] - start, 4) if first else None,
+        "cpu_seconds": round((cpu_after.user - cpu.user) + (cpu_after.system - cpu.system), 3),
+        "peak_rss": rss.peak,
+        "retries": len(retries),
+        "served": stub.stats()["sent"] - sent_before,
+        "interrupted": interrupted,
+        "error": error,
+    }
+
+
+def run_case(stub: Stub, work: Path, size: int, profile: str, connections: int, chunks: int) -> dict:
+    """Full download under one fault profile"""
+    stub.configure(PROFILES[profile])
+    dest = work / STUB_FILE
+    _clean(dest)
+    result = fetch_once(stub, dest, connections, chunks)
+    result.update(case="download", profile=profile, connections=connections, chunks=chunks, size=size,
+                  throughput=round(size / result["seconds"]) if not result["error"] else 0,
+                  faults=stub.stats())
+    _clean(dest)
+    return result
+
+
+def run_resume_case(stub: Stub, work: Path, size: int, connections: int, chunks: int) -> dict:
+    """Interrupt halfway, then resume; the cost is time plus bytes fetched twice"""
+    stub.configure({})
+    dest = work / STUB_FILE
+    _clean(dest)
+    first = fetch_once(stub, dest, connections, chunks, interrupt_at=0.5)
+    kept = resumable_bytes(dest)
+    second = fetch_once(stub, dest, connections, chunks)
+    remaining = size - kept
+    _clean(dest)
+    return {
+        "case": "resume", "profile": "clean", "connections": connections, "chunks": chunks, "size": size,
+        "kept_bytes": kept,
+        "seconds": second["seconds"],
+        "throughput": round(remaining / second["seconds"]) if second["seconds"] and not second["error"] else 0,
+        "refetched_bytes": max(second["served"] - remaining, 0) + max(first["served"] - kept, 0),
+        "ttfb": second["ttfb"],
+        "cpu_seconds": first["cpu_seconds"] + second["cpu_seconds"],
+        "peak_rss": max(first["peak_rss"], second["peak_rss"]),
+        "retries": first["retries"] + second["retries"],
+        "error": second["error"],
+    }
+
+
+def check_head(stub: Stub, size: int) -> dict:
+    """head() through the HF-style redirect must reach the CDN as a HEAD: one request, no body bytes"""
+    stub.configure({})
+    before = stub.stats()
+    error = ""
+    try:
+        info = head(stub.url)
+        if info is None or info.length != size:
+            error = f"unexpected answer {info and info.length}"
+    except DownloadError as e:
+        error = str(e)
+    after = stub.stats()
+    result = {"requests": after["requests"] - before["requests"], "sent": after["sent"] - before["sent"]}
+    if not error and (result["requests"] != 1 or result["sent"]):
+        error = f"{result['requests']} CDN requests, {result['sent']} body bytes sent"
+    result["error"] = error
+    return result
+
+
+def _case_key(result: dict) -> str:
+    return f"{result['case']}/{result['profile']}/c{result['connections']}"
+
+
+def _version() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=SCRIPT_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def compare(current: List[dict], previous: List[dict], threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Lines describing throughput changes; regressions are prefixed with [SLOW]"""
+    before = {_case_key(r): r for r in previous}
+    lines = []
+    for result in current:
+        old = before.get(_case_key(result))
+        if not old or not old.get("throughput") or not result.get("throughput"):
+            continue
+        change = result["throughput"] / old["throughput"] - 1
+        marker = "[SLOW]" if change < -threshold else "[OK]"
+        lines.append(f"{marker:6} {_case_key(result):28} {change:+.1%}")
+    return lines
+
+
+def format_result(result: dict) -> str:
+    mb = 1048576
+    line = (f"{_case_key(result):28} {result['throughput'] / mb:8.1f} MB/s  "
+            f"ttfb {result['ttfb'] or 0:6.3f}s  cpu {result['cpu_seconds']:6.2f}s  "
+            f"rss {result['peak_rss'] / mb:6.0f} MB  retries {result['retries']}")
+    if result["case"] == "resume":
+        line += f"  refetched {result['refetched_bytes'] / mb:.1f} MB"
+    if result["error"]:
+        line += f"  ERROR {result['error']}"
+    return line
+
+
+def latest_results(out: Path, exclude: Optional[Path] = None) -> Optional[Path]:
+    runs = sorted(p for p in out.glob("bench-*.json") if p != exclude)
+    return runs[-1] if runs else None
+
+
+def bench(size: int, connections: List[int], profiles: List[str], chunks: int, work: Path,
+          out: Path, baseline: Optional[Path] = None) -> Dict:
+    """Run the matrix, save the results and compare them with the baseline (or the last run)"""
+    work.mkdir(parents=True, exist_ok=True)
+    sparse = make_sparse(work / "stub" / STUB_FILE, size)
+    stub = Stub(sparse)
+    results = []
+    try:
+        checked = check_head(stub, size)
+        print(f"[BAD] head(): {checked['error']}" if checked["error"] else "[OK] head() stays a HEAD after redirect",
+              flush=True)
+        for profile in profiles:
+            for count in connections:
+                result = run_case(stub, work, size, profile, count, chunks)
+                print(format_result(result), flush=True)
+                results.append(result)
+        for count in connections:
+            result = run_resume_case(stub, work, size, count, chunks)
+            print(format_result(result), flush=True)
+            results.append(result)
+    finally:
+        stub.close()
+
+    out.mkdir(parents=True, exist_ok=True)
+    baseline = baseline or latest_results(out)
+    report = {
+        "version": _version(),
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "results": results,
+        "head": checked,
+    }
+    path = out / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    path.write_text(json.dumps(report, indent=1), encoding="utf-8")
+    print(f"\nSaved {path}")
+    if baseline:
+        previous = json.loads(baseline.read_text(encoding="utf-8"))
+        print(f"Compared with {baseline.name} ({previous.get('version') or 'unknown version'}):")
+        report["comparison"] = compare(results, previous["results"])
+        for line in report["comparison"]:
+            print(line)
+    return report
+
+
+def main(argv: List[str]) -> int:
+    if argv[:1] == ["stub"]:
+        run_stub(Path(argv[1]), 0)
+        return 0
+
+    parser = argparse.ArgumentParser(description="Benchmark the LTX-2 download engine offline")
+    parser.add_argument("--size-gb", type=float, default=2.0, help="synthetic file size (sparse)")
+    parser.add_argument("--connections", default="1,4,8,16", help="comma-separated connection counts")
+    parser.add_argument("--profiles", default=",".join(PROFILES),
+                        help=f"comma-separated fault profiles: {', '.join(PROFILES)}")
+    parser.add_argument("--chunks", type=int, default=32)
+    parser.add_argument("--work", type=Path, default=SCRIPT_DIR / "bench_work",
+                        help="scratch directory (needs room for one full download)")
+    parser.add_argument("--out", type=Path, default=RESULTS_DIR)
+    parser.add_argument("--baseline", type=Path, help="results file to compare against (default: latest)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help=f"exit 1 if any case is more than {REGRESSION_THRESHOLD:.0%} slower")
+    args = parser.parse_args(argv)
+
+    profiles = [p for p in args.profiles.split(",") if p]
+    unknown = [p for p in profiles if p not in PROFILES]
+    if unknown:
+        parser.error(f"unknown profile(s): {', '.join(unknown)}")
+    report = bench(int(args.size_gb * 1024 ** 3), [int(c) for c in args.connections.split(",")],
+                   profiles, args.chunks, args.work, args.out, args.baseline)
+    slow = [line for line in report.get("comparison", []) if line.startswith("[SLOW]")]
+    if report["head"]["error"]:
+        return 1
+    return 1 if slow and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""Segmented HTTP download engine for the LTX-2 workflow manager"""
+
+import hashlib
+import http.client
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+# Tunables
+DEFAULT_CONNECTIONS = 8
+DEFAULT_CHUNKS = 32
+MIN_CHUNK_SIZE = 8 * 1024 * 1024
+BUFFER_SIZE = 1024 * 1024
+TIMEOUT = 30
+RETRIES = 5
+SAVE_INTERVAL = 2.0
+USER_AGENT = "ltx2-manager/1.0"
+
+ProgressCallback = Callable[[int, int], None]
+RetryCallback = Callable[[str], None]
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class DownloadError(Exception):
+    """Raised when a file cannot be downloaded"""
+
+
+class RemoteInfo:
+    """What the server told us about a URL"""
+
+    def __init__(self, url: str, final_url: str, length: int, ranges: bool, etag: str = "",
+                 sha256: str = "", last_modified: str = ""):
+        self.url = url
+        self.final_url = final_url
+        self.length = length
+        self.ranges = ranges
+        self.etag = etag
+        self.sha256 = sha256
+        self.last_modified = last_modified
+
+
+def _sha256_tag(value: str) -> str:
+    """The SHA-256 in an ETag-style header, or '' if it does not hold one"""
+    value = value.strip().strip('"').lower()
+    if value.startswith("w/"):
+        return ""
+    return value if SHA256_RE.match(value) else ""
+
+
+class _RedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Keeps the LFS oid Hugging Face only sends on the redirect itself"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        new = super().redirect_request(req, fp, code, msg, headers, newurl)
+        if new is not None:
+            # The base class rebuilds the request without its method, turning a HEAD into a full GET
+            if req.get_method() == "HEAD":
+                new.method = "HEAD"
+            new.linked = getattr(req, "linked", {})
+            for name in ("X-Linked-Etag", "X-Linked-Size"):
+                if headers.get(name):
+                    new.linked[name] = headers[name]
+        return new
+
+
+_opener = urllib.request.build_opener(_RedirectHandler)
+
+
+def _open(url: str, headers: Optional[dict] = None, linked: Optional[dict] = None, method: str = "GET"):
+    """Open a URL, following redirects; headers seen on redirects land in linked"""
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, **(headers or {})},
+                                     method=method)
+    request.linked = linked if linked is not None else {}
+    try:
+        return _opener.open(request, timeout=TIMEOUT)
+    except http.client.HTTPException as e:
+        # InvalidURL, BadStatusLine...: not OSErrors, but just as much a failed source
+        raise DownloadError(f"{url}: {e!r}") from e
+
+
+def probe(url: str) -> RemoteInfo:
+    """Resolve redirects and find out whether the server supports byte ranges"""
+    linked = {}
+    try:
+        with _open(url, {"Range": "bytes=0-0"}, linked) as resp:
+            final_url = resp.geturl()
+            etag = resp.headers.get("ETag", "")
+            modified = resp.headers.get("Last-Modified", "")
+            sha256 = _sha256_tag(linked.get("X-Linked-Etag", "")) or _sha256_tag(etag)
+            content_range = resp.headers.get("Content-Range", "")
+            if resp.status == 206 and "/" in content_range:
+                total = content_range.rsplit("/", 1)[1].strip()
+                if total.isdigit():
+                    return RemoteInfo(url, final_url, int(total), True, etag, sha256, modified)
+            length = int(resp.headers.get("Content-Length") or -1)
+            return RemoteInfo(url, final_url, length, False, etag, sha256, modified)
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise DownloadError(f"{url}: {e}") from e
+
+
+def head(url: str, etag: str = "", last_modified: str = "") -> Optional[RemoteInfo]:
+    """HEAD a URL, conditionally if validators are given; None means 304 Not Modified"""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    linked = {}
+    try:
+        with _open(url, headers, linked, method="HEAD") as resp:
+            h = resp.headers
+            length = h.get("Content-Length") or linked.get("X-Linked-Size") or "-1"
+            return RemoteInfo(
+                url, resp.geturl(), int(length),
+                h.get("Accept-Ranges", "").lower() == "bytes",
+                h.get("ETag", ""),
+                _sha256_tag(linked.get("X-Linked-Etag", "")) or _sha256_tag(h.get("ETag", "")),
+                h.get("Last-Modified", ""),
+            )
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None
+        raise DownloadError(f"{url}: {e}") from e
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise DownloadError(f"{url}: {e}") from e
+
+
+def split_ranges(length: int, chunks: int) -> List[Tuple[int, int]]:
+    """Split [0, length) into inclusive byte ranges of roughly equal size"""
+    if length <= 0:
+        return []
+    chunks = max(1, min(chunks, length // MIN_CHUNK_SIZE or 1))
+    size = -(-length // chunks)
+    return [(start, min(start + size, length) - 1) for start in range(0, length, size)]
+
+
+def part_path(dest: Path) -> Path:
+    """Where the in-progress bytes for dest live"""
+    return dest.with_name(dest.name + ".part")
+
+
+def sidecar_path(dest: Path) -> Path:
+    """Where the resume state for dest lives"""
+    return dest.with_name(dest.name + ".part.json")
+
+
+def resumable_bytes(dest: Path) -> int:
+    """Bytes already sitting in dest.part according to its resume state"""
+    try:
+        data = json.loads(sidecar_path(dest).read_text(encoding="utf-8"))
+        return sum(pos - start for start, _, pos in data.get("segments", []))
+    except (OSError, ValueError, TypeError):
+        return 0
+
+
+class _State:
+    """Per-segment resume state, persisted next to the .part file"""
+
+    def __init__(self, dest: Path, info: RemoteInfo, segments: List[List[int]]):
+        self.dest = dest
+        self.info = info
+        self.segments = segments  # [start, end, next byte to fetch]
+        self.lock = threading.Lock()
+        self.saved_at = 0.0
+
+    @property
+    def done(self) -> int:
+        return sum(pos - start for start, _, pos in self.segments)
+
+    @property
+    def frontier(self) -> int:
+        """End of the contiguous run of written bytes starting at zero"""
+        for _, end, pos in self.segments:
+            if pos <= end:
+                return pos
+        return self.info.length
+
+    @classmethod
+    def load(cls, dest: Path, info: RemoteInfo) -> Optional["_State"]:
+        """Load resume state if it still matches the remote file"""
+        part, sidecar = part_path(dest), sidecar_path(dest)
+        try:
+            data = json.loads(sidecar.read_text(encoding="utf-8"))
+            if not part.exists() or part.stat().st_size != info.length:
+                return None
+        except (OSError, ValueError):
+            return None
+        if data.get("url") != info.url or data.get("length") != info.length:
+            return None
+        if data.get("etag") and info.etag and data["etag"] != info.etag:
+            return None
+        segments = data.get("segments") or []
+        if not all(isinstance(seg, list) and len(seg) == 3 for seg in segments):
+            return None
+        return cls(dest, info, segments)
+
+    def advance(self, index: int, pos: int):
+        """Record progress on one segment and periodically persist it"""
+        with self.lock:
+            self.segments[index][2] = pos
+            if time.monotonic() - self.saved_at >= SAVE_INTERVAL:
+                self._save()
+
+    def save(self):
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        # Make sure the bytes are on disk before claiming them in the sidecar
+        with open(part_path(self.dest), "r+b") as f:
+            os.fsync(f.fileno())
+        sidecar = sidecar_path(self.dest)
+        tmp = sidecar.with_name(sidecar.name + ".tmp")
+        tmp.write_text(json.dumps({
+            "url": self.info.url,
+            "length": self.info.length,
+            "etag": self.info.etag,
+            "segments": self.segments,
+        }), encoding="utf-8")
+        os.replace(tmp, sidecar)
+        self.saved_at = time.monotonic()
+
+
+class RateLimiter:
+    """Token bucket shared by every connection; rate is in bytes per second, 0 means unlimited"""
+
+    def __init__(self, rate: float = 0):
+        self.rate = rate
+        self.tokens = rate
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, n: int):
+        """Account for n bytes, sleeping if we are ahead of the budget"""
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate) - n
+            self.last = now
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class _StreamHash:
+    """SHA-256 over the .part file, fed while segments are being written
+
+    Bytes that land exactly at the hash cursor are taken straight from
+    memory. Segments that finish ahead of it are caught up by reading them
+    back while they are still in the page cache, so a verified download
+    never needs a separate pass over the finished file.
+    """
+
+    def __init__(self, part: Path, frontier: Callable[[], int]):
+        self.sha = hashlib.sha256()
+        self.hashed = 0
+        self.part = part
+        self.frontier = frontier
+        self.lock = threading.Lock()
+
+    def written(self, offset: int, block: bytes):
+        """Called after block has been written at offset"""
+        # Whoever holds the lock is already catching up past this block
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            if offset == self.hashed:
+                self.sha.update(block)
+                self.hashed += len(block)
+            self._catch_up()
+        finally:
+            self.lock.release()
+
+    def _catch_up(self):
+        edge = self.frontier()
+        if self.hashed >= edge:
+            return
+        with open(self.part, "rb", buffering=0) as f:
+            f.seek(self.hashed)
+            while self.hashed < edge:
+                block = f.read(min(BUFFER_SIZE, edge - self.hashed))
+                if not block:
+                    break
+                self.sha.update(block)
+                self.hashed += len(block)
+                edge = self.frontier()
+
+    def finish(self) -> str:
+        with self.lock:
+            self._catch_up()
+            return self.sha.hexdigest()
+
+
+class _Progress:
+    """Thread-safe byte counter that forwards to a callback"""
+
+    def __init__(self, total: int, callback: Optional[ProgressCallback], done: int = 0,
+                 limiter: Optional[RateLimiter] = None, on_retry: Optional[RetryCallback] = None):
+        self.total = total
+        self.done = done
+        self.callback = callback
+        self.limiter = limiter
+        self.on_retry = on_retry
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+
+    def add(self, n: int):
+        if self.limiter:
+            self.limiter.consume(n)
+        with self.lock:
+            self.done += n
+            if self.callback:
+                self.callback(self.done, self.total)
+
+
+def _fetch_segment(state: _State, index: int, progress: _Progress, hasher: _StreamHash):
+    """Fetch one segment into its place in the .part file, retrying from where it stopped"""
+    _, end, pos = state.segments[index]
+    info = state.info
+    url = info.final_url
+    for attempt in range(RETRIES):
+        if pos > end:
+            return
+        try:
+            with _open(url, {"Range": f"bytes={pos}-{end}"}) as resp:
+                if resp.status != 206:
+                    raise DownloadError(f"server ignored range request (HTTP {resp.status})")
+                # Unbuffered so the hasher can read back what we just wrote
+                with open(part_path(state.dest), "r+b", buffering=0) as f:
+                    f.seek(pos)
+                    while pos <= end:
+                        if progress.cancelled.is_set():
+                            raise DownloadError("cancelled")
+                        block = resp.read(min(BUFFER_SIZE, end - pos + 1))
+                        if not block:
+                            break
+                        f.write(block)
+                        state.advance(index, pos + len(block))
+                        hasher.written(pos, block)
+                        pos += len(block)
+                        progress.add(len(block))
+        except (urllib.error.URLError, OSError) as e:
+            if attempt == RETRIES - 1:
+                raise DownloadError(f"bytes {pos}-{end}: {e}") from e
+            if progress.on_retry:
+                progress.on_retry(f"bytes {pos}-{end}: {e}")
+            # Signed CDN URLs expire; go back through the redirect on retry
+            url = info.url
+    if pos <= end:
+        raise DownloadError(f"bytes {pos}-{end}: connection kept closing early")
+
+
+def _fetch_single(info: RemoteInfo, part: Path, progress: _Progress) -> str:
+    """Fetch the whole body over one connection, returning its SHA-256"""
+    sha = hashlib.sha256()
+    try:
+        with _open(info.final_url) as resp, open(part, "wb") as f:
+            while True:
+                block = resp.read(BUFFER_SIZE)
+                if not block:
+                    break
+                f.write(block)
+                sha.update(block)
+                progress.add(len(block))
+    except (urllib.error.URLError, OSError) as e:
+        raise DownloadError(str(e)) from e
+    return sha.hexdigest()
+
+
+def _fetch_segments(state: _State, connections: int, progress: _Progress, hasher: _StreamHash):
+    """Fetch all unfinished segments in parallel"""
+    pending = [i for i, (_, end, pos) in enumerate(state.segments) if pos <= end]
+    if not pending:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(connections, len(pending)))) as pool:
+        futures = [pool.submit(_fetch_segment, state, i, progress, hasher) for i in pending]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            progress.cancelled.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        finally:
+            state.save()
+
+
+def _check_digest(digest: str, expected: str, part: Path, sidecar: Path):
+    """Throw away a download whose bytes do not match what upstream published"""
+    if expected and digest != expected.lower():
+        part.unlink(missing_ok=True)
+        sidecar.unlink(missing_ok=True)
+        raise DownloadError(f"SHA-256 mismatch: expected {expected}, got {digest}")
+
+
+def download(url: str, dest: Path, connections: int = DEFAULT_CONNECTIONS,
+             chunks: int = DEFAULT_CHUNKS, progress: Optional[ProgressCallback] = None,
+             limiter: Optional[RateLimiter] = None, expected_sha256: str = "",
+             on_retry: Optional[RetryCallback] = None) -> Tuple[str, str]:
+    """Download url to dest, resuming an earlier .part file when possible
+
+    Bytes go to dest.part with resume state in dest.part.json; dest only
+    appears, via an atomic rename, once the full length has arrived and the
+    SHA-256 (computed as the bytes are written) matches expected_sha256 or
+    the LFS oid the server advertised. Returns (actual, expected) digests;
+    expected is '' when nothing upstream said what it should be. on_retry
+    hears about every segment that had to be re-requested.
+    """
+    dest = Path(dest)
+    part = part_path(dest)
+    sidecar = sidecar_path(dest)
+    info = probe(url)
+    expected = expected_sha256 or info.sha256
+
+    if not info.ranges:
+        # Nothing to resume against; stream it from the start
+        counter = _Progress(info.length, progress, limiter=limiter, on_retry=on_retry)
+        try:
+            digest = _fetch_single(info, part, counter)
+            if info.length >= 0 and counter.done != info.length:
+                raise DownloadError(f"expected {info.length} bytes, got {counter.done}")
+        except BaseException:
+            part.unlink(missing_ok=True)
+            raise
+        _check_digest(digest, expected, part, sidecar)
+        os.replace(part, dest)
+        sidecar.unlink(missing_ok=True)
+        return digest, expected
+
+    state = _State.load(dest, info)
+    if state is None:
+        with open(part, "wb") as f:
+            f.truncate(info.length)
+        ranges = split_ranges(info.length, chunks if connections > 1 else 1)
+        state = _State(dest, info, [[start, end, start] for start, end in ranges])
+        state.save()
+
+    counter = _Progress(info.length, progress, state.done, limiter, on_retry)
+    hasher = _StreamHash(part, lambda: state.frontier)
+    _fetch_segments(state, connections, counter, hasher)
+
+    if state.done != info.length or part.stat().st_size != info.length:
+        raise DownloadError(f"expected {info.length} bytes, have {state.done}")
+    digest = hasher.finish()
+    _check_digest(digest, expected, part, sidecar)
+    os.replace(part, dest)
+    sidecar.unlink(missing_ok=True)
+    return digest, expected
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""JSON-lines download events for log collectors and the hub's setup screens"""
+
+import json
+import socket
+import sys
+import threading
+import time
+from typing import Optional, TextIO
+
+PROGRESS_INTERVAL = 0.5
+# Smoothing for the instantaneous rate; higher reacts faster
+RATE_ALPHA = 0.3
+
+# Event types
+QUEUED = "queued"
+STARTED = "started"
+PROGRESS = "progress"
+RETRY = "retry"
+VERIFIED = "verified"
+FAILED = "failed"
+FINISHED = "finished"
+
+
+class EventStream:
+    """Writes one JSON object per line to stdout, a file, or a local socket
+
+    sink is "-" for stdout, "tcp://host:port", "unix:/path/to/socket", or a
+    file path to append to. A sink that goes away mid-run (the hub closed its
+    socket) stops receiving events; the download itself carries on.
+    """
+
+    def __init__(self, sink: str = "-", interval: float = PROGRESS_INTERVAL):
+        self.sink = sink
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.sock: Optional[socket.socket] = None
+        self.out: Optional[TextIO] = None
+        if sink == "-":
+            self.out = sys.stdout
+        elif sink.startswith("tcp://"):
+            host, _, port = sink[len("tcp://"):].rpartition(":")
+            self.sock = socket.create_connection((host or "127.0.0.1", int(port)), timeout=5)
+        elif sink.startswith("unix:"):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(sink[len("unix:"):])
+        else:
+            self.out = open(sink, "a", encoding="utf-8", buffering=1)
+
+    @property
+    def to_stdout(self) -> bool:
+        return self.out is sys.stdout
+
+    def emit(self, event: str, **fields):
+        line = json.dumps({"ts": round(time.time(), 3), "event": event, **fields}) + "\n"
+        with self.lock:
+            try:
+                if self.sock:
+                    self.sock.sendall(line.encode("utf-8"))
+                elif self.out:
+                    self.out.write(line)
+                    self.out.flush()
+            except OSError:
+                self.sock = self.out = None
+
+    def tracker(self, file: str, total: int) -> "FileTracker":
+        return FileTracker(self, file, total)
+
+    def close(self):
+        with self.lock:
+            if self.sock:
+                self.sock.close()
+            elif self.out and not self.to_stdout:
+                self.out.close()
+            self.sock = self.out = None
+
+
+class FileTracker:
+    """Turns (done, total) callbacks for one file into rate-limited progress events"""
+
+    def __init__(self, stream: EventStream, file: str, total: int):
+        self.stream = stream
+        self.file = file
+        self.total = total
+        self.retries = 0
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.first = -1
+        self.last_time = self.started
+        self.last_done = 0
+        self.rate = 0.0
+        self.emitted = 0.0
+
+    def __call__(self, done: int, total: int):
+        now = time.monotonic()
+        with self.lock:
+            if self.first < 0:
+                # A resumed file starts with bytes we did not fetch this run
+                self.first = done
+                self.last_done = done
+            elapsed = now - self.last_time
+            if elapsed > 0.05:
+                current = (done - self.last_done) / elapsed
+                self.rate = current if not self.rate else RATE_ALPHA * current + (1 - RATE_ALPHA) * self.rate
+                self.last_time, self.last_done = now, done
+            if done != total and now - self.emitted < self.stream.interval:
+                return
+            self.emitted = now
+            average = (done - self.first) / (now - self.started) if now > self.started else 0.0
+            rate = self.rate or average
+            eta = (total - done) / rate if rate > 0 and total >= 0 else None
+            fields = dict(file=self.file, done=done, total=total, rate=round(rate), avg_rate=round(average),
+                          eta=round(eta, 1) if eta is not None else None, retries=self.retries)
+        self.stream.emit(PROGRESS, **fields)
+
+    def retry(self, error: str):
+        with self.lock:
+            self.retries += 1
+            retries = self.retries
+        self.stream.emit(RETRY, file=self.file, retries=retries, error=error)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
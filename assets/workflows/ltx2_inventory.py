@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""In-memory listing of the model folders, kept fresh without rescanning"""
+
+import ctypes
+import os
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+REFRESH_INTERVAL = 1.0
+# Directory mtimes can be this coarse (FAT, SMB); changes inside the window are re-checked
+MTIME_SLACK_NS = 2_000_000_000
+IGNORED_SUFFIXES = (".part", ".part.json", ".tmp")
+
+
+class _Inotify:
+    """Minimal non-blocking inotify wrapper (Linux only)"""
+
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    # Names only: moves, create, delete, and the folder itself going away
+    EVENTS = 0x40 | 0x80 | 0x100 | 0x200 | 0x400 | 0x800
+    IN_IGNORED = 0x8000
+    IN_Q_OVERFLOW = 0x4000
+    HEADER = struct.Struct("iIII")
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.wds: Dict[int, Path] = {}
+
+    def watch(self, path: Path) -> bool:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(str(path)), self.EVENTS)
+        if wd < 0:
+            return False
+        self.wds[wd] = path
+        return True
+
+    def changed(self) -> Optional[Set[Path]]:
+        """Folders with events since the last call; None means the queue overflowed"""
+        dirty: Set[Path] = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return dirty
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self.HEADER.unpack_from(data, offset)
+                offset += self.HEADER.size + length
+                if mask & self.IN_Q_OVERFLOW:
+                    return None
+                path = self.wds.get(wd)
+                if path is not None:
+                    dirty.add(path)
+                if mask & self.IN_IGNORED:
+                    self.wds.pop(wd, None)
+
+
+class Inventory:
+    """Filenames per folder from one os.scandir pass, refreshed incrementally
+
+    On Linux, inotify tells us exactly which folders changed. Elsewhere (and
+    on network shares, where inotify sees nothing) each refresh costs one
+    stat() per folder, and only folders whose mtime moved are rescanned.
+    """
+
+    def __init__(self, folders: Iterable[Path], use_inotify: bool = True):
+        self.folders = [Path(f) for f in folders]
+        self.names: Dict[Path, Set[str]] = {}
+        self.mtimes: Dict[Path, int] = {}
+        self.scanned_at: Dict[Path, int] = {}
+        self.lock = threading.Lock()
+        self.checked = 0.0
+        self.notify: Optional[_Inotify] = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self.notify = _Inotify()
+            except (OSError, AttributeError):
+                self.notify = None
+        for folder in self.folders:
+            self._scan(folder)
+
+    def _scan(self, folder: Path):
+        """Rescan one folder"""
+        names: Set[str] = set()
+        mtime = -1
+        try:
+            mtime = folder.stat().st_mtime_ns
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if entry.is_file() and not entry.name.endswith(IGNORED_SUFFIXES):
+                        names.add(entry.name)
+        except OSError:
+            pass
+        self.names[folder] = names
+        self.mtimes[folder] = mtime
+        self.scanned_at[folder] = time.time_ns()
+        if self.notify and mtime >= 0 and folder not in self.notify.wds.values():
+            self.notify.watch(folder)
+
+    def _watched(self, folder: Path) -> bool:
+        return bool(self.notify) and folder in self.notify.wds.values()
+
+    def refresh(self, force: bool = False):
+        """Rescan the folders that changed since the last refresh"""
+        with self.lock:
+            dirty: Optional[Set[Path]] = set()
+            if self.notify:
+                dirty = self.notify.changed()
+            for folder in self.folders:
+                if force or dirty is None:
+                    self._scan(folder)
+                elif self._watched(folder):
+                    if folder in dirty:
+                        self._scan(folder)
+                else:
+                    try:
+                        mtime = folder.stat().st_mtime_ns
+                    except OSError:
+                        mtime = -1
+                    recent = self.scanned_at[folder] - mtime < MTIME_SLACK_NS
+                    if mtime != self.mtimes[folder] or recent:
+                        self._scan(folder)
+            self.checked = time.monotonic()
+
+    def _fresh(self):
+        if time.monotonic() - self.checked >= REFRESH_INTERVAL:
+            self.refresh()
+
+    def invalidate(self, folder: Path):
+        """Forget what we know about a folder, e.g. right after deleting from it"""
+        with self.lock:
+            self._scan(Path(folder))
+
+    def exists(self, path: Path) -> bool:
+        """Like path.exists(), answered from the index for tracked folders"""
+        path = Path(path)
+        if path.parent not in self.names:
+            return path.exists()
+        self._fresh()
+        return path.name in self.names[path.parent]
+
+    def listing(self, folder: Path, suffix: str = "") -> List[Path]:
+        """Sorted files in a tracked folder, optionally filtered by suffix"""
+        folder = Path(folder)
+        self._fresh()
+        return [folder / name for name in sorted(self.names.get(folder, ())) if name.endswith(suffix)]
@@ -1,34 +1,86 @@
 #!/usr/bin/env python3
 """LTX-2 ComfyUI Workflow Manager"""
 
+import argparse
+import json
 import os
 import sys
-import subprocess
+import time
 import shutil
 from pathlib import Path
 from typing import List, Dict, Tuple
 
-# Paths
-SCRIPT_DIR = Path(__file__).parent
-COMFY_DIR = SCRIPT_DIR / "ComfyUI"
-MODELS_DIR = COMFY_DIR / "models"
-WORKFLOWS_DIR = SCRIPT_DIR / "workflows" / "ltx2"
+import ltx2_scheduler
+from ltx2_download import DownloadError, part_path
+from ltx2_events import EventStream
+from ltx2_inventory import Inventory
+from ltx2_mirror import DEFAULT_PORT, Mirrors, serve
+from ltx2_paths import COMFY_DIR, COMFY_URL, FOLDERS, MODELS_DIR, SCRIPT_DIR, WORKFLOWS_DIR
+from ltx2_quota import UsageLog, cache_items, evict, history_usage, plan_eviction, referenced_names
+from ltx2_remote import LINK, OUTDATED, MetadataCache, make_plan, print_plan, summarize
+from ltx2_store import BlobStore, dedupe
+from ltx2_verify import MISMATCH, VERIFIED, VerifyIndex, verify_tree
+from gguf_inspect import detect_memory, format_report as format_gguf, gguf_files, recommend
+from gguf_inspect import inspect as inspect_gguf
+from safetensors_inspect import HeaderCache, format_report, inspect_tree
 
 # ComfyUI files
 EMBEDDINGS_CONNECTOR_FILE = COMFY_DIR / "comfy" / "ldm" / "lightricks" / "embeddings_connector.py"
 EMBEDDINGS_CONNECTOR_URL = "https://raw.githubusercontent.com/gjnave/cogni-scripts/refs/heads/main/workflows/ltx-2/embeddings_connector.py"
 EMBEDDINGS_CONNECTOR_BACKUP = EMBEDDINGS_CONNECTOR_FILE.with_suffix(".py._bak")
 
-# Model folders
-FOLDERS = {
-    "checkpoints": MODELS_DIR / "checkpoints",
-    "diffusion_models": MODELS_DIR / "diffusion_models",
-    "text_encoders": MODELS_DIR / "text_encoders",
-    "vae": MODELS_DIR / "vae",
-    "loras": MODELS_DIR / "loras",
-    "latent_upscale_models": MODELS_DIR / "latent_upscale_models",
-    "unet": MODELS_DIR / "unet",
-}
+# Download engine tuning
+DOWNLOAD_CONNECTIONS = int(os.environ.get("LTX2_CONNECTIONS", "8"))
+DOWNLOAD_CHUNKS = int(os.environ.get("LTX2_CHUNKS", "32"))
+DOWNLOAD_JOBS = int(os.environ.get("LTX2_JOBS", "3"))
+BANDWIDTH_LIMIT_MB = float(os.environ.get("LTX2_BANDWIDTH_MB", "0"))  # MB/s, 0 = unlimited
+
+# Memory budget for GGUF recommendations, in GB; 0 = detect
+VRAM_GB = float(os.environ.get("LTX2_VRAM_GB", "0"))
+RAM_GB = float(os.environ.get("LTX2_RAM_GB", "0"))
+
+# Disk quota for the model folders in GB (0 = none)
+MODEL_QUOTA_GB = float(os.environ.get("LTX2_QUOTA_GB", "0"))
+
+# Content-addressed store the FOLDERS entries link into
+STORE = BlobStore(MODELS_DIR / ".blobs")
+
+# Hashes of installed models, and optional known-good checksums by filename
+INDEX = VerifyIndex(MODELS_DIR / ".verified.json")
+CHECKSUMS_FILE = SCRIPT_DIR / "ltx2_checksums.json"
+
+# Cached HEAD results (size, ETag, Last-Modified) for every URL we know
+REMOTE = MetadataCache(MODELS_DIR / ".remote.json")
+
+# JSON-lines download events: "-" for stdout, a file, tcp://host:port or unix:/path
+EVENTS_SINK = os.environ.get("LTX2_EVENTS", "")
+_events = None
+
+# Local directories and LAN caches tried before upstream (LTX2_MIRROR_DIRS, LTX2_MIRROR_URLS, LTX2_OFFLINE)
+MIRRORS = Mirrors.from_env()
+
+# When each model was last used, fed from ComfyUI's history
+USAGE = UsageLog(MODELS_DIR / ".usage.json")
+
+# Parsed .safetensors and .gguf headers, reused until a file changes
+HEADERS = HeaderCache()
+GGUF_HEADERS = HeaderCache(inspect_gguf)
+
+# File states shown in status views
+STATE_OK = "ok"
+STATE_MISSING = "missing"
+STATE_CORRUPT = "corrupt"
+
+# Listing of FOLDERS and WORKFLOWS_DIR, built on first use
+_inventory = None
+
+
+def inventory() -> Inventory:
+    """Shared index of installed files"""
+    global _inventory
+    if _inventory is None:
+        _inventory = Inventory(list(FOLDERS.values()) + [WORKFLOWS_DIR])
+    return _inventory
 
 # Workflow definitions
 WORKFLOWS = {
@@ -170,24 +222,35 @@ def create_dirs():
         folder.mkdir(parents=True, exist_ok=True)
 
 
-def download_file(filename: str, folder: str, url: str, force: bool = False) -> bool:
-    """Download a file using curl"""
-    dest = FOLDERS[folder] / filename
-    
-    if dest.exists() and not force:
-        print(f"[SKIP] {filename} already exists")
-        return True
-    
-    print(f"[DOWN] {filename}")
+def load_checksums() -> Dict[str, str]:
+    """Known SHA-256 values by filename, on top of the LFS oids HF reports"""
     try:
-        result = subprocess.run(
-            ["curl", "-L", "--progress-bar", "-o", str(dest), url],
-            check=True
-        )
-        print(f"[DONE] {filename}")
+        return json.loads(CHECKSUMS_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def show_progress(done: int, total: int):
+    """Draw a one-line progress bar"""
+    if total > 0:
+        width = 40
+        filled = width * done // total
+        bar = "#" * filled + "-" * (width - filled)
+        print(f"\r  [{bar}] {done * 100 // total:3d}% {done / 1048576:,.0f} MB", end="", flush=True)
+    else:
+        print(f"\r  {done / 1048576:,.0f} MB", end="", flush=True)
+    if done == total:
+        print()
+
+
+def fetch(url: str, dest: Path) -> bool:
+    """Fetch a URL into dest with the segmented downloader"""
+    try:
+        MIRRORS.download(url, dest, DOWNLOAD_CONNECTIONS, DOWNLOAD_CHUNKS,
+                         show_progress if sys.stdout.isatty() else None)
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"[FAIL] {filename} - Error code: {e.returncode}")
+    except DownloadError as e:
+        print(f"\n  Error: {e}")
         return False
 
 
@@ -198,17 +261,131 @@ def download_workflow(filename: str, url: str) -> bool:
         print(f"[SKIP] {filename} already exists")
         return True
     
-    print(f"[DOWN] {filename}")
-    try:
-        subprocess.run(
-            ["curl", "-L", "--progress-bar", "-o", str(dest), url],
-            check=True
-        )
+    print(f"[{'RESUME' if part_path(dest).exists() else 'DOWN'}] {filename}")
+    if fetch(url, dest):
         print(f"[DONE] {filename}")
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"[FAIL] {filename}")
-        return False
+    print(f"[FAIL] {filename}")
+    return False
+
+
+def gguf_url(variant: str) -> str:
+    """URL for a GGUF variant"""
+    subdir = "distilled" if "distilled" in variant else "dev"
+    return f"https://huggingface.co/vantagewithai/LTX-2-GGUF/resolve/main/{subdir}/{variant}"
+
+
+def model_entries(workflow_keys: List[str] = (), kijai: bool = False,
+                  diffusion_keys: List[str] = (), gguf_variants: List[str] = ()) -> List[Tuple[Path, str]]:
+    """Collect (dest, url) pairs for model files across any mix of selections"""
+    entries = []
+    for key in workflow_keys:
+        for filename, folder, url in WORKFLOWS[key]["files"]:
+            entries.append((FOLDERS[folder] / filename, url))
+    for key in diffusion_keys:
+        filename, url = KIJAI_DIFFUSION_MODELS[key]
+        entries.append((FOLDERS["diffusion_models"] / filename, url))
+    for variant in gguf_variants:
+        entries.append((FOLDERS["unet"] / variant, gguf_url(variant)))
+    if kijai or diffusion_keys or gguf_variants:
+        for filename, folder, url in KIJAI_COMMON:
+            entries.append((FOLDERS[folder] / filename, url))
+    return entries
+
+
+def workflow_entries(workflow_keys: List[str] = (), kijai: bool = False) -> List[Tuple[Path, str]]:
+    """Collect (dest, url) pairs for workflow JSON files"""
+    entries = []
+    for key in workflow_keys:
+        wf_name, wf_url = WORKFLOWS[key]["workflow"]
+        entries.append((WORKFLOWS_DIR / wf_name, wf_url))
+    if kijai:
+        for wf_name, wf_url in KIJAI_WORKFLOWS:
+            entries.append((WORKFLOWS_DIR / wf_name, wf_url))
+    return entries
+
+
+def plan_jobs(models: List[Tuple[Path, str]], workflows: List[Tuple[Path, str]],
+              force: bool = False) -> List[ltx2_scheduler.Job]:
+    """Build scheduler jobs, with sizes filled in from the metadata cache"""
+    # Workflow JSONs may carry local edits, so force only applies to models
+    jobs = (ltx2_scheduler.plan(models, force, STORE, INDEX, load_checksums())
+            + ltx2_scheduler.plan(workflows))
+    for job in jobs:
+        meta = REMOTE.get(job.url)
+        if meta:
+            job.size = meta["length"]
+            # Lets a mirror's copy be checked against what upstream published
+            job.expected = job.expected or meta.get("sha256", "")
+    return jobs
+
+
+def preview_plan(models: List[Tuple[Path, str]], workflows: List[Tuple[Path, str]],
+                 refresh: bool = False) -> Tuple[list, dict]:
+    """Work out download size, free space and outdated files without fetching any bytes"""
+    jobs = plan_jobs(models, workflows)
+    if not MIRRORS.offline:
+        REMOTE.refresh([job.url for job in jobs], force=refresh)
+        REMOTE.save()
+    items = make_plan(jobs, REMOTE, INDEX)
+    return items, summarize(items, MODELS_DIR)
+
+
+def events() -> EventStream:
+    """Event stream named by LTX2_EVENTS / --events, opened on first use; None if unset"""
+    global _events
+    if _events is None and EVENTS_SINK:
+        try:
+            _events = EventStream(EVENTS_SINK)
+        except OSError as e:
+            print(f"Cannot open event stream {EVENTS_SINK}: {e}", file=sys.stderr)
+    return _events
+
+
+def install_plan(models: List[Tuple[Path, str]], workflows: List[Tuple[Path, str]],
+                 force: bool = False, log=None) -> bool:
+    """Download a deduplicated set of files in parallel, biggest first"""
+    if not force:
+        remove_corrupt(models)
+    jobs = plan_jobs(models, workflows, force)
+    stream = events()
+    if stream and stream.to_stdout:
+        # stdout belongs to the event stream
+        log = lambda msg: print(msg, file=sys.stderr)
+    return ltx2_scheduler.run(
+        jobs,
+        max_jobs=DOWNLOAD_JOBS,
+        connections=DOWNLOAD_CONNECTIONS,
+        chunks=DOWNLOAD_CHUNKS,
+        bandwidth=BANDWIDTH_LIMIT_MB * 1024 * 1024,
+        log=log or (lambda msg: print(f"\r{msg:<60}")),
+        progress=show_progress if log is None and sys.stdout.isatty() else None,
+        mirrors=MIRRORS,
+        events=stream,
+    )
+
+
+def file_state(path: Path) -> str:
+    """Installed, missing, or present but with a broken safetensors header"""
+    if not inventory().exists(path):
+        return STATE_MISSING
+    cache = {".safetensors": HEADERS, ".gguf": GGUF_HEADERS}.get(path.suffix)
+    if cache:
+        report = cache.get(path)
+        if report and not report.ok:
+            return STATE_CORRUPT
+    return STATE_OK
+
+
+def remove_corrupt(entries: List[Tuple[Path, str]]):
+    """Delete files whose headers show they are truncated, so they get fetched again"""
+    for dest, _ in entries:
+        if file_state(dest) == STATE_CORRUPT:
+            print(f"[BAD] {dest.name} is corrupt, downloading again")
+            # Otherwise the plan finds the same bytes in the store by URL and links them back
+            STORE.forget(dest)
+            dest.unlink()
+            inventory().invalidate(dest.parent)
 
 
 def check_workflow_status(workflow_key: str) -> Tuple[int, int, List]:
@@ -222,18 +399,18 @@ def check_workflow_status(workflow_key: str) -> Tuple[int, int, List]:
     missing = 0
     
     for filename, folder, url in workflow["files"]:
-        exists = (FOLDERS[folder] / filename).exists()
-        status.append((filename, folder, exists))
-        if exists:
+        state = file_state(FOLDERS[folder] / filename)
+        status.append((filename, folder, state))
+        if state == STATE_OK:
             installed += 1
         else:
             missing += 1
     
     # Check workflow file
     wf_name, wf_url = workflow["workflow"]
-    wf_exists = (WORKFLOWS_DIR / wf_name).exists()
-    status.append((wf_name, "workflows", wf_exists))
-    if wf_exists:
+    wf_state = file_state(WORKFLOWS_DIR / wf_name)
+    status.append((wf_name, "workflows", wf_state))
+    if wf_state == STATE_OK:
         installed += 1
     else:
         missing += 1
@@ -243,10 +420,13 @@ def check_workflow_status(workflow_key: str) -> Tuple[int, int, List]:
 
 def display_status(status: List):
     """Display file status"""
-    for filename, folder, exists in status:
-        marker = "[OK]" if exists else "[X]"
-        missing_text = "" if exists else " - MISSING"
-        print(f"{marker} {filename} ({folder}){missing_text}")
+    for filename, folder, state in status:
+        if state == STATE_OK:
+            print(f"[OK] {filename} ({folder})")
+        elif state == STATE_CORRUPT:
+            print(f"[BAD] {filename} ({folder}) - CORRUPT")
+        else:
+            print(f"[X] {filename} ({folder}) - MISSING")
 
 
 def install_workflow_menu():
@@ -265,7 +445,8 @@ def install_workflow_menu():
         print("  5. I2V Basic (Kijai)")
         print("  6. LTX2 Lipsync (Audio Sync)")
         print("\nOther:")
-        print("  7. Back to Main Menu")
+        print("  7. Install Everything (parallel)")
+        print("  8. Back to Main Menu")
         
         choice = input("\nSelect workflow: ").strip()
         
@@ -282,9 +463,33 @@ def install_workflow_menu():
         elif choice == "6":
             install_standard_workflow("lipsync")
         elif choice == "7":
+            install_everything()
+        elif choice == "8":
             break
 
 
+def install_everything():
+    """Install every standard workflow plus the Kijai common files in one parallel pass"""
+    clear_screen()
+    keys = list(WORKFLOWS)
+    models, workflows = model_entries(keys, kijai=True), workflow_entries(keys, kijai=True)
+    
+    print("\nChecking upstream files...\n")
+    items, summary = preview_plan(models, workflows)
+    print_plan(items, summary)
+    
+    if not summary["download_bytes"] and not summary["unknown_sizes"] and not summary["counts"].get(LINK):
+        input("\nEverything is installed. Press Enter to continue...")
+        return
+    if input("\nProceed? (Y/N): ").strip().upper() != "Y":
+        return
+    
+    print("\nDownloading...\n")
+    install_plan(models, workflows)
+    print("\nDownload complete!")
+    input("Press Enter to continue...")
+
+
 def install_standard_workflow(workflow_key: str):
     """Install a standard workflow"""
     workflow = WORKFLOWS[workflow_key]
@@ -292,10 +497,18 @@ def install_standard_workflow(workflow_key: str):
     while True:
         missing, installed, status = check_workflow_status(workflow_key)
         
+        items, summary = preview_plan(model_entries([workflow_key]), workflow_entries([workflow_key]))
+        
         clear_screen()
         print(f"\n{workflow['name']} - Status\n")
         display_status(status)
-        print(f"\nMissing: {missing} | Installed: {installed}\n")
+        print(f"\nMissing: {missing} | Installed: {installed}")
+        print(f"Download: {summary['download_bytes'] / 1073741824:.1f} GB | "
+              f"Free: {summary['free_bytes'] / 1073741824:.1f} GB")
+        for item in items:
+            if item.state == OUTDATED:
+                print(f"[OLD] {item.job.dest.name} differs from upstream")
+        print()
         print("1. Download Missing Files")
         print("2. Re-download All Files")
         print("3. Back")
@@ -312,18 +525,10 @@ def install_standard_workflow(workflow_key: str):
 
 def download_workflow_files(workflow_key: str, force: bool = False):
     """Download files for a workflow"""
-    workflow = WORKFLOWS[workflow_key]
-    
     clear_screen()
     print("\nDownloading...\n")
     
-    # Download model files
-    for filename, folder, url in workflow["files"]:
-        download_file(filename, folder, url, force)
-    
-    # Download workflow
-    wf_name, wf_url = workflow["workflow"]
-    download_workflow(wf_name, wf_url)
+    install_plan(model_entries([workflow_key]), workflow_entries([workflow_key]), force)
     
     print("\nDownload complete!")
     input("Press Enter to continue...")
@@ -359,9 +564,10 @@ def install_kijai_diffusion():
         missing = 0
         
         # Check if either diffusion model exists
-        has_model = any((FOLDERS["diffusion_models"] / name).exists() 
+        has_model = any(file_state(FOLDERS["diffusion_models"] / name) == STATE_OK
                        for name, _ in KIJAI_DIFFUSION_MODELS.values())
-        status.append(("Diffusion model (choose one)", "diffusion_models", has_model))
+        status.append(("Diffusion model (choose one)", "diffusion_models",
+                       STATE_OK if has_model else STATE_MISSING))
         if has_model:
             installed += 1
         else:
@@ -369,18 +575,18 @@ def install_kijai_diffusion():
         
         # Check common files
         for filename, folder, url in KIJAI_COMMON:
-            exists = (FOLDERS[folder] / filename).exists()
-            status.append((filename, folder, exists))
-            if exists:
+            state = file_state(FOLDERS[folder] / filename)
+            status.append((filename, folder, state))
+            if state == STATE_OK:
                 installed += 1
             else:
                 missing += 1
         
         # Check workflows
         for wf_name, wf_url in KIJAI_WORKFLOWS:
-            exists = (WORKFLOWS_DIR / wf_name).exists()
-            status.append((wf_name, "workflows", exists))
-            if exists:
+            state = file_state(WORKFLOWS_DIR / wf_name)
+            status.append((wf_name, "workflows", state))
+            if state == STATE_OK:
                 installed += 1
             else:
                 missing += 1
@@ -417,21 +623,11 @@ def download_kijai_diffusion(force: bool = False):
         return
     
     model_key = "phr00tmerge" if choice == "1" else "distilled"
-    filename, url = KIJAI_DIFFUSION_MODELS[model_key]
     
     clear_screen()
     print("\nDownloading...\n")
     
-    # Download selected diffusion model
-    download_file(filename, "diffusion_models", url, force)
-    
-    # Download common files
-    for filename, folder, url in KIJAI_COMMON:
-        download_file(filename, folder, url, force)
-    
-    # Download workflows
-    for wf_name, wf_url in KIJAI_WORKFLOWS:
-        download_workflow(wf_name, wf_url)
+    install_plan(model_entries(diffusion_keys=[model_key]), workflow_entries(kijai=True), force)
     
     print("\nDownload complete!")
     input("Press Enter to continue...")
@@ -446,29 +642,29 @@ def install_kijai_gguf():
         missing = 0
         
         # Check GGUF files
-        gguf_files = list(FOLDERS["unet"].glob("*.gguf"))
-        if gguf_files:
-            for f in gguf_files:
-                status.append((f.name, "unet", True))
-            installed += len(gguf_files)
+        gguf_states = [(f, file_state(f)) for f in inventory().listing(FOLDERS["unet"], ".gguf")]
+        for f, state in gguf_states:
+            status.append((f.name, "unet", state))
+        if any(state == STATE_OK for _, state in gguf_states):
+            installed += sum(1 for _, state in gguf_states if state == STATE_OK)
         else:
-            status.append(("GGUF models (choose at least one)", "unet", False))
+            status.append(("GGUF models (choose at least one)", "unet", STATE_MISSING))
             missing += 1
         
         # Check common files
         for filename, folder, url in KIJAI_COMMON:
-            exists = (FOLDERS[folder] / filename).exists()
-            status.append((filename, folder, exists))
-            if exists:
+            state = file_state(FOLDERS[folder] / filename)
+            status.append((filename, folder, state))
+            if state == STATE_OK:
                 installed += 1
             else:
                 missing += 1
         
         # Check workflows
         for wf_name, wf_url in KIJAI_WORKFLOWS:
-            exists = (WORKFLOWS_DIR / wf_name).exists()
-            status.append((wf_name, "workflows", exists))
-            if exists:
+            state = file_state(WORKFLOWS_DIR / wf_name)
+            status.append((wf_name, "workflows", state))
+            if state == STATE_OK:
                 installed += 1
             else:
                 missing += 1
@@ -491,18 +687,58 @@ def install_kijai_gguf():
             break
 
 
+def memory_budget(vram_gb: float = 0, ram_gb: float = 0) -> Tuple[int, str]:
+    """Bytes available for GGUF weights, and where that number came from"""
+    vram = int((vram_gb or VRAM_GB) * 1024 ** 3)
+    ram = int((ram_gb or RAM_GB) * 1024 ** 3)
+    if not (vram or ram):
+        vram, ram = detect_memory()
+    if vram:
+        return vram, f"{vram / 1024 ** 3:.0f} GB VRAM"
+    return ram, f"{ram / 1024 ** 3:.0f} GB RAM"
+
+
+def gguf_sizes() -> Dict[str, int]:
+    """Known sizes of GGUF variants: local files first, then cached remote metadata"""
+    sizes = {}
+    for variant in GGUF_VARIANTS["distilled"] + GGUF_VARIANTS["dev"]:
+        local = FOLDERS["unet"] / variant
+        if file_state(local) == STATE_OK:
+            sizes[variant] = local.stat().st_size
+        else:
+            meta = REMOTE.get(gguf_url(variant)) or {}
+            sizes[variant] = meta.get("length", -1)
+    return sizes
+
+
+def recommend_gguf(vram_gb: float = 0, ram_gb: float = 0) -> Tuple[Dict[str, str], str]:
+    """Best variant per family that fits the memory budget"""
+    budget, source = memory_budget(vram_gb, ram_gb)
+    sizes = gguf_sizes()
+    picks = {family: recommend(variants, budget, sizes) for family, variants in GGUF_VARIANTS.items()}
+    return picks, source
+
+
 def download_kijai_gguf(force: bool = False):
     """Download GGUF models with selection menu"""
+    picks, source = recommend_gguf()
     clear_screen()
     print("\nChoose GGUF Variants (space-separated numbers)\n")
     print("Distilled:")
     for i, variant in enumerate(GGUF_VARIANTS["distilled"], 1):
-        print(f"{i:2d}. {variant}")
+        mark = " *" if variant == picks["distilled"] else ""
+        print(f"{i:2d}. {variant}{mark}")
     
     print("\nDev:")
     offset = len(GGUF_VARIANTS["distilled"])
     for i, variant in enumerate(GGUF_VARIANTS["dev"], offset + 1):
-        print(f"{i:2d}. {variant}")
+        mark = " *" if variant == picks["dev"] else ""
+        print(f"{i:2d}. {variant}{mark}")
+    
+    if any(picks.values()):
+        print(f"\n* Best quality that fits in {source}")
+    else:
+        print(f"\nNo variant is expected to fit in {source}; expect offloading to system RAM")
     
     print(f"\nA. Select All Distilled")
     print(f"B. Select All Dev")
@@ -533,21 +769,7 @@ def download_kijai_gguf(force: bool = False):
     clear_screen()
     print("\nDownloading...\n")
     
-    # Download selected GGUF files
-    for variant in selected:
-        if "distilled" in variant:
-            url = f"https://huggingface.co/vantagewithai/LTX-2-GGUF/resolve/main/distilled/{variant}"
-        else:
-            url = f"https://huggingface.co/vantagewithai/LTX-2-GGUF/resolve/main/dev/{variant}"
-        download_file(variant, "unet", url, force)
-    
-    # Download common files
-    for filename, folder, url in KIJAI_COMMON:
-        download_file(filename, folder, url, force)
-    
-    # Download workflows
-    for wf_name, wf_url in KIJAI_WORKFLOWS:
-        download_workflow(wf_name, wf_url)
+    install_plan(model_entries(gguf_variants=selected), workflow_entries(kijai=True), force)
     
     print("\nDownload complete!")
     input("Press Enter to continue...")
@@ -566,14 +788,14 @@ def delete_models_menu():
         option_num = 1
         
         for name, path in FOLDERS.items():
-            pattern = "*.gguf" if name == "unet" else "*.safetensors"
-            files = list(path.glob(pattern))
+            suffix = ".gguf" if name == "unet" else ".safetensors"
+            files = inventory().listing(path, suffix)
             if files:
                 display_name = name.replace("_", " ").title()
                 if name == "unet":
                     display_name = "UNet (GGUF)"
                 print(f"  {option_num}. {display_name}")
-                folder_options[option_num] = (name, path, pattern)
+                folder_options[option_num] = (name, path, suffix)
                 option_num += 1
         
         if not folder_options:
@@ -581,10 +803,15 @@ def delete_models_menu():
             input("\nPress Enter to continue...")
             break
         
-        print(f"\n  {option_num}. Back to Main Menu")
+        print(f"\n  Q. Trim to Disk Quota")
+        print(f"  {option_num}. Back to Main Menu")
         
         choice = input("\nSelect option: ").strip()
         
+        if choice.upper() == "Q":
+            trim_quota_menu()
+            continue
+        
         try:
             choice_num = int(choice)
             if choice_num == option_num:
@@ -595,10 +822,60 @@ def delete_models_menu():
             pass
 
 
-def delete_from_folder(folder_name: str, folder_path: Path, pattern: str):
+def quota_plan(quota_gb: float, protect_referenced: bool = True):
+    """Eviction plan for the model folders: (items, evict, usage after)"""
+    for name, when in history_usage(COMFY_URL).items():
+        USAGE.touch([name], when)
+    USAGE.save()
+    comfy_workflows = COMFY_DIR / "user" / "default" / "workflows"
+    referenced = referenced_names([SCRIPT_DIR, SCRIPT_DIR / "workflows", WORKFLOWS_DIR, comfy_workflows])
+    items = cache_items(FOLDERS.values(), USAGE, referenced)
+    victims, after = plan_eviction(items, int(quota_gb * 1024 ** 3), protect_referenced)
+    return items, victims, after
+
+
+def print_quota_plan(items, victims, after: int, quota_gb: float):
+    """Show what trimming to the quota would remove"""
+    gb = 1024 ** 3
+    used = sum(item.size for item in items)
+    print(f"Models: {used / gb:.1f} GB | Quota: {quota_gb:.1f} GB\n")
+    for item in victims:
+        age = (time.time() - item.last_used) / 86400 if item.last_used else -1
+        when = f"{age:.0f} days ago" if age >= 0 else "never"
+        print(f"[EVICT] {item.size / gb:6.2f} GB  {item.paths[0].name} (last used {when})")
+    if not victims:
+        print("Nothing to evict.")
+    if after > quota_gb * gb:
+        print(f"\nStill {after / gb:.1f} GB after trimming; the rest is referenced by workflows")
+
+
+def trim_quota_menu():
+    """Evict unreferenced, least recently used models until under the quota"""
+    clear_screen()
+    default = f" [{MODEL_QUOTA_GB:g}]" if MODEL_QUOTA_GB else ""
+    answer = input(f"\nQuota in GB{default}: ").strip()
+    try:
+        quota_gb = float(answer) if answer else MODEL_QUOTA_GB
+    except ValueError:
+        return
+    if quota_gb <= 0:
+        return
+    
+    print("\nChecking usage and workflow references...\n")
+    items, victims, after = quota_plan(quota_gb)
+    print_quota_plan(items, victims, after, quota_gb)
+    if victims and input("\nDelete these files? (Y/N): ").strip().upper() == "Y":
+        evict(victims)
+        for folder in FOLDERS.values():
+            inventory().invalidate(folder)
+        STORE.gc(FOLDERS.values())
+    input("\nPress Enter to continue...")
+
+
+def delete_from_folder(folder_name: str, folder_path: Path, suffix: str):
     """Delete files from a specific folder"""
     while True:
-        files = sorted(folder_path.glob(pattern))
+        files = inventory().listing(folder_path, suffix)
         
         if not files:
             clear_screen()
@@ -628,12 +905,51 @@ def delete_from_folder(folder_name: str, folder_path: Path, pattern: str):
                 confirm = input(f"\nDelete {file_to_delete.name}? (Y/N): ").strip().upper()
                 if confirm == "Y":
                     file_to_delete.unlink()
+                    inventory().invalidate(folder_path)
+                    STORE.gc(FOLDERS.values())
                     print(f"File deleted successfully.")
                     input("Press Enter to continue...")
         except (ValueError, IndexError):
             pass
 
 
+def dedupe_models_menu():
+    """Replace duplicate model files with links into the blob store"""
+    clear_screen()
+    print("\n" + "="*50)
+    print("  DEDUPLICATE MODELS")
+    print("="*50 + "\n")
+    print("Scanning for duplicate files...\n")
+    
+    reclaimable = dedupe(STORE, FOLDERS.values(), dry_run=True, digest=INDEX.digest)
+    if not reclaimable:
+        print("No duplicate model files found.")
+        input("\nPress Enter to continue...")
+        return
+    
+    print(f"\n{reclaimable / 1073741824:.1f} GB can be reclaimed.")
+    confirm = input("Link duplicates into the store? (Y/N): ").strip().upper()
+    if confirm == "Y":
+        reclaimed = dedupe(STORE, FOLDERS.values(), log=lambda msg: None, digest=INDEX.digest)
+        INDEX.save()
+        print(f"\nReclaimed {reclaimed / 1073741824:.1f} GB.")
+    input("\nPress Enter to continue...")
+
+
+def verify_models_menu():
+    """Check installed models against their upstream SHA-256"""
+    clear_screen()
+    print("\n" + "="*50)
+    print("  VERIFY MODELS")
+    print("="*50 + "\n")
+    print("Hashing new or changed files...\n")
+    
+    results = verify_tree(INDEX, FOLDERS.values(), load_checksums())
+    bad = sum(1 for state in results.values() if state == MISMATCH)
+    print(f"\nChecked {len(results)} files, {bad} mismatched.")
+    input("\nPress Enter to continue...")
+
+
 def download_workflows_menu():
     """Download workflows only"""
     while True:
@@ -647,12 +963,12 @@ def download_workflows_menu():
         # Standard workflows
         for key, data in WORKFLOWS.items():
             wf_name, wf_url = data["workflow"]
-            if not (WORKFLOWS_DIR / wf_name).exists():
+            if not inventory().exists(WORKFLOWS_DIR / wf_name):
                 all_workflows.append((wf_name, wf_url))
         
         # Kijai workflows
         for wf_name, wf_url in KIJAI_WORKFLOWS:
-            if not (WORKFLOWS_DIR / wf_name).exists():
+            if not inventory().exists(WORKFLOWS_DIR / wf_name):
                 all_workflows.append((wf_name, wf_url))
         
         if not all_workflows:
@@ -729,14 +1045,10 @@ def install_embeddings_connector():
         print(f"{EMBEDDINGS_CONNECTOR_FILE}\n")
     
     print("Downloading updated embeddings_connector.py...")
-    try:
-        result = subprocess.run(
-            ["curl", "-L", "--fail", "--show-error", "--progress-bar",
-             "-o", str(EMBEDDINGS_CONNECTOR_FILE), EMBEDDINGS_CONNECTOR_URL],
-            check=True
-        )
+    EMBEDDINGS_CONNECTOR_FILE.parent.mkdir(parents=True, exist_ok=True)
+    if fetch(EMBEDDINGS_CONNECTOR_URL, EMBEDDINGS_CONNECTOR_FILE):
         print("\nSuccessfully installed embeddings_connector.py")
-    except subprocess.CalledProcessError:
+    else:
         print("\nFailed to download embeddings_connector.py")
     
     input("\nPress Enter to continue...")
@@ -813,7 +1125,9 @@ def main_menu():
         print("  2. Delete Models")
         print("  3. Download Workflows Only")
         print("  4. Manage ComfyUI Files")
-        print("  5. Exit")
+        print("  5. Deduplicate Models")
+        print("  6. Verify Models")
+        print("  7. Exit")
         
         choice = input("\nSelect option: ").strip()
         
@@ -826,11 +1140,323 @@ def main_menu():
         elif choice == "4":
             manage_comfyui_files_menu()
         elif choice == "5":
+            dedupe_models_menu()
+        elif choice == "6":
+            verify_models_menu()
+        elif choice == "7":
             break
 
 
+# Exit codes for the batch interface
+EXIT_OK = 0
+EXIT_FAILED = 1           # a download or link failed
+EXIT_USAGE = 2            # bad arguments (argparse uses 2 as well)
+EXIT_NO_SPACE = 3         # the plan does not fit on the models disk
+EXIT_MISMATCH = 4         # verify found files that differ from upstream
+EXIT_INCOMPLETE = 5       # status found missing files
+EXIT_CORRUPT = 6          # inspect/gguf found damaged model headers
+EXIT_UNKNOWN_SIZE = 7     # plan could not size every file, so it may not fit
+
+
+def workflow_key(name: str) -> str:
+    """Validate a workflow key given on the command line"""
+    if name in WORKFLOWS or name in ("kijai", "all"):
+        return name
+    raise argparse.ArgumentTypeError(f"unknown workflow: {name} (choose from {', '.join(WORKFLOWS)}, kijai, all)")
+
+
+def resolve_gguf(name: str) -> str:
+    """Accept a full GGUF filename or a short form like distilled-Q4_K_M"""
+    all_variants = GGUF_VARIANTS["distilled"] + GGUF_VARIANTS["dev"]
+    for variant in all_variants:
+        if name in (variant, variant[len("ltx-2-19b-"):-len(".gguf")]):
+            return variant
+    raise argparse.ArgumentTypeError(f"unknown GGUF variant: {name}")
+
+
+def selection_entries(args) -> Tuple[List[Tuple[Path, str]], List[Tuple[Path, str]]]:
+    """Model and workflow entries for the selection given on the command line"""
+    keys = list(WORKFLOWS) if "all" in args.workflows else [k for k in args.workflows if k != "kijai"]
+    kijai = "all" in args.workflows or "kijai" in args.workflows
+    return (model_entries(keys, kijai, args.diffusion, args.gguf),
+            workflow_entries(keys, kijai or bool(args.diffusion or args.gguf)))
+
+
+def emit(args, data, text_lines: List[str]):
+    """Print either JSON or plain text"""
+    if args.json:
+        print(json.dumps(data, indent=2))
+    else:
+        for line in text_lines:
+            print(line)
+
+
+def cmd_plan(args) -> int:
+    models, workflows = selection_entries(args)
+    items, summary = preview_plan(models, workflows, refresh=args.refresh)
+    if args.json:
+        emit(args, {"items": [item.as_dict() for item in items], "summary": summary}, [])
+    else:
+        print_plan(items, summary)
+    if summary["fits"] is None:
+        return EXIT_UNKNOWN_SIZE
+    return EXIT_OK if summary["fits"] else EXIT_NO_SPACE
+
+
+def cmd_apply(args) -> int:
+    global DOWNLOAD_JOBS, DOWNLOAD_CONNECTIONS, BANDWIDTH_LIMIT_MB
+    DOWNLOAD_JOBS = args.jobs or DOWNLOAD_JOBS
+    DOWNLOAD_CONNECTIONS = args.connections or DOWNLOAD_CONNECTIONS
+    BANDWIDTH_LIMIT_MB = args.bandwidth if args.bandwidth is not None else BANDWIDTH_LIMIT_MB
+
+    models, workflows = selection_entries(args)
+    items, summary = preview_plan(models, workflows)
+    if summary["fits"] is False and not args.ignore_space:
+        emit(args, {"ok": False, "error": "not enough free space", "summary": summary},
+             ["Not enough free space for this plan (use --ignore-space to try anyway)"])
+        return EXIT_NO_SPACE
+
+    # Keep stdout clean for JSON; progress lines go to stderr
+    log = (lambda msg: print(msg, file=sys.stderr)) if args.json else print
+    ok = install_plan(models, workflows, force=args.force, log=log)
+    INDEX.save()
+    _, after = preview_plan(models, workflows)
+    if EVENTS_SINK == "-" and not args.json:
+        print("Done" if ok else "Some files failed", file=sys.stderr)
+    else:
+        emit(args, {"ok": ok, "summary": after}, ["Done" if ok else "Some files failed"])
+    return EXIT_OK if ok else EXIT_FAILED
+
+
+def cmd_status(args) -> int:
+    if not (args.workflows or args.diffusion or args.gguf):
+        args.workflows = ["all"]
+    models, workflows = selection_entries(args)
+    files = []
+    for dest in dict.fromkeys(dest for dest, _ in models + workflows):
+        files.append({
+            "file": dest.name,
+            "dest": str(dest),
+            "installed": inventory().exists(dest),
+            "state": file_state(dest),
+            "partial": part_path(dest).exists(),
+            "verification": INDEX.status(dest),
+        })
+    missing = sum(1 for f in files if f["state"] != STATE_OK)
+    if args.json:
+        emit(args, {"files": files, "missing": missing, "installed": len(files) - missing}, [])
+    else:
+        display_status([(f["file"], Path(f["dest"]).parent.name, f["state"]) for f in files])
+        print(f"\nMissing: {missing} | Installed: {len(files) - missing}")
+    return EXIT_OK if not missing else EXIT_INCOMPLETE
+
+
+def cmd_verify(args) -> int:
+    results = verify_tree(INDEX, FOLDERS.values(), load_checksums(),
+                          log=(lambda msg: None) if args.json else print)
+    bad = [str(path) for path, state in results.items() if state == MISMATCH]
+    emit(args, {"files": {str(path): state for path, state in results.items()},
+                "verified": sum(1 for state in results.values() if state == VERIFIED),
+                "mismatched": bad},
+         [f"\nChecked {len(results)} files, {len(bad)} mismatched."])
+    return EXIT_MISMATCH if bad else EXIT_OK
+
+
+def cmd_inspect(args) -> int:
+    reports = inspect_tree(FOLDERS.values())
+    bad = [r for r in reports if not r.ok]
+    emit(args, {"files": [r.as_dict() for r in reports], "corrupt": len(bad)},
+         [format_report(r) for r in reports] + [f"\nChecked {len(reports)} files, {len(bad)} corrupt."])
+    return EXIT_CORRUPT if bad else EXIT_OK
+
+
+def cmd_gguf(args) -> int:
+    reports = [inspect_gguf(p) for p in gguf_files([FOLDERS["unet"]])]
+    picks, source = recommend_gguf(args.vram, args.ram)
+    bad = [r for r in reports if not r.ok]
+    lines = [format_gguf(r) for r in reports]
+    lines += [f"\nRecommended for {source}:"]
+    lines += [f"  {family}: {pick or 'none fits'}" for family, pick in picks.items()]
+    emit(args, {"files": [r.as_dict() for r in reports], "corrupt": len(bad),
+                "budget": source, "recommended": picks}, lines)
+    return EXIT_CORRUPT if bad else EXIT_OK
+
+
+def cmd_quota(args) -> int:
+    quota_gb = args.limit or MODEL_QUOTA_GB
+    if quota_gb <= 0:
+        print("No quota given (--limit or LTX2_QUOTA_GB)", file=sys.stderr)
+        return EXIT_USAGE
+    items, victims, after = quota_plan(quota_gb, not args.evict_referenced)
+    freed = 0
+    if not args.dry_run:
+        freed = evict(victims, log=(lambda msg: None) if args.json else print)
+        STORE.gc(FOLDERS.values())
+    if args.json:
+        emit(args, {"quota_bytes": int(quota_gb * 1024 ** 3), "used_bytes": sum(i.size for i in items),
+                    "after_bytes": after, "dry_run": args.dry_run, "freed_bytes": freed,
+                    "evict": [i.as_dict() for i in victims]}, [])
+    elif args.dry_run:
+        print_quota_plan(items, victims, after, quota_gb)
+    return EXIT_OK if after <= quota_gb * 1024 ** 3 else EXIT_NO_SPACE
+
+
+def served_files() -> Dict[str, Path]:
+    """Every known URL this node has a finished copy of, by url_key"""
+    files = {}
+    entries = (model_entries(list(WORKFLOWS), True, list(KIJAI_DIFFUSION_MODELS),
+                             GGUF_VARIANTS["distilled"] + GGUF_VARIANTS["dev"])
+               + workflow_entries(list(WORKFLOWS), True)
+               + [(EMBEDDINGS_CONNECTOR_FILE, EMBEDDINGS_CONNECTOR_URL)])
+    for dest, url in entries:
+        key = ltx2_scheduler.url_key(url)
+        if key not in files:
+            blob = STORE.lookup_url(key)
+            if blob:
+                files[key] = blob
+            elif dest.is_file():
+                files[key] = dest
+    return files
+
+
+def cmd_serve(args) -> int:
+    files = served_files()
+
+    def resolve(url: str):
+        # Upstream URLs may carry ?download=true; the mirror path never does
+        path = files.get(ltx2_scheduler.url_key(url))
+        if path is None:
+            return None
+        return path, INDEX.known_digest(path)
+
+    server = serve(resolve, args.host, args.port, log=(lambda msg: None) if args.quiet else print)
+    print(f"Serving {len(files)} files on http://{args.host}:{args.port}/")
+    print(f"On other nodes: LTX2_MIRROR_URLS=http://<this-host>:{args.port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return EXIT_OK
+
+
+def cmd_gc(args) -> int:
+    removed, freed = STORE.gc(FOLDERS.values())
+    INDEX.prune()
+    INDEX.save()
+    emit(args, {"removed_blobs": removed, "freed_bytes": freed},
+         [f"Removed {removed} unused blob(s), freed {freed / 1073741824:.1f} GB"])
+    return EXIT_OK
+
+
+def cmd_dedupe(args) -> int:
+    reclaimed = dedupe(STORE, FOLDERS.values(), dry_run=args.dry_run,
+                       log=(lambda msg: None) if args.json else print, digest=INDEX.digest)
+    INDEX.save()
+    emit(args, {"reclaimed_bytes": reclaimed, "dry_run": args.dry_run},
+         [f"{'Can reclaim' if args.dry_run else 'Reclaimed'} {reclaimed / 1073741824:.1f} GB"])
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="LTX-2 workflow manager. Run without arguments for the interactive menu.")
+    parser.add_argument("--json", action="store_true", help="machine-readable output on stdout")
+    parser.add_argument("--offline", action="store_true", help="only use local mirror directories")
+    parser.add_argument("--events", metavar="SINK",
+                        help="JSON-lines download events to -, a file, tcp://host:port or unix:/path")
+    parser.add_argument("--mirror-dir", action="append", default=[], type=Path, metavar="DIR",
+                        help="local mirror directory to try first (repeatable)")
+    parser.add_argument("--mirror-url", action="append", default=[], metavar="URL",
+                        help="LAN cache started with 'serve' on another node (repeatable)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_selection(p):
+        p.add_argument("workflows", nargs="*", type=workflow_key, metavar="WORKFLOW",
+                       help=f"workflow keys: {', '.join(WORKFLOWS)}, kijai, or all")
+        p.add_argument("--gguf", action="append", default=[], type=resolve_gguf, metavar="VARIANT",
+                       help="GGUF variant, e.g. distilled-Q4_K_M (repeatable)")
+        p.add_argument("--diffusion", action="append", default=[], choices=list(KIJAI_DIFFUSION_MODELS),
+                       help="Kijai diffusion model (repeatable)")
+        p.add_argument("--json", action="store_true", default=argparse.SUPPRESS)
+
+    p = sub.add_parser("plan", help="show what an install would download")
+    add_selection(p)
+    p.add_argument("--refresh", action="store_true", help="revalidate cached remote metadata now")
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser("apply", help="download everything in the selection")
+    add_selection(p)
+    p.add_argument("--force", action="store_true", help="re-download model files that already exist")
+    p.add_argument("--ignore-space", action="store_true", help="start even if free space looks too low")
+    p.add_argument("--jobs", type=int, help="files downloaded at once")
+    p.add_argument("--connections", type=int, help="connections per file")
+    p.add_argument("--bandwidth", type=float, help="total cap in MB/s (0 = unlimited)")
+    p.set_defaults(func=cmd_apply)
+
+    p = sub.add_parser("status", help="show which files of a selection are installed")
+    add_selection(p)
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("verify", help="hash new or changed model files and check them")
+    p.add_argument("--json", action="store_true", default=argparse.SUPPRESS)
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser("inspect", help="check every .safetensors header against its file size")
+    p.add_argument("--json", action="store_true", default=argparse.SUPPRESS)
+    p.set_defaults(func=cmd_inspect)
+
+    p = sub.add_parser("gguf", help="check local GGUF files and recommend a quant for this machine")
+    p.add_argument("--vram", type=float, default=0, help="GPU memory in GB (default: detect)")
+    p.add_argument("--ram", type=float, default=0, help="system memory in GB, used when there is no GPU")
+    p.add_argument("--json", action="store_true", default=argparse.SUPPRESS)
+    p.set_defaults(func=cmd_gguf)
+
+    p = sub.add_parser("quota", help="evict unreferenced, least recently used models down to a size")
+    p.add_argument("--limit", type=float, default=0, help="quota in GB (default: LTX2_QUOTA_GB)")
+    p.add_argument("--dry-run", action="store_true", help="only report what would be removed")
+    p.add_argument("--evict-referenced", action="store_true",
+                   help="also remove models that workflows still use, oldest first")
+    p.add_argument("--json", action="store_true", default=argparse.SUPPRESS)
+    p.set_defaults(func=cmd_quota)
+
+    p = sub.add_parser("serve", help="act as a LAN cache for other nodes")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--quiet", action="store_true", help="do not log requests")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("gc", help="remove blobs no model folder links to")
+    p.add_argument("--json", action="store_true", default=argparse.SUPPRESS)
+    p.set_defaults(func=cmd_gc)
+
+    p = sub.add_parser("dedupe", help="link identical model files into the blob store")
+    p.add_argument("--dry-run", action="store_true")
+    p.add_argument("--json", action="store_true", default=argparse.SUPPRESS)
+    p.set_defaults(func=cmd_dedupe)
+    return parser
+
+
+def cli(argv: List[str]) -> int:
+    """Non-interactive entry point"""
+    global EVENTS_SINK
+    args = build_parser().parse_args(argv)
+    if args.command in ("plan", "apply") and not (args.workflows or args.diffusion or args.gguf):
+        print("Nothing selected: give workflow keys, 'all', --gguf or --diffusion", file=sys.stderr)
+        return EXIT_USAGE
+    MIRRORS.dirs += args.mirror_dir
+    MIRRORS.urls += [u.rstrip("/") for u in args.mirror_url]
+    MIRRORS.offline = MIRRORS.offline or args.offline
+    if args.events:
+        EVENTS_SINK = args.events
+    create_dirs()
+    return args.func(args)
+
+
 if __name__ == "__main__":
     try:
+        if len(sys.argv) > 1:
+            sys.exit(cli(sys.argv[1:]))
         main_menu()
     except KeyboardInterrupt:
         print("\n\nExiting...")
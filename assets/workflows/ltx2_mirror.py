@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Resolve upstream URLs to a local directory or LAN cache first, and serve as one"""
+
+import email.utils
+import hashlib
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit
+
+from ltx2_download import (BUFFER_SIZE, DEFAULT_CHUNKS, DEFAULT_CONNECTIONS, DownloadError,
+                           ProgressCallback, RateLimiter, RemoteInfo, RetryCallback, download,
+                           part_path, probe)
+
+DEFAULT_PORT = 8765
+
+
+def mirror_path(url: str) -> str:
+    """Where a URL lives inside a mirror: <host>/<path>, query dropped"""
+    parts = urlsplit(url)
+    return f"{parts.netloc.lower()}{unquote(parts.path)}"
+
+
+def quote_path(path: str) -> str:
+    """The one percent-encoding of an unquoted path that mirror clients and the server both use"""
+    return quote(path, safe="/:@")
+
+
+class Mirrors:
+    """Sources to try for a URL: local directories, then LAN caches, then upstream
+
+    A local directory can use the <host>/<path> layout that serve() exposes,
+    or simply hold files by name (a copied models folder, a USB disk). In
+    offline mode nothing but the local directories is ever consulted.
+    """
+
+    def __init__(self, dirs: List[Path] = (), urls: List[str] = (), offline: bool = False):
+        self.dirs = [Path(d) for d in dirs]
+        self.urls = [u.rstrip("/") for u in urls]
+        self.offline = offline
+
+    @classmethod
+    def from_env(cls) -> "Mirrors":
+        """LTX2_MIRROR_DIRS (os.pathsep separated), LTX2_MIRROR_URLS (comma separated), LTX2_OFFLINE"""
+        dirs = [d for d in os.environ.get("LTX2_MIRROR_DIRS", "").split(os.pathsep) if d]
+        urls = [u.strip() for u in os.environ.get("LTX2_MIRROR_URLS", "").split(",") if u.strip()]
+        offline = os.environ.get("LTX2_OFFLINE", "").lower() in ("1", "true", "yes")
+        return cls(dirs, urls, offline)
+
+    def local(self, url: str) -> Optional[Path]:
+        """A copy of url in one of the local mirror directories"""
+        rel = mirror_path(url)
+        for base in self.dirs:
+            for candidate in (base / rel, base / rel.rsplit("/", 1)[-1]):
+                if candidate.is_file():
+                    return candidate
+        return None
+
+    def remotes(self, url: str) -> List[str]:
+        """URLs to try over the network, LAN caches first"""
+        if self.offline:
+            return []
+        # mirror_path is unquoted for the filesystem; on the wire it has to be encoded again
+        return [f"{base}/{quote_path(mirror_path(url))}" for base in self.urls] + [url]
+
+    def probe(self, url: str) -> RemoteInfo:
+        """Like ltx2_download.probe, answered by the first source that has the file"""
+        local = self.local(url)
+        if local:
+            return RemoteInfo(url, str(local), local.stat().st_size, True)
+        errors = []
+        for candidate in self.remotes(url):
+            try:
+                return probe(candidate)
+            except DownloadError as e:
+                errors.append(str(e))
+        raise DownloadError(errors[-1] if errors else f"{url}: not in any local mirror (offline)")
+
+    def download(self, url: str, dest: Path, connections: int = DEFAULT_CONNECTIONS,
+                 chunks: int = DEFAULT_CHUNKS, progress: Optional[ProgressCallback] = None,
+                 limiter: Optional[RateLimiter] = None, expected_sha256: str = "",
+                 on_retry: Optional[RetryCallback] = None) -> Tuple[str, str]:
+        """Same contract as ltx2_download.download, trying each source in turn
+
+        A source that fails is reported to on_retry before the next is tried.
+        """
+        errors = []
+        local = self.local(url)
+        if local:
+            try:
+                return copy_verified(local, dest, progress, expected_sha256)
+            except (DownloadError, OSError) as e:
+                errors.append(f"{local}: {e}")
+                if on_retry:
+                    on_retry(errors[-1])
+        for candidate in self.remotes(url):
+            try:
+                return download(candidate, dest, connections, chunks, progress, limiter,
+                                expected_sha256, on_retry)
+            except DownloadError as e:
+                errors.append(str(e))
+                if on_retry and candidate != url:
+                    on_retry(errors[-1])
+        if not errors:
+            raise DownloadError(f"{url}: not in any local mirror (offline)")
+        raise DownloadError(errors[-1])
+
+
+def copy_verified(src: Path, dest: Path, progress: Optional[ProgressCallback] = None,
+                  expected_sha256: str = "") -> Tuple[str, str]:
+    """Copy src to dest through dest.part, hashing as it goes; returns (actual, expected)"""
+    part = part_path(dest)
+    total = src.stat().st_size
+    digest = hashlib.sha256()
+    done = 0
+    try:
+        with open(src, "rb") as fin, open(part, "wb") as fout:
+            while True:
+                block = fin.read(BUFFER_SIZE)
+                if not block:
+                    break
+                fout.write(block)
+                digest.update(block)
+                done += len(block)
+                if progress:
+                    progress(done, total)
+        actual = digest.hexdigest()
+        if expected_sha256 and actual != expected_sha256:
+            raise DownloadError(f"SHA-256 mismatch: expected {expected_sha256}, got {actual}")
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    os.replace(part, dest)
+    return actual, expected_sha256
+
+
+class _MirrorHandler(BaseHTTPRequestHandler):
+    """GET/HEAD /<host>/<path> with single byte ranges, from files already on disk"""
+
+    protocol_version = "HTTP/1.1"
+    resolve: Callable[[str], Optional[Tuple[Path, str]]] = None
+    log: Callable[[str], None] = print
+
+    def _target(self) -> Optional[Tuple[Path, str]]:
+        rel = unquote(urlsplit(self.path).path).lstrip("/")
+        if "/" not in rel or ".." in rel.split("/"):
+            return None
+        return self.resolve(f"https://{quote_path(rel)}")
+
+    def _range(self, size: int) -> Optional[Tuple[int, int]]:
+        """(start, end) inclusive for a single-range request, None for the whole file"""
+        value = self.headers.get("Range", "")
+        if not value.startswith("bytes=") or "," in value:
+            return None
+        start, _, end = value[6:].partition("-")
+        if not start:
+            return max(size - int(end), 0), size - 1
+        return int(start), min(int(end), size - 1) if end else size - 1
+
+    def _send(self, body: bool):
+        target = self._target()
+        if not target:
+            self.send_error(404)
+            return
+        path, sha256 = target
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(404)
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            etag = f'"{sha256}"' if sha256 else f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            try:
+                span = self._range(st.st_size)
+            except ValueError:
+                span = None
+            if span and span[0] > span[1]:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{st.st_size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start, end = span or (0, st.st_size - 1)
+            self.send_response(206 if span else 200)
+            if span:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{st.st_size}")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", email.utils.formatdate(st.st_mtime, usegmt=True))
+            self.send_header("Content-Type", "application/octet-stream")
+            self.end_headers()
+            if body:
+                _send_range(self.wfile, self.connection, f, start, end - start + 1)
+
+    def do_GET(self):
+        self._send(True)
+
+    def do_HEAD(self):
+        self._send(False)
+
+    def log_message(self, format, *args):
+        self.log(f"[SERVE] {self.address_string()} {format % args}")
+
+
+def _send_range(wfile, sock, f, offset: int, count: int):
+    """Send count bytes of f from offset, with sendfile where the OS allows it"""
+    wfile.flush()
+    if hasattr(os, "sendfile") and sys.platform != "win32":
+        while count > 0:
+            sent = os.sendfile(sock.fileno(), f.fileno(), offset, min(count, 1 << 30))
+            if sent == 0:
+                break
+            offset += sent
+            count -= sent
+        return
+    f.seek(offset)
+    while count > 0:
+        block = f.read(min(BUFFER_SIZE, count))
+        if not block:
+            break
+        wfile.write(block)
+        count -= len(block)
+
+
+def serve(resolve: Callable[[str], Optional[Tuple[Path, str]]], host: str = "0.0.0.0",
+          port: int = DEFAULT_PORT, log: Callable[[str], None] = print) -> ThreadingHTTPServer:
+    """Start a LAN cache that other nodes can list in LTX2_MIRROR_URLS
+
+    resolve maps an upstream URL to (local file, known SHA-256 or ''), or
+    None when this node does not have it. The server runs on a daemon
+    thread; call shutdown() on the result to stop it.
+    """
+    handler = type("MirrorHandler", (_MirrorHandler,), {
+        "resolve": staticmethod(resolve),
+        "log": staticmethod(log),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
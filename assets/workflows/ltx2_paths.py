@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""Where ComfyUI, its model folders and the LTX-2 workflows live; importing this has no side effects"""
+
+import os
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+COMFY_DIR = SCRIPT_DIR / "ComfyUI"
+MODELS_DIR = COMFY_DIR / "models"
+WORKFLOWS_DIR = SCRIPT_DIR / "workflows" / "ltx2"
+
+# Where ComfyUI runs
+COMFY_URL = os.environ.get("LTX2_COMFY_URL", "http://127.0.0.1:8188")
+
+# Model folders
+FOLDERS = {
+    "checkpoints": MODELS_DIR / "checkpoints",
+    "diffusion_models": MODELS_DIR / "diffusion_models",
+    "text_encoders": MODELS_DIR / "text_encoders",
+    "vae": MODELS_DIR / "vae",
+    "loras": MODELS_DIR / "loras",
+    "latent_upscale_models": MODELS_DIR / "latent_upscale_models",
+    "unet": MODELS_DIR / "unet",
+}
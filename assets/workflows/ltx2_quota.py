@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Treat the model folders as a bounded cache: track use, find references, evict LRU"""
+
+import json
+import os
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+MODEL_SUFFIXES = (".safetensors", ".gguf", ".ckpt", ".pt", ".pth", ".bin", ".sft")
+HISTORY_TIMEOUT = 5
+
+
+def _strings(value) -> Iterable[str]:
+    """Every string anywhere inside a parsed JSON document"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+def model_names(document) -> Set[str]:
+    """Model filenames mentioned in a workflow, prompt or download list
+
+    ComfyUI stores widget values like "ltx2/model.safetensors" and download
+    lists store URLs, so only the last path component is kept.
+    """
+    names = set()
+    for text in _strings(document):
+        text = text.strip()
+        if text.lower().endswith(MODEL_SUFFIXES):
+            names.add(text.replace("\\", "/").rsplit("/", 1)[-1].split("?", 1)[0])
+    return names
+
+
+def referenced_names(workflow_dirs: Iterable[Path]) -> Set[str]:
+    """Model filenames referenced by any workflow JSON directly inside the given folders"""
+    names = set()
+    for folder in workflow_dirs:
+        folder = Path(folder)
+        if not folder.is_dir():
+            continue
+        for path in folder.glob("*.json"):
+            try:
+                names |= model_names(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+    return names
+
+
+class UsageLog:
+    """Last time each model filename was used, persisted next to the models"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        try:
+            self.entries: Dict[str, float] = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def touch(self, names: Iterable[str], when: Optional[float] = None):
+        when = when or time.time()
+        with self.lock:
+            for name in names:
+                if when > self.entries.get(name, 0):
+                    self.entries[name] = when
+
+    def last_used(self, path: Path) -> float:
+        """Latest of the recorded use and when the file was written
+
+        Access time is ignored: the manager's own hashing and inspection reads
+        would make every file look recently used. The write time keeps a fresh
+        download that has not run yet from being evicted first.
+        """
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            mtime = 0
+        with self.lock:
+            return max(self.entries.get(path.name, 0), mtime)
+
+    def save(self):
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(self.entries, indent=1, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+def history_usage(server: str, timeout: float = HISTORY_TIMEOUT) -> Dict[str, float]:
+    """Model filenames from a running ComfyUI's /history, with when each prompt ran
+
+    This is the only record of use besides the log itself. Returns {} if the
+    server is not reachable.
+    """
+    try:
+        with urllib.request.urlopen(server.rstrip("/") + "/history", timeout=timeout) as resp:
+            history = json.loads(resp.read())
+    except (OSError, ValueError):
+        return {}
+
+    used: Dict[str, float] = {}
+    for item in history.values():
+        prompt = item.get("prompt", [])
+        graph = prompt[2] if len(prompt) > 2 else {}
+        when = 0.0
+        for message in item.get("status", {}).get("messages", []):
+            if message[0] in ("execution_start", "execution_success") and "timestamp" in message[1]:
+                when = max(when, message[1]["timestamp"] / 1000)
+        when = when or time.time()
+        for name in model_names(graph):
+            used[name] = max(used.get(name, 0), when)
+    return used
+
+
+class CacheItem:
+    """One set of bytes on disk and every model-folder name that points at it"""
+
+    def __init__(self, paths: List[Path], size: int, last_used: float, referenced: bool):
+        self.paths = paths
+        self.size = size
+        self.last_used = last_used
+        self.referenced = referenced
+
+    def as_dict(self) -> dict:
+        return {
+            "paths": [str(p) for p in self.paths],
+            "size": self.size,
+            "last_used": self.last_used,
+            "referenced": self.referenced,
+        }
+
+
+def cache_items(folders: Iterable[Path], usage: UsageLog, referenced: Set[str]) -> List[CacheItem]:
+    """Model files grouped by inode, so hardlinked and store-linked copies count once"""
+    groups: Dict[Tuple[int, int], List[Path]] = {}
+    sizes: Dict[Tuple[int, int], int] = {}
+    for folder in folders:
+        if not Path(folder).is_dir():
+            continue
+        for entry in os.scandir(folder):
+            if not entry.name.endswith(MODEL_SUFFIXES):
+                continue
+            try:
+                st = os.stat(entry.path)
+            except OSError:
+                continue
+            key = (st.st_dev, st.st_ino)
+            groups.setdefault(key, []).append(Path(entry.path))
+            sizes[key] = st.st_size
+
+    items = []
+    for key, paths in groups.items():
+        items.append(CacheItem(
+            paths,
+            sizes[key],
+            max(usage.last_used(p) for p in paths),
+            any(p.name in referenced for p in paths),
+        ))
+    return items
+
+
+def plan_eviction(items: List[CacheItem], quota: int,
+                  protect_referenced: bool = True) -> Tuple[List[CacheItem], int]:
+    """Items to remove to get under quota bytes, unreferenced then least recently used
+
+    Returns the items and the usage left afterwards, which can still exceed
+    the quota when only protected files remain.
+    """
+    usage = sum(item.size for item in items)
+    order = sorted(items, key=lambda item: (item.referenced, item.last_used))
+    evict = []
+    for item in order:
+        if usage <= quota:
+            break
+        if item.referenced and protect_referenced:
+            break
+        evict.append(item)
+        usage -= item.size
+    return evict, usage
+
+
+def evict(items: List[CacheItem], log: Callable[[str], None] = print) -> int:
+    """Unlink every name of the given items; returns bytes released from the folders"""
+    freed = 0
+    for item in items:
+        for path in item.paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            log(f"[EVICT] {path.name} ({path.parent.name})")
+        freed += item.size
+    return freed
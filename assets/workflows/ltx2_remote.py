@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Cached remote file metadata and the install planner built on top of it"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from ltx2_download import DownloadError, head, part_path, resumable_bytes
+from ltx2_scheduler import Job, url_key
+from ltx2_verify import VerifyIndex
+
+DEFAULT_MAX_AGE = 6 * 3600
+HEAD_WORKERS = 16
+
+# Plan item states
+MISSING = "missing"        # nothing local, full download
+PARTIAL = "partial"        # a resumable .part file exists
+INSTALLED = "installed"    # present and matches upstream as far as we know
+LINK = "link"              # bytes are local already, only links need creating
+OUTDATED = "outdated"      # local copy differs from upstream
+
+
+class MetadataCache:
+    """Content-Length / ETag / Last-Modified per URL, revalidated with conditional HEADs"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        try:
+            self.entries: Dict[str, dict] = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, url: str) -> Optional[dict]:
+        with self.lock:
+            return self.entries.get(url_key(url))
+
+    def refresh(self, urls: Iterable[str], max_age: float = DEFAULT_MAX_AGE, force: bool = False,
+                workers: int = HEAD_WORKERS) -> Dict[str, str]:
+        """Bring entries older than max_age up to date; returns errors by URL"""
+        now = time.time()
+        stale = []
+        for url in dict.fromkeys(urls):
+            entry = self.get(url)
+            if force or not entry or now - entry.get("checked_at", 0) > max_age:
+                stale.append(url)
+
+        errors = {}
+
+        def check(url: str):
+            entry = self.get(url) or {}
+            try:
+                info = head(url, entry.get("etag", ""), entry.get("last_modified", ""))
+            except DownloadError as e:
+                errors[url] = str(e)
+                return
+            with self.lock:
+                if info is None:
+                    # 304: what we have is still current
+                    entry["checked_at"] = time.time()
+                else:
+                    entry = {
+                        "url": url,
+                        "length": info.length,
+                        "etag": info.etag,
+                        "last_modified": info.last_modified,
+                        "sha256": info.sha256,
+                        "checked_at": time.time(),
+                    }
+                self.entries[url_key(url)] = entry
+
+        if stale:
+            with ThreadPoolExecutor(max_workers=min(workers, len(stale))) as pool:
+                list(pool.map(check, stale))
+        return errors
+
+    def save(self):
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(self.entries, indent=1, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+class PlanItem:
+    """What installing one job would cost"""
+
+    def __init__(self, job: Job, state: str, remote_size: int, need: int):
+        self.job = job
+        self.state = state
+        self.remote_size = remote_size
+        self.need = need
+
+    def as_dict(self) -> dict:
+        return {
+            "file": self.job.dest.name,
+            "dest": str(self.job.dest),
+            "links": [str(p) for p in self.job.links],
+            "url": self.job.url,
+            "state": self.state,
+            "remote_size": self.remote_size,
+            "download_bytes": self.need,
+        }
+
+
+def _is_outdated(path: Path, meta: dict, index: Optional[VerifyIndex]) -> bool:
+    """Compare a local file to cached upstream metadata without reading it"""
+    if meta.get("length", -1) >= 0 and path.stat().st_size != meta["length"]:
+        return True
+    if index and meta.get("sha256"):
+        known = index.known_digest(path)
+        return bool(known) and known != meta["sha256"]
+    return False
+
+
+def make_plan(jobs: List[Job], cache: MetadataCache, index: Optional[VerifyIndex] = None) -> List[PlanItem]:
+    """Turn scheduler jobs into plan items using only cached metadata and stat()"""
+    items = []
+    for job in jobs:
+        meta = cache.get(job.url) or {}
+        size = meta.get("length", -1)
+        if job.skip and job.source:
+            if _is_outdated(job.source, meta, index):
+                items.append(PlanItem(job, OUTDATED, size, 0))
+            else:
+                items.append(PlanItem(job, LINK if job.links else INSTALLED, size, 0))
+        elif part_path(job.dest).exists():
+            done = resumable_bytes(job.dest)
+            items.append(PlanItem(job, PARTIAL, size, max(size - done, 0) if size >= 0 else -1))
+        else:
+            items.append(PlanItem(job, MISSING, size, size))
+    return items
+
+
+def free_space(path: Path) -> int:
+    """Free bytes on the filesystem that holds path (or its nearest existing parent)"""
+    path = Path(path).resolve()
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    return shutil.disk_usage(path).free
+
+
+def summarize(items: List[PlanItem], target: Path) -> dict:
+    """Totals for a plan, including whether it fits on disk
+
+    fits is None when the known sizes fit but some files' sizes are unknown.
+    """
+    unknown = [item for item in items if item.state in (MISSING, PARTIAL) and item.need < 0]
+    need = sum(max(item.need, 0) for item in items)
+    free = free_space(target)
+    counts: Dict[str, int] = {}
+    for item in items:
+        counts[item.state] = counts.get(item.state, 0) + 1
+    return {
+        "download_bytes": need,
+        "free_bytes": free,
+        "fits": False if need > free else None if unknown else True,
+        "unknown_sizes": len(unknown),
+        "counts": counts,
+    }
+
+
+def print_plan(items: List[PlanItem], summary: dict, log: Callable[[str], None] = print):
+    """Human-readable plan"""
+    markers = {MISSING: "[GET]", PARTIAL: "[RES]", INSTALLED: "[OK]", LINK: "[LNK]", OUTDATED: "[OLD]"}
+    for item in sorted(items, key=lambda item: item.need, reverse=True):
+        size = f"{item.need / 1073741824:6.2f} GB" if item.need >= 0 else "     ? GB"
+        log(f"{markers[item.state]:6} {size}  {item.job.dest.name}")
+    gb = 1073741824
+    log(f"\nDownload: {summary['download_bytes'] / gb:.1f} GB | Free: {summary['free_bytes'] / gb:.1f} GB")
+    if summary["unknown_sizes"]:
+        log(f"Size unknown for {summary['unknown_sizes']} file(s) (offline or server error)")
+    if summary["fits"] is False:
+        log("WARNING: not enough free space for this plan")
+    elif summary["fits"] is None:
+        log("Cannot tell whether this plan fits until every size is known")
+    if summary["counts"].get(OUTDATED):
+        log(f"{summary['counts'][OUTDATED]} installed file(s) differ from upstream; use Re-download to refresh")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Deduplicated, largest-first parallel download scheduler"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+from ltx2_download import (DEFAULT_CHUNKS, DEFAULT_CONNECTIONS, DownloadError,
+                           ProgressCallback, RateLimiter, RemoteInfo, download, probe)
+from ltx2_events import FAILED, FINISHED, QUEUED, STARTED, VERIFIED
+from ltx2_mirror import quote_path
+from ltx2_store import BlobStore, link_file
+from ltx2_verify import VerifyIndex
+
+DEFAULT_JOBS = 3
+PROBE_WORKERS = 16
+
+Entry = Tuple[Path, str]
+
+
+def url_key(url: str) -> str:
+    """Normalise a URL so that ?download=true variants and quoting differences count as the same file"""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k != "download"]
+    return urlunsplit((parts.scheme, parts.netloc.lower(), quote_path(unquote(parts.path)), urlencode(query), ""))
+
+
+class Job:
+    """One remote file and every destination it has to end up at"""
+
+    def __init__(self, url: str, dest: Path, store: Optional[BlobStore] = None,
+                 index: Optional[VerifyIndex] = None, expected: str = ""):
+        self.url = url
+        self.dest = dest
+        self.store = store
+        self.index = index
+        self.expected = expected
+        self.links: List[Path] = []
+        self.source: Optional[Path] = None
+        self.digest = ""
+        self.size = -1
+        self.skip = False
+        self.ok: Optional[bool] = None
+
+    @property
+    def targets(self) -> List[Path]:
+        return [self.dest] + self.links
+
+
+def plan(entries: Iterable[Entry], force: bool = False, store: Optional[BlobStore] = None,
+         index: Optional[VerifyIndex] = None, checksums: Optional[Dict[str, str]] = None) -> List[Job]:
+    """Collapse (dest, url) pairs into one job per remote file
+
+    Without force, a job whose file is already on disk (at any of its
+    targets, or in the blob store) is satisfied by linking instead. With a
+    store, finished downloads are ingested so later installs can link to them;
+    with an index, their streamed hashes are recorded for later verification.
+    checksums maps filenames to known SHA-256 values.
+    """
+    checksums = checksums or {}
+    jobs: List[Job] = []
+    by_url = {}
+    seen = set()
+
+    for dest, url in entries:
+        if dest in seen:
+            continue
+        seen.add(dest)
+        job = by_url.get(url_key(url))
+        if job:
+            job.links.append(dest)
+        else:
+            job = by_url[url_key(url)] = Job(url, dest, store, index, checksums.get(dest.name, ""))
+            jobs.append(job)
+
+    if force:
+        return jobs
+    for job in jobs:
+        present = [t for t in job.targets if t.exists()]
+        if present:
+            job.source = present[0]
+        elif store:
+            job.source = store.lookup_url(url_key(job.url))
+            if job.source:
+                job.digest = job.source.name
+        if job.source:
+            job.skip = True
+            job.links = [t for t in job.targets if not t.exists()]
+    return jobs
+
+
+def measure(jobs: List[Job], prober: Callable[[str], RemoteInfo] = probe):
+    """Fill in remote sizes the jobs do not already know, in parallel"""
+    def size_of(job: Job):
+        try:
+            job.size = prober(job.url).length
+        except DownloadError:
+            job.size = -1
+
+    pending = [job for job in jobs if not job.skip and job.size < 0]
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(pending))) as pool:
+            list(pool.map(size_of, pending))
+
+
+class _Totals:
+    """Aggregates per-file progress into one overall counter"""
+
+    def __init__(self, total: int, callback: Optional[ProgressCallback]):
+        self.total = total
+        self.done = 0
+        self.callback = callback
+        self.lock = threading.Lock()
+
+    def tracker(self) -> ProgressCallback:
+        last = [0]
+
+        def update(done: int, _total: int):
+            with self.lock:
+                self.done += done - last[0]
+                last[0] = done
+                if self.callback:
+                    self.callback(self.done, self.total)
+        return update
+
+
+def run(jobs: List[Job], max_jobs: int = DEFAULT_JOBS, connections: int = DEFAULT_CONNECTIONS,
+        chunks: int = DEFAULT_CHUNKS, bandwidth: float = 0,
+        log: Callable[[str], None] = print, progress: Optional[ProgressCallback] = None,
+        mirrors=None, events=None) -> bool:
+    """Run a plan: biggest downloads first, at most max_jobs files at a time
+
+    bandwidth caps the combined rate of every connection, in bytes per second.
+    mirrors (an ltx2_mirror.Mirrors) is asked for each file before upstream.
+    events (an ltx2_events.EventStream) receives queued/started/progress/
+    retry/verified/failed events per file and one finished event at the end.
+    Returns True when every target ended up in place.
+    """
+    for job in jobs:
+        for target in job.targets:
+            if job.skip and target.exists():
+                log(f"[SKIP] {target.name} already exists")
+
+    measure(jobs, mirrors.probe if mirrors else probe)
+    pending = sorted((job for job in jobs if not job.skip), key=lambda job: job.size, reverse=True)
+    limiter = RateLimiter(bandwidth)
+    totals = _Totals(sum(max(job.size, 0) for job in pending), progress)
+    if events:
+        for job in pending:
+            events.emit(QUEUED, file=job.dest.name, dest=str(job.dest), url=job.url, size=job.size)
+
+    def fetch(job: Job):
+        log(f"[DOWN] {job.dest.name}")
+        callback, tracker = totals.tracker(), None
+        if events:
+            tracker = events.tracker(job.dest.name, job.size)
+            update = callback
+
+            def callback(done: int, total: int):
+                update(done, total)
+                tracker(done, total)
+
+            events.emit(STARTED, file=job.dest.name, url=job.url, size=job.size)
+        try:
+            job.dest.parent.mkdir(parents=True, exist_ok=True)
+            fetcher = mirrors.download if mirrors else download
+            job.digest, job.expected = fetcher(job.url, job.dest, connections, chunks, callback,
+                                               limiter, job.expected, tracker.retry if tracker else None)
+            job.source = job.dest
+            if job.store:
+                job.source = job.store.blob_path(job.store.ingest(job.dest, job.digest, url_key(job.url)))
+            if job.index:
+                job.index.record(job.dest, job.digest, job.expected)
+            job.ok = True
+            log(f"[DONE] {job.dest.name}")
+            if events:
+                size = job.dest.stat().st_size
+                events.emit(VERIFIED, file=job.dest.name, sha256=job.digest, expected=job.expected,
+                            match=job.digest == job.expected if job.expected else None, size=size,
+                            seconds=round(tracker.elapsed(), 2), retries=tracker.retries)
+        except (DownloadError, OSError) as e:
+            job.ok = False
+            log(f"[FAIL] {job.dest.name} - {e}")
+            if events:
+                events.emit(FAILED, file=job.dest.name, error=str(e), retries=tracker.retries)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, max_jobs)) as pool:
+            list(pool.map(fetch, pending))
+
+    for job in jobs:
+        if job.skip:
+            job.ok = True
+        if not job.ok:
+            continue
+        for link in job.links:
+            try:
+                link_file(job.source, link)
+                if job.index and job.digest:
+                    job.index.record(link, job.digest, job.expected)
+                log(f"[LINK] {link.name} -> {link.parent.name}")
+            except OSError as e:
+                job.ok = False
+                log(f"[FAIL] {link.name} - {e}")
+
+    for index in {id(job.index): job.index for job in jobs if job.index}.values():
+        index.save()
+    if events:
+        events.emit(FINISHED, ok=all(job.ok for job in jobs), files=len(jobs),
+                    downloaded=sum(1 for job in pending if job.ok),
+                    failed=[job.dest.name for job in jobs if not job.ok])
+    return all(job.ok for job in jobs)
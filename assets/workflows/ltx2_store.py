@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Content-addressed blob store that lets model folders share identical files"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+HASH_BUFFER = 8 * 1024 * 1024
+
+
+def hash_file(path: Path) -> str:
+    """SHA-256 of a file, read in large blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(HASH_BUFFER)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def link_file(src: Path, dest: Path):
+    """Make dest refer to src: hardlink, else symlink, else a plain copy"""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        try:
+            os.symlink(Path(src).resolve(), tmp)
+        except OSError:
+            shutil.copy2(src, tmp)
+    os.replace(tmp, dest)
+
+
+def same_file(a: Path, b: Path) -> bool:
+    """True if both paths already point at the same bytes on disk"""
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+class BlobStore:
+    """Blobs live at <root>/sha256/<ab>/<digest>; folder entries link to them"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.urls_path = self.root / "urls.json"
+        self.lock = threading.Lock()
+        self._urls: Optional[Dict[str, str]] = None
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / "sha256" / digest[:2] / digest
+
+    def blobs(self) -> List[Path]:
+        """Every blob currently in the store"""
+        base = self.root / "sha256"
+        if not base.is_dir():
+            return []
+        return [p for sub in base.iterdir() if sub.is_dir() for p in sub.iterdir() if p.is_file()]
+
+    def _load_urls(self) -> Dict[str, str]:
+        if self._urls is None:
+            try:
+                self._urls = json.loads(self.urls_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._urls = {}
+        return self._urls
+
+    def lookup_url(self, url_key: str) -> Optional[Path]:
+        """Blob previously downloaded from this URL, if it is still in the store"""
+        with self.lock:
+            digest = self._load_urls().get(url_key)
+        if digest and self.blob_path(digest).exists():
+            return self.blob_path(digest)
+        return None
+
+    def remember_url(self, url_key: str, digest: str):
+        """Record which blob a URL resolved to"""
+        with self.lock:
+            urls = self._load_urls()
+            if urls.get(url_key) == digest:
+                return
+            urls[url_key] = digest
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.urls_path.with_name(self.urls_path.name + ".tmp")
+            tmp.write_text(json.dumps(urls, indent=2, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.urls_path)
+
+    def forget(self, path: Path) -> int:
+        """Drop the blob a folder entry links to and every URL recorded for it; returns URLs forgotten
+
+        Used when the bytes turn out to be bad, so a later plan downloads
+        them again instead of linking the same content back.
+        """
+        path = Path(path)
+        with self.lock:
+            urls = self._load_urls()
+            digests = {d for d in urls.values() if same_file(self.blob_path(d), path)}
+            if not digests:
+                return 0
+            for digest in digests:
+                self.blob_path(digest).unlink(missing_ok=True)
+            stale = [k for k, d in urls.items() if d in digests]
+            for url_key in stale:
+                del urls[url_key]
+            tmp = self.urls_path.with_name(self.urls_path.name + ".tmp")
+            tmp.write_text(json.dumps(urls, indent=2, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.urls_path)
+        return len(stale)
+
+    def ingest(self, path: Path, digest: Optional[str] = None, url_key: Optional[str] = None) -> str:
+        """Move a file's bytes into the store and leave a link in its place"""
+        path = Path(path)
+        digest = digest or hash_file(path)
+        blob = self.blob_path(digest)
+        with self.lock:
+            if blob.exists():
+                if not same_file(blob, path):
+                    link_file(blob, path)
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(path, blob)
+                except OSError:
+                    # Different filesystem or no hardlinks: move the bytes, link back
+                    shutil.move(str(path), str(blob))
+                    link_file(blob, path)
+        if url_key:
+            self.remember_url(url_key, digest)
+        return digest
+
+    def gc(self, folders: Iterable[Path]) -> Tuple[int, int]:
+        """Remove blobs nothing links to any more; returns (count, bytes)"""
+        referenced = set()
+        for folder in folders:
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder):
+                if entry.is_symlink():
+                    referenced.add(Path(os.path.realpath(entry.path)))
+        removed = freed = 0
+        with self.lock:
+            for blob in self.blobs():
+                st = blob.stat()
+                if st.st_nlink <= 1 and blob.resolve() not in referenced:
+                    blob.unlink()
+                    removed += 1
+                    freed += st.st_size
+        return removed, freed
+
+
+def dedupe(store: BlobStore, folders: Iterable[Path], dry_run: bool = False,
+           log: Callable[[str], None] = print, digest: Callable[[Path], str] = hash_file) -> int:
+    """Turn identical files across folders into links to one blob; returns bytes reclaimed
+
+    digest can be swapped for a cached hasher so unchanged files are not reread.
+    """
+    # Only files that share a size with another file can be duplicates
+    by_size: Dict[int, List[Path]] = {}
+    for folder in folders:
+        if not folder.is_dir():
+            continue
+        for entry in os.scandir(folder):
+            if entry.is_file(follow_symlinks=False) and not entry.name.endswith((".part", ".part.json", ".tmp")):
+                by_size.setdefault(entry.stat().st_size, []).append(Path(entry.path))
+
+    reclaimed = 0
+    for size, paths in sorted(by_size.items(), reverse=True):
+        if len(paths) < 2 or size == 0:
+            continue
+        # Paths that are already hardlinks of each other only need hashing once
+        unique: Dict[Tuple[int, int], List[Path]] = {}
+        for p in paths:
+            st = p.stat()
+            unique.setdefault((st.st_dev, st.st_ino), []).append(p)
+        if len(unique) < 2:
+            continue
+
+        by_digest: Dict[str, List[List[Path]]] = {}
+        for group in unique.values():
+            by_digest.setdefault(digest(group[0]), []).append(group)
+
+        for sha256, groups in by_digest.items():
+            if len(groups) < 2:
+                continue
+            names = [p for group in groups for p in group]
+            log(f"[DUPE] {size / 1048576:,.0f} MB x{len(groups)}: " + ", ".join(p.name for p in names))
+            reclaimed += size * (len(groups) - 1)
+            if dry_run:
+                continue
+            for p in names:
+                store.ingest(p, sha256)
+    return reclaimed
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Persistent index of model file hashes, keyed by (path, size, mtime_ns)"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from ltx2_store import hash_file
+
+HASH_WORKERS = 4
+
+# Verification states
+VERIFIED = "verified"      # hash matches the upstream checksum
+MISMATCH = "mismatch"      # hash differs from the upstream checksum
+UNCHECKED = "unchecked"    # hashed, but nothing upstream to compare against
+STALE = "stale"            # changed on disk since it was last hashed
+MISSING = "missing"
+
+
+class VerifyIndex:
+    """Remembers each file's SHA-256 until its size or mtime changes"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        try:
+            self.entries: Dict[str, dict] = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _fresh(self, path: Path) -> Optional[dict]:
+        """The entry for path if the file has not changed since it was hashed"""
+        entry = self.entries.get(str(path))
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry
+        return None
+
+    def status(self, path: Path) -> str:
+        """Verification state from stat alone; never reads the file"""
+        if not path.exists():
+            return MISSING
+        with self.lock:
+            entry = self._fresh(path)
+        if not entry:
+            return STALE
+        if not entry.get("expected"):
+            return UNCHECKED
+        return VERIFIED if entry["sha256"] == entry["expected"] else MISMATCH
+
+    def known_digest(self, path: Path) -> str:
+        """SHA-256 of path if it is already indexed and unchanged, else ''"""
+        with self.lock:
+            entry = self._fresh(path)
+        return entry["sha256"] if entry else ""
+
+    def expected(self, path: Path) -> str:
+        """Upstream checksum recorded for path, even if the file changed since"""
+        with self.lock:
+            return self.entries.get(str(path), {}).get("expected", "")
+
+    def record(self, path: Path, sha256: str, expected: str = ""):
+        """Store a hash computed elsewhere, e.g. while downloading"""
+        st = path.stat()
+        with self.lock:
+            old = self.entries.get(str(path), {})
+            self.entries[str(path)] = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "sha256": sha256,
+                "expected": expected or old.get("expected", ""),
+            }
+
+    def digest(self, path: Path) -> str:
+        """SHA-256 of path, hashing only if it changed since last time"""
+        with self.lock:
+            entry = self._fresh(path)
+        if entry:
+            return entry["sha256"]
+        sha256 = hash_file(path)
+        self.record(path, sha256)
+        return sha256
+
+    def prune(self):
+        """Drop entries for files that no longer exist"""
+        with self.lock:
+            self.entries = {k: v for k, v in self.entries.items() if os.path.exists(k)}
+
+    def save(self):
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(self.entries, indent=1, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+def model_files(folders: Iterable[Path]) -> List[Path]:
+    """Finished model files directly inside the given folders"""
+    files = []
+    for folder in folders:
+        if not folder.is_dir():
+            continue
+        for entry in os.scandir(folder):
+            if entry.is_file() and not entry.name.endswith((".part", ".part.json", ".tmp")):
+                files.append(Path(entry.path))
+    return files
+
+
+def verify_tree(index: VerifyIndex, folders: Iterable[Path], checksums: Optional[Dict[str, str]] = None,
+                workers: int = HASH_WORKERS, log: Callable[[str], None] = print) -> Dict[Path, str]:
+    """Verify every model file, rehashing only the ones whose stat changed"""
+    checksums = checksums or {}
+    files = model_files(folders)
+
+    def check(path: Path) -> str:
+        expected = checksums.get(path.name) or index.expected(path)
+        index.record(path, index.digest(path), expected)
+        return index.status(path)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = dict(zip(files, pool.map(check, files)))
+
+    index.prune()
+    index.save()
+    for path, state in sorted(results.items()):
+        marker = {VERIFIED: "[OK]", MISMATCH: "[BAD]"}.get(state, "[??]")
+        log(f"{marker} {path.name} ({path.parent.name}) - {state}")
+    return results
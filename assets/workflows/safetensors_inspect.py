@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Check .safetensors files from their header alone, without loading tensor data"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+INSPECT_WORKERS = 8
+MAX_HEADER_SIZE = 100 * 1024 * 1024
+
+DTYPE_SIZES = {
+    "F64": 8, "F32": 4, "F16": 2, "BF16": 2,
+    "I64": 8, "I32": 4, "I16": 2, "I8": 1,
+    "U64": 8, "U32": 4, "U16": 2, "U8": 1,
+    "BOOL": 1, "F8_E4M3": 1, "F8_E5M2": 1, "F8_E8M0": 1,
+}
+
+
+class HeaderReport:
+    """What the header says about one file, and whether it adds up"""
+
+    def __init__(self, path: Path, size: int):
+        self.path = path
+        self.size = size
+        self.tensors = 0
+        self.params = 0
+        self.dtypes: Dict[str, int] = {}  # dtype -> parameter count
+        self.metadata: Dict[str, str] = {}
+        self.errors: List[str] = []
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def as_dict(self) -> dict:
+        return {
+            "path": str(self.path),
+            "size": self.size,
+            "ok": self.ok,
+            "errors": self.errors,
+            "tensors": self.tensors,
+            "params": self.params,
+            "dtypes": self.dtypes,
+            "metadata": self.metadata,
+        }
+
+
+def _read_header(path: Path, size: int) -> bytes:
+    """Length prefix plus JSON header, through a read-only memory map"""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        (length,) = struct.unpack("<Q", mm[:8])
+        if length > min(size - 8, MAX_HEADER_SIZE):
+            raise ValueError(f"header length {length} does not fit in a {size} byte file")
+        return mm[8:8 + length]
+
+
+def _ints(values) -> bool:
+    """True for a list of plain integers (JSON true/false are not dimensions or offsets)"""
+    return isinstance(values, list) and all(isinstance(v, int) and not isinstance(v, bool) for v in values)
+
+
+def inspect(path: Path) -> HeaderReport:
+    """Parse and sanity-check the header of one .safetensors file"""
+    path = Path(path)
+    try:
+        size = path.stat().st_size
+    except OSError as e:
+        report = HeaderReport(path, -1)
+        report.errors.append(str(e))
+        return report
+
+    report = HeaderReport(path, size)
+    if size < 8:
+        report.errors.append("file is shorter than the 8-byte length prefix")
+        return report
+
+    try:
+        raw = _read_header(path, size)
+        header = json.loads(raw)
+    except (OSError, ValueError) as e:
+        report.errors.append(f"unreadable header: {e}")
+        return report
+    if not isinstance(header, dict):
+        report.errors.append("header is not a JSON object")
+        return report
+
+    data_size = size - 8 - len(raw)
+    metadata = header.pop("__metadata__", None) or {}
+    if isinstance(metadata, dict):
+        report.metadata = metadata
+    else:
+        report.errors.append("__metadata__ is not a JSON object")
+    spans = []
+    for name, info in header.items():
+        if not isinstance(info, dict) or not {"dtype", "shape", "data_offsets"} <= info.keys():
+            report.errors.append(f"{name}: malformed tensor entry")
+            continue
+        dtype, shape, offsets = info["dtype"], info["shape"], info["data_offsets"]
+        if not isinstance(dtype, str):
+            report.errors.append(f"{name}: dtype {dtype!r} is not a string")
+            continue
+        if not _ints(shape) or any(dim < 0 for dim in shape):
+            report.errors.append(f"{name}: shape {shape!r} is not a list of non-negative integers")
+            continue
+        if not _ints(offsets) or len(offsets) != 2:
+            report.errors.append(f"{name}: data_offsets {offsets!r} is not a pair of integers")
+            continue
+        begin, end = offsets
+        count = 1
+        for dim in shape:
+            count *= dim
+        report.tensors += 1
+        report.params += count
+        report.dtypes[dtype] = report.dtypes.get(dtype, 0) + count
+        if not 0 <= begin <= end:
+            report.errors.append(f"{name}: bad offsets {begin}-{end}")
+        elif end > data_size:
+            report.errors.append(f"{name}: ends at {end}, data section is only {data_size} bytes (truncated?)")
+        elif dtype in DTYPE_SIZES and end - begin != count * DTYPE_SIZES[dtype]:
+            report.errors.append(f"{name}: {end - begin} bytes for {count} x {dtype}")
+        spans.append((begin, end, name))
+
+    spans.sort()
+    for (_, prev_end, prev), (begin, _, name) in zip(spans, spans[1:]):
+        if begin < prev_end:
+            report.errors.append(f"{name} overlaps {prev}")
+            break
+    return report
+
+
+def safetensors_files(roots: Iterable[Path]) -> List[Path]:
+    """Every .safetensors file under the given files or folders"""
+    files = []
+    for root in roots:
+        root = Path(root)
+        if root.is_file():
+            files.append(root)
+            continue
+        for dirpath, _, names in os.walk(root):
+            files.extend(Path(dirpath) / n for n in names if n.endswith(".safetensors"))
+    return files
+
+
+def inspect_tree(roots: Iterable[Path], workers: int = INSPECT_WORKERS) -> List[HeaderReport]:
+    """Inspect every .safetensors file under roots in parallel"""
+    files = safetensors_files(roots)
+    if not files:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers, len(files))) as pool:
+        return list(pool.map(inspect, files))
+
+
+class HeaderCache:
+    """Remembers reports until a file's size or mtime changes"""
+
+    def __init__(self, inspector: Callable[[Path], object] = None):
+        self.inspector = inspector or inspect
+        self.reports: Dict[str, tuple] = {}
+
+    def get(self, path: Path):
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        key = (st.st_size, st.st_mtime_ns)
+        cached = self.reports.get(str(path))
+        if cached and cached[0] == key:
+            return cached[1]
+        report = self.inspector(path)
+        self.reports[str(path)] = (key, report)
+        return report
+
+
+def format_report(report: HeaderReport) -> str:
+    """One-line summary"""
+    if not report.ok:
+        return f"[BAD] {report.path.name} - {report.errors[0]}"
+    mix = ", ".join(f"{dtype} {count / report.params:.0%}" for dtype, count in
+                    sorted(report.dtypes.items(), key=lambda kv: -kv[1])) if report.params else "empty"
+    return f"[OK] {report.path.name} - {report.tensors} tensors, {report.params / 1e9:.2f}B params ({mix})"
+
+
+if __name__ == "__main__":
+    as_json = "--json" in sys.argv
+    roots = [Path(a) for a in sys.argv[1:] if a != "--json"] or [Path(".")]
+    reports = inspect_tree(roots)
+    if as_json:
+        print(json.dumps([r.as_dict() for r in reports], indent=2))
+    else:
+        for r in reports:
+            print(format_report(r))
+    sys.exit(0 if all(r.ok for r in reports) else 1)
@@ -1,8 +1,67 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { getAppConfig } from '@/lib/config-helper';
+import crypto from 'crypto';
 import fs from 'fs';
 import path from 'path';
 
+// [node id, input], plus the strength input for LoRA slots
+type Target = [string, string, (string | null)?];
+
+interface CompiledTemplate {
+    graph: Record<string, any>;
+    slots: Record<string, Target[]>;
+    source_sha256: string;
+}
+
+// Slots the character generator cannot work without
+const REQUIRED_SLOTS = ['positive_prompt', 'negative_prompt', 'seed', 'loras', 'save_prefix'];
+
+const templateCache = new Map<string, { mtimeMs: number; sourceMtimeMs: number; template: CompiledTemplate }>();
+
+/**
+ * Load a compiled workflow manifest once, reloading only when it or its source workflow changes.
+ * A manifest compiled from an older version of the source JSON is rejected rather than silently used.
+ */
+function loadTemplate(name: string): CompiledTemplate {
+    const workflowsDir = path.join(process.cwd(), '../assets/workflows');
+    const manifestPath = path.join(workflowsDir, `compiled/${name}.manifest.json`);
+    const sourcePath = path.join(workflowsDir, `${name}.json`);
+    let mtimeMs: number;
+    let sourceMtimeMs: number;
+    try {
+        mtimeMs = fs.statSync(manifestPath).mtimeMs;
+    } catch {
+        throw new Error(`Workflow manifest not found at ${manifestPath}. Run: python scripts/compile_workflows.py`);
+    }
+    try {
+        sourceMtimeMs = fs.statSync(sourcePath).mtimeMs;
+    } catch {
+        throw new Error(`Workflow source not found at ${sourcePath}`);
+    }
+    const cached = templateCache.get(name);
+    if (cached && cached.mtimeMs === mtimeMs && cached.sourceMtimeMs === sourceMtimeMs) {
+        return cached.template;
+    }
+    const template: CompiledTemplate = JSON.parse(fs.readFileSync(manifestPath, 'utf-8'));
+    const digest = crypto.createHash('sha256').update(fs.readFileSync(sourcePath)).digest('hex');
+    if (template.source_sha256 !== digest) {
+        templateCache.delete(name);
+        throw new Error(`Workflow ${name}.json changed since it was compiled. Run: python scripts/compile_workflows.py`);
+    }
+    const missing = REQUIRED_SLOTS.filter(slot => !template.slots[slot]?.length);
+    if (missing.length > 0) {
+        throw new Error(`Workflow ${name} has no ${missing.join(', ')} slot; check the template and recompile`);
+    }
+    templateCache.set(name, { mtimeMs, sourceMtimeMs, template });
+    return template;
+}
+
+function setSlot(workflow: Record<string, any>, targets: Target[] | undefined, value: any) {
+    for (const [nodeId, input] of targets || []) {
+        workflow[nodeId].inputs[input] = value;
+    }
+}
+
 /**
  * Generate images using ComfyUI with character-specific LoRA
  */
@@ -50,96 +109,49 @@ export async function POST(request: NextRequest) {
             }, { status: 400 });
         }
 
-        // Load the API-format workflow from assets folder
-        const workflowPath = path.join(process.cwd(), '../assets/workflows/flux-image-generation.json');
-        let workflowTemplate: any;
-
+        // Precompiled template and slot map (scripts/compile_workflows.py)
+        let compiled: CompiledTemplate;
         try {
-            workflowTemplate = JSON.parse(fs.readFileSync(workflowPath, 'utf-8'));
+            compiled = loadTemplate('flux-image-generation');
         } catch (e: any) {
-            console.error('Could not load workflow template:', e.message);
-            console.warn('Attempted path:', workflowPath);
+            console.error('Could not load workflow manifest:', e.message);
             return NextResponse.json({
                 success: false,
-                error: `Workflow not found. Please ensure z-image-new1.json exists in assets/workflows/`,
+                error: e.message,
             }, { status: 500 });
         }
-
-        // Update workflow with character-specific parameters
-        // API format uses object keys for nodes
-
-        // Update positive prompt (node 171 - ImpactWildcardProcessor)
-        // We set both wildcard_text and populated_text to ensure consistency
-        if (workflowTemplate['171']?.inputs) {
-            workflowTemplate['171'].inputs.wildcard_text = prompt;
-            workflowTemplate['171'].inputs.populated_text = prompt;
-        } else if (workflowTemplate['33']?.inputs) {
-            // Fallback to old node if something is wrong, though we expect 171
-            workflowTemplate['33'].inputs.string = prompt;
-        }
-
-        // Update negative prompt (node 34 - String Literal)
-        if (workflowTemplate['34']?.inputs) {
-            workflowTemplate['34'].inputs.string = negativePrompt || '';
-        }
-
-        // Update LoRA (node 131 - Lora Loader Stack rgthree)
-        if (workflowTemplate['131']?.inputs) {
-            // Check if we have multiple slots
-            const slots = body.loraSlots || [];
-
-            if (slots.length > 0) {
-                // Map up to 4 slots
-                for (let i = 1; i <= 4; i++) {
-                    const slot = slots[i - 1];
-                    const num = i < 10 ? `0${i}` : i;
-
-                    if (slot && slot.path && slot.path !== '') {
-                        workflowTemplate['131'].inputs[`lora_${num}`] = slot.path;
-                        workflowTemplate['131'].inputs[`strength_${num}`] = slot.strength ?? 1.0;
-                    } else {
-                        workflowTemplate['131'].inputs[`lora_${num}`] = "None";
-                        workflowTemplate['131'].inputs[`strength_${num}`] = 0;
-                    }
-                }
-            } else {
-                // Legacy: Single LoRA
-                workflowTemplate['131'].inputs.lora_01 = loraPath;
-                workflowTemplate['131'].inputs.strength_01 = 1.0;
-
-                workflowTemplate['131'].inputs.lora_02 = "None";
-                workflowTemplate['131'].inputs.strength_02 = 0;
-                workflowTemplate['131'].inputs.lora_03 = "None";
-                workflowTemplate['131'].inputs.strength_03 = 0;
-                workflowTemplate['131'].inputs.lora_04 = "None";
-                workflowTemplate['131'].inputs.strength_04 = 0;
+        const workflowTemplate = structuredClone(compiled.graph);
+        const slots = compiled.slots;
+
+        // Prompt nodes (ImpactWildcardProcessor sets both wildcard_text and populated_text)
+        setSlot(workflowTemplate, slots.positive_prompt, prompt);
+        setSlot(workflowTemplate, slots.negative_prompt, negativePrompt || '');
+
+        // LoRA stack: up to as many slots as the loader has, unused ones switched off
+        const loraSlots = body.loraSlots?.length ? body.loraSlots : [{ path: loraPath, strength: 1.0 }];
+        (slots.loras || []).forEach(([nodeId, loraInput, strengthInput], i) => {
+            const slot = loraSlots[i];
+            const inputs = workflowTemplate[nodeId].inputs;
+            const used = slot && slot.path && slot.path !== '';
+            inputs[loraInput] = used ? slot.path : 'None';
+            if (strengthInput) {
+                inputs[strengthInput] = used ? (slot.strength ?? 1.0) : 0;
             }
-        }
-
-        // Update Seed (node 3 - KSampler)
-        if (workflowTemplate['3']?.inputs) {
-            workflowTemplate['3'].inputs.seed = Math.floor(Math.random() * 1000000000000000);
-        }
+        });
 
-        // Update batch size (node 13 - EmptyLatent)
-        if (workflowTemplate['13']?.inputs) {
-            workflowTemplate['13'].inputs.batch_size = numImages || 1;
-        }
+        setSlot(workflowTemplate, slots.seed, Math.floor(Math.random() * 1000000000000000));
+        setSlot(workflowTemplate, slots.batch_size, numImages || 1);
 
-        // Update AspectRatio and Resolution (node 30 - AspectRatioImageSize)
-        if (workflowTemplate['30']?.inputs) {
-            workflowTemplate['30'].inputs.width = 1280; // Increased from 768
-            workflowTemplate['30'].inputs.height = 0; // Auto-calculated
-            workflowTemplate['30'].inputs.aspect_ratio = aspectRatio || '1:1';
-            workflowTemplate['30'].inputs.direction = 'Vertical';
-        }
+        // Resolution (AspectRatioImageSize): fixed long side, height derived from the ratio
+        setSlot(workflowTemplate, slots.width, 1280);
+        setSlot(workflowTemplate, slots.height, 0);
+        setSlot(workflowTemplate, slots.aspect_ratio, aspectRatio || '1:1');
+        setSlot(workflowTemplate, slots.direction, 'Vertical');
 
-        // CRITICAL FIX: Update SaveImage node (node 9) filename prefix to use timestamp
+        // CRITICAL FIX: Update SaveImage filename prefix to use timestamp
         // This ensures each generation creates a NEW file instead of overwriting the same one
         const timestamp = Date.now();
-        if (workflowTemplate['9']?.inputs) {
-            workflowTemplate['9'].inputs.filename_prefix = `zimage/${characterSlug}_${timestamp}_`;
-        }
+        setSlot(workflowTemplate, slots.save_prefix, `zimage/${characterSlug}_${timestamp}_`);
 
         console.log('\n=== CHARACTER IMAGE GENERATION ===');
         console.log('Character:', characterSlug);
@@ -147,14 +159,7 @@ export async function POST(request: NextRequest) {
         console.log('LoRA:', loraPath);
         console.log('Num Images:', numImages);
         console.log('Filename Prefix:', `zimage/${characterSlug}_${timestamp}_`);
-        console.log('Nodes updated:', {
-            prompt: !!workflowTemplate['171'],
-            negative: !!workflowTemplate['34'],
-            lora: !!workflowTemplate['131'],
-            latent: !!workflowTemplate['13'],
-            sampler: !!workflowTemplate['3'],
-            saveImage: !!workflowTemplate['9']
-        });
+        console.log('Slots updated:', Object.keys(slots).join(', '));
         console.log('===================================\n');
 
         const response = await fetch(`${comfyUrl}/prompt`, {
@@ -1,9 +1,12 @@
 import { NextResponse } from 'next/server';
+import { getAppConfig } from '@/lib/config-helper';
 
 const OLLAMA_URL = 'http://localhost:11435';
-const COMFY_URL = 'http://localhost:8188';
 
 export async function POST() {
+    // Same server as generation, so a multi-backend router forwards /free to every backend
+    const config = await getAppConfig();
+    const COMFY_URL = config.comfyuiUrl;
     const report = { ollama: 'skipped', comfy: 'skipped' };
 
     // 1. Purge Ollama
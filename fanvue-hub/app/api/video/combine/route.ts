@@ -32,11 +32,13 @@ export async function POST(request: NextRequest) {
         // Helper function to find video file
         const findVideoFile = (videoUrl: string): string | null => {
             let fileName = '';
+            let subfolder = '';
             try {
                 const urlObj = new URL(videoUrl, 'http://localhost');
                 const params = new URLSearchParams(urlObj.search);
                 if (params.has('filename')) {
                     fileName = params.get('filename')!;
+                    subfolder = params.get('subfolder') || '';
                 } else {
                     fileName = path.basename(urlObj.pathname);
                 }
@@ -44,6 +46,12 @@ export async function POST(request: NextRequest) {
                 fileName = path.basename(videoUrl);
             }
 
+            // /view URLs name their subfolder, so the file is found with one stat
+            const exact = path.resolve(outputDir, subfolder, path.basename(fileName));
+            if (subfolder && exact.startsWith(outputDir + path.sep) && fs.existsSync(exact)) {
+                return exact;
+            }
+
             const possiblePaths = [
                 path.join(outputDir, fileName),
                 path.join(outputDir, 'lipsync', fileName),
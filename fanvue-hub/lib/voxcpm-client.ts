@@ -1,9 +1,16 @@
 import { Client } from "@gradio/client";
+import fs from "fs";
+import path from "path";
 
 const VOXCPM_URL = "http://localhost:7861/";
 
+// Built by scripts/voice_cache.py: references already resampled, trimmed and normalized
+const VOICES_DIR = path.resolve(process.cwd(), "../assets/TTS");
+const VOICE_CACHE_INDEX = path.join(VOICES_DIR, ".cache", "index.json");
+
 export interface VoxCPMGenerationParams {
     text: string;
+    voice?: string; // bundled voice name (assets/TTS/<voice>); fills prompt_wav and prompt_text
     prompt_wav?: string | Blob | File | null;
     prompt_text?: string;
     cfg_value?: number;
@@ -18,6 +25,56 @@ export interface VoxCPMResponse {
     history: any[];
 }
 
+interface CachedVoice {
+    key: string;
+    text: string;
+    wav: string; // source clip the cache was built from
+    size: number;
+    mtime_ns: number;
+}
+
+// Voice names are folder names under assets/TTS; anything else could walk out of it
+const VOICE_NAME = /^[\w-]+$/;
+
+let voiceIndex: { mtimeMs: number; voices: Record<string, CachedVoice> } | null = null;
+const voiceAudio = new Map<string, Blob>();
+
+/**
+ * Reference clip and transcript for a bundled voice.
+ * Uses the preprocessed copy when the voice cache is current for the clip on disk, else the raw clip.
+ */
+function loadVoice(voice: string): { wav: Blob; text: string; preprocessed: boolean } | null {
+    if (!VOICE_NAME.test(voice)) return null;
+    try {
+        const mtimeMs = fs.statSync(VOICE_CACHE_INDEX).mtimeMs;
+        if (!voiceIndex || voiceIndex.mtimeMs !== mtimeMs) {
+            voiceIndex = { mtimeMs, voices: JSON.parse(fs.readFileSync(VOICE_CACHE_INDEX, "utf-8")).voices || {} };
+        }
+        const entry = voiceIndex.voices[voice];
+        // The index stores st_mtime_ns; JSON.parse and Number() round it the same way
+        const source = entry && fs.statSync(entry.wav, { bigint: true });
+        if (source && Number(source.size) === entry.size && Number(source.mtimeNs) === entry.mtime_ns) {
+            let wav = voiceAudio.get(entry.key);
+            if (!wav) {
+                wav = new Blob([fs.readFileSync(path.join(VOICES_DIR, ".cache", `${entry.key}.wav`))], { type: "audio/wav" });
+                voiceAudio.set(entry.key, wav);
+            }
+            return { wav, text: entry.text, preprocessed: true };
+        }
+    } catch {
+        // No cache yet, or its source clip is gone; fall through to the raw reference
+    }
+
+    const raw = path.join(VOICES_DIR, voice, `${voice}.wav`);
+    if (!fs.existsSync(raw)) return null;
+    const transcript = raw.replace(/\.wav$/, ".txt");
+    return {
+        wav: new Blob([fs.readFileSync(raw)], { type: "audio/wav" }),
+        text: fs.existsSync(transcript) ? fs.readFileSync(transcript, "utf-8").trim() : "",
+        preprocessed: false,
+    };
+}
+
 /**
  * Client for interacting with the local VoxCPM Text-to-Speech Engine
  */
@@ -39,6 +96,20 @@ export const voxCPM = {
      */
     async generateAudio(params: VoxCPMGenerationParams): Promise<VoxCPMResponse> {
         try {
+            if (params.voice && !params.prompt_wav) {
+                const reference = loadVoice(params.voice);
+                if (!reference) {
+                    throw new Error(`Unknown voice: ${params.voice}`);
+                }
+                // A preprocessed reference needs no denoising pass on the server
+                params = {
+                    ...params,
+                    prompt_wav: reference.wav,
+                    prompt_text: params.prompt_text || reference.text,
+                    do_denoise: reference.preprocessed ? false : params.do_denoise,
+                };
+            }
+
             // Initialize Gradio client
             const client = await Client.connect(VOXCPM_URL);
 
@@ -0,0 +1,298 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+WORKFLOWS_ROOT = REPO_DIR / 'assets' / 'workflows'
+COMPILED_DIR = WORKFLOWS_ROOT / 'compiled'
+MANIFEST_SUFFIX = '.manifest.json'
+
+# Bump when slot detection changes so every manifest is rebuilt
+COMPILER_VERSION = 1
+
+# Slots every image/video template is expected to expose; missing ones are reported
+SLOTS = ('positive_prompt', 'negative_prompt', 'seed', 'batch_size', 'width', 'height', 'loras', 'save_prefix')
+
+# Literal inputs that hold prompt text, most specific first
+TEXT_INPUTS = ('wildcard_text', 'populated_text', 'text', 'string', 'prompt')
+# Link inputs never followed when tracing a prompt back to its text
+NOT_TEXT = re.compile(r'^(clip|clip_vision|model|vae|image\d*|pixels|mask|latent\w*|samples|control_net|style\w*)$')
+SEED_INPUTS = ('seed', 'noise_seed')
+SEED_CLASS = re.compile(r'Sampler|Noise')
+SIZE_INPUTS = ('width', 'height')
+# Extra literals that travel with the size on aspect-ratio nodes
+SIZE_EXTRAS = ('aspect_ratio', 'direction')
+STACK_LORA = re.compile(r'^lora_(\d+)$')
+
+
+class CompileError(ValueError):
+    """The file is not an API-format graph we can order"""
+
+
+def is_link(value):
+    """API format links are [source node id, output index]"""
+    return isinstance(value, list) and len(value) == 2 and isinstance(value[0], str) and isinstance(value[1], int)
+
+
+def load_graph(path):
+    """Parse an API-format workflow; raises CompileError for UI-format or broken files"""
+    try:
+        graph = json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError) as e:
+        raise CompileError(str(e))
+    if not isinstance(graph, dict) or 'nodes' in graph:
+        raise CompileError('not an API-format workflow (export with "Save (API)")')
+    for node_id, node in graph.items():
+        if not isinstance(node, dict) or not isinstance(node.get('inputs'), dict) or 'class_type' not in node:
+            raise CompileError(f'node {node_id} has no class_type/inputs')
+    return graph
+
+
+def edges(graph):
+    """(source, target, input name) for every link; the second list holds links to missing nodes"""
+    found, dangling = [], []
+    for node_id, node in graph.items():
+        for key, value in node['inputs'].items():
+            if is_link(value):
+                (found if value[0] in graph else dangling).append((value[0], node_id, key))
+    return found, dangling
+
+
+def topological_order(graph, links):
+    """Node ids with every source before its consumers; ties keep numeric id order"""
+    indegree = {node_id: 0 for node_id in graph}
+    consumers = {node_id: [] for node_id in graph}
+    for source, target, _ in links:
+        indegree[target] += 1
+        consumers[source].append(target)
+
+    def key(node_id):
+        return (0, int(node_id), '') if node_id.isdigit() else (1, 0, node_id)
+
+    ready = sorted((n for n, d in indegree.items() if d == 0), key=key)
+    order = []
+    while ready:
+        node_id = ready.pop(0)
+        order.append(node_id)
+        for target in consumers[node_id]:
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                ready.append(target)
+        ready.sort(key=key)
+    if len(order) != len(graph):
+        cycle = sorted((n for n, d in indegree.items() if d), key=key)
+        raise CompileError(f'cycle through nodes {", ".join(cycle)}')
+    return order
+
+
+def trace_text(graph, value, role, seen=None):
+    """Literal (node, input) pairs a prompt link ultimately reads its text from
+
+    Follows the first text-like link at each step, so for a concatenation the
+    user's text wins over an appended style string. Nodes that pass a
+    positive/negative pair through (WanImageToVideo, LTXVConditioning) are
+    followed on the input matching role only.
+    """
+    seen = seen if seen is not None else set()
+    if not is_link(value) or value[0] not in graph or value[0] in seen:
+        return []
+    node_id = value[0]
+    seen.add(node_id)
+    inputs = graph[node_id]['inputs']
+    literal = [[node_id, key] for key in TEXT_INPUTS if isinstance(inputs.get(key), str)]
+    if literal:
+        return literal
+    if is_link(inputs.get('positive')) and is_link(inputs.get('negative')):
+        return trace_text(graph, inputs[role], role, seen)
+    for key, item in inputs.items():
+        if is_link(item) and not NOT_TEXT.match(key):
+            found = trace_text(graph, item, role, seen)
+            if found:
+                return found
+    return []
+
+
+def resolve_literal(graph, node_id, key, seen=None):
+    """The (node, input) holding the literal value of an input, following links upstream"""
+    seen = seen if seen is not None else set()
+    if node_id not in graph or node_id in seen:
+        return None
+    seen.add(node_id)
+    value = graph[node_id]['inputs'].get(key)
+    if not is_link(value):
+        return [node_id, key] if key in graph[node_id]['inputs'] else None
+    source = value[0]
+    if source not in graph:
+        return None
+    inputs = graph[source]['inputs']
+    # Size nodes export width/height on outputs named after the inputs; primitives use 'value'
+    if key in inputs:
+        return resolve_literal(graph, source, key, seen)
+    if 'value' in inputs and not is_link(inputs['value']):
+        return [source, 'value']
+    return None
+
+
+def _add(slots, name, target):
+    if target and target not in slots.setdefault(name, []):
+        slots[name].append(target)
+
+
+def detect_slots(graph, order):
+    """Semantic parameter slots mapped to the [node id, input] pairs that set them"""
+    slots = {}
+    for node_id in order:
+        node = graph[node_id]
+        inputs = node['inputs']
+        class_type = node['class_type']
+
+        # Anything conditioned on a positive/negative pair: samplers, guiders
+        if is_link(inputs.get('positive')) and is_link(inputs.get('negative')):
+            for role in ('positive', 'negative'):
+                for target in trace_text(graph, inputs[role], role):
+                    _add(slots, f'{role}_prompt', target)
+        # Encoders that take both prompts directly (WanVideoTextEncode and friends)
+        for role in ('positive', 'negative'):
+            if isinstance(inputs.get(f'{role}_prompt'), str):
+                _add(slots, f'{role}_prompt', [node_id, f'{role}_prompt'])
+
+        if SEED_CLASS.search(class_type):
+            for key in SEED_INPUTS:
+                if key in inputs:
+                    _add(slots, 'seed', resolve_literal(graph, node_id, key))
+
+        if 'Latent' in class_type and 'batch_size' in inputs:
+            _add(slots, 'batch_size', resolve_literal(graph, node_id, 'batch_size'))
+            for key in SIZE_INPUTS:
+                target = resolve_literal(graph, node_id, key)
+                _add(slots, key, target)
+                if target:
+                    source = graph[target[0]]['inputs']
+                    for extra in SIZE_EXTRAS:
+                        if extra in source and not is_link(source[extra]):
+                            _add(slots, extra, [target[0], extra])
+
+        if 'Lora' in class_type:
+            for key in inputs:
+                match = STACK_LORA.match(key)
+                if not match:
+                    continue
+                strength = f'strength_{match.group(1)}'
+                # Power Lora Loader keeps {on, lora, strength} in the one input
+                _add(slots, 'loras', [node_id, key, strength if strength in inputs else None])
+            if isinstance(inputs.get('lora_name'), str):
+                strength = 'strength_model' if 'strength_model' in inputs else None
+                _add(slots, 'loras', [node_id, 'lora_name', strength])
+
+        if isinstance(inputs.get('filename_prefix'), str):
+            _add(slots, 'save_prefix', [node_id, 'filename_prefix'])
+    # Conventional order first, then any extras such as aspect_ratio
+    return {name: slots[name] for name in sorted(slots, key=lambda n: (SLOTS + SIZE_EXTRAS + (n,)).index(n))}
+
+
+def compile_graph(graph, name, source_sha256=''):
+    """Manifest for one template: the graph, its order, the slots and what is missing"""
+    links, dangling = edges(graph)
+    order = topological_order(graph, links)
+    slots = detect_slots(graph, order)
+    return {
+        'compiler': COMPILER_VERSION,
+        'template': name,
+        'source_sha256': source_sha256,
+        'order': order,
+        'outputs': [n for n in order if isinstance(graph[n]['inputs'].get('filename_prefix'), str)],
+        'slots': slots,
+        'missing': [s for s in SLOTS if s not in slots],
+        'dangling': [[source, target, key] for source, target, key in dangling],
+        'graph': graph,
+    }
+
+
+def manifest_path(path, out_dir=COMPILED_DIR):
+    return Path(out_dir) / (Path(path).stem + MANIFEST_SUFFIX)
+
+
+def is_current(path, out_dir=COMPILED_DIR):
+    """True when the manifest was built from this exact file by this compiler version"""
+    try:
+        digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+        manifest = json.loads(manifest_path(path, out_dir).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return False
+    return manifest.get('compiler') == COMPILER_VERSION and manifest.get('source_sha256') == digest
+
+
+def compile_file(path, out_dir=COMPILED_DIR, check=False):
+    """Compile one template; returns (manifest or None, rewritten, error)"""
+    path = Path(path)
+    if is_current(path, out_dir):
+        return json.loads(manifest_path(path, out_dir).read_text(encoding='utf-8')), False, ''
+    try:
+        raw = path.read_bytes()
+        manifest = compile_graph(load_graph(path), path.stem, hashlib.sha256(raw).hexdigest())
+    except (OSError, CompileError) as e:
+        return None, False, str(e)
+    if not check:
+        target = manifest_path(path, out_dir)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + '.tmp')
+        tmp.write_text(json.dumps(manifest, separators=(',', ':')), encoding='utf-8')
+        os.replace(tmp, target)
+    return manifest, True, ''
+
+
+def describe(manifest):
+    """One line per slot, for humans"""
+    lines = []
+    for name, targets in manifest['slots'].items():
+        where = ', '.join(f'{t[0]}.{t[1]}' + (f'/{t[2]}' if len(t) > 2 and t[2] else '') for t in targets)
+        lines.append(f'    {name}: {where}')
+    if manifest['missing']:
+        lines.append(f'    missing: {", ".join(manifest["missing"])}')
+    for source, target, key in manifest['dangling']:
+        lines.append(f'    dangling: {target}.{key} -> {source} (node not in graph)')
+    return lines
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Compile API-format workflows into parameter-slot manifests')
+    parser.add_argument('paths', nargs='*', help=f'workflow files (default: {WORKFLOWS_ROOT}/*.json)')
+    parser.add_argument('--out', type=Path, default=COMPILED_DIR, help='manifest folder (default: assets/workflows/compiled)')
+    parser.add_argument('--check', action='store_true', help='report stale or missing manifests and exit 1; write nothing')
+    parser.add_argument('--require', default='', help='comma separated slots every template must have, else exit 1')
+    parser.add_argument('--verbose', '-v', action='store_true', help='list the slots found in each template')
+    args = parser.parse_args(argv)
+
+    files = [Path(p) for p in args.paths] or sorted(WORKFLOWS_ROOT.glob('*.json'))
+    required = [s.strip() for s in args.require.split(',') if s.strip()]
+    stale, errors, incomplete = [], [], []
+    for path in files:
+        manifest, rewritten, error = compile_file(path, args.out, args.check)
+        if error:
+            errors.append(f'{path.name}: {error}')
+            continue
+        if rewritten:
+            stale.append(path)
+            print(f'{"✗ Stale" if args.check else "✓ Compiled"} {path.name}')
+        if args.verbose:
+            print(f'{path.name}:')
+            print('\n'.join(describe(manifest)))
+        lacking = [s for s in required if s not in manifest['slots']]
+        if lacking:
+            incomplete.append(f'{path.name}: no {", ".join(lacking)} slot')
+    for error in errors:
+        print(f'✗ {error}', file=sys.stderr)
+    for message in incomplete:
+        print(f'✗ {message}', file=sys.stderr)
+    print(f'{len(files)} templates, {len(stale)} {"stale" if args.check else "compiled"}, {len(errors)} errors')
+    if errors:
+        return 2
+    return 1 if incomplete or (args.check and stale) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
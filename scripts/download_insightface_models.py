@@ -1,32 +1,27 @@
 """
 Download insightface models manually
 """
-import os
-import urllib.request
-import zipfile
+import sys
+from pathlib import Path
 
-# Create models directory
-model_root = os.path.expanduser('~/.insightface/models/buffalo_l')
-os.makedirs(model_root, exist_ok=True)
+# Shared mirror resolution (LTX2_MIRROR_DIRS, LTX2_MIRROR_URLS, LTX2_OFFLINE)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "assets" / "workflows"))
+from ltx2_archive import ARCHIVES, DownloadError, fetch
 
-print(f"Downloading models to: {model_root}")
+archive = ARCHIVES["buffalo_l"]
+force = "--force" in sys.argv[1:]
 
-# Download from HuggingFace mirror
-base_url = "https://github.com/deepinsight/insightface/releases/download/v0.7/buffalo_l.zip"
-zip_path = os.path.join(os.path.dirname(model_root), "buffalo_l.zip")
-
-print(f"Downloading buffalo_l models from GitHub...")
+print(f"Downloading models to: {archive.dest}")
+print("Downloading buffalo_l models from GitHub...")
 try:
-    urllib.request.urlretrieve(base_url, zip_path)
-    
-    # Extract
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(os.path.dirname(model_root))
-    
-    print("✓ Models downloaded successfully!")
-    os.remove(zip_path)
-except Exception as e:
+    # Entries are extracted while the zip streams in; nothing is fetched if the set is complete
+    if fetch(archive, force=force, on_retry=lambda msg: print(f"  retrying: {msg}")):
+        print("✓ Models downloaded successfully!")
+    else:
+        print("✓ Models already installed, nothing to download (--force to fetch again)")
+except (DownloadError, OSError) as e:
     print(f"✗ Download failed: {e}")
     print("\nAlternative: Download manually from:")
-    print("https://github.com/deepinsight/insightface/releases/download/v0.7/buffalo_l.zip")
-    print(f"Extract to: {os.path.dirname(model_root)}")
+    print(archive.url)
+    print(f"Extract to: {archive.dest}")
+    sys.exit(1)
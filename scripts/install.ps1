@@ -610,6 +610,19 @@ Install-CustomNode "ComfyUI_LayerStyle_Advance" "https://github.com/chflame163/C
 Set-Location $RootPath
 Write-Log "Character workflow nodes installation complete."
 
+# Local node: Text Encode (Cached), served from assets\workflows so updates need no reinstall
+$WorkflowsDir = Join-Path $RootPath "assets\workflows"
+$LoaderContent = @"
+# Loads CachedTextEncode from $WorkflowsDir
+import sys
+if r'$WorkflowsDir' not in sys.path:
+    sys.path.append(r'$WorkflowsDir')
+from conditioning_node import NODE_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS
+__all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS']
+"@
+Set-Content -Path (Join-Path $CustomNodesDir "ltx2_conditioning_cache.py") -Value $LoaderContent
+Write-Log "  ✓ Text Encode (Cached) registered"
+
 Pause-Step
 
 # 9. Configure ComfyUI-Manager Security (Weak Mode)
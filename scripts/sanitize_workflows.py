@@ -1,54 +1,301 @@
+import argparse
+import hashlib
 import json
+import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+WORKFLOWS_ROOT = REPO_DIR / 'assets' / 'workflows'
+# Where ltx2_manager.py puts downloaded workflows
+DOWNLOADED_WORKFLOWS = WORKFLOWS_ROOT / 'workflows'
+CACHE_FILE = WORKFLOWS_ROOT / '.sanitize-cache.json'
+
+CONFIG_DIR = REPO_DIR / 'config'
+# Extra rules for node packs added to config/nodes.json
+RULES_FILE = CONFIG_DIR / 'sanitize_rules.json'
+
+# Each rule matches nodes by class_type (omit for every node) and inputs by exact
+# name ('input') or regex ('input_regex'). 'match' is an optional regex searched in
+# string values. Actions: 'replace' sets 'value', 'reset' sets 'value' or the zero of
+# the current type, 'clear' sets an empty string.
+RULES = [
+    {'input': 'seed', 'action': 'reset'},
+    {'input': 'noise_seed', 'action': 'reset'},
+    {'class_type': 'Power Lora Loader (rgthree)', 'input_regex': r'lora_(0[2-9]|1[0-9]|2[0-6])',
+     'action': 'replace', 'value': {'on': False, 'lora': 'None', 'strength': 1}},
+    {'input': 'text', 'match': r'(?is)^.{201}|personal', 'action': 'replace', 'value': 'Enter your prompt here'},
+    {'input': 'path', 'match': r'(?i)[a-z]:\\|personal', 'action': 'clear'},
+    {'input': 'image', 'match': r'(?i)sendtoworkflow|personal', 'action': 'replace', 'value': 'input_image.png'},
+]
+
+ACTIONS = ('replace', 'reset', 'clear')
+
+
+class Rule:
+    """One compiled rule: name test, optional value regex, and the new value"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.action = spec.get('action', 'replace')
+        if self.action not in ACTIONS:
+            raise ValueError(f'unknown action {self.action!r} in rule {spec}')
+        if 'input' not in spec and 'input_regex' not in spec:
+            raise ValueError(f'rule needs input or input_regex: {spec}')
+        self.input = spec.get('input')
+        self.input_regex = re.compile(spec['input_regex']) if 'input_regex' in spec else None
+        self.match = re.compile(spec['match']) if 'match' in spec else None
+
+    def new_value(self, old):
+        """What the input becomes, or old itself when the rule does not apply to this value"""
+        if self.match is not None and not (isinstance(old, str) and self.match.search(old)):
+            return old
+        if self.action == 'clear':
+            return ''
+        if self.action == 'reset' and 'value' not in self.spec:
+            return type(old)() if isinstance(old, (int, float, str, bool)) else None
+        return self.spec.get('value')
+
+
+class RuleSet:
+    """Rules compiled into a class_type dispatch table
+
+    A node only meets the rules for its own class_type plus the generic ones,
+    split into an exact input-name index and a short list of name regexes.
+    Which regex rules apply to a (class_type, input) pair is worked out once
+    and memoised, so the per-node cost stays flat as rules are added.
+    """
+
+    def __init__(self, specs):
+        self.by_class = {}
+        for spec in specs:
+            self.by_class.setdefault(spec.get('class_type'), []).append(Rule(spec))
+        self.plans = {}
+        self.memo = {}
+
+    def _plan(self, class_type):
+        plan = self.plans.get(class_type)
+        if plan is None:
+            exact, patterns = {}, []
+            rules = self.by_class.get(None, []) + (self.by_class.get(class_type, []) if class_type else [])
+            for rule in rules:
+                if rule.input is not None:
+                    exact.setdefault(rule.input, []).append(rule)
+                else:
+                    patterns.append(rule)
+            plan = self.plans[class_type] = (tuple(exact.items()), patterns)
+        return plan
+
+    def pattern_rules(self, class_type, key):
+        """Regex rules whose input pattern matches key, memoised per (class_type, key)"""
+        cached = self.memo.get((class_type, key))
+        if cached is None:
+            cached = [r for r in self._plan(class_type)[1] if r.input_regex.fullmatch(key)]
+            self.memo[(class_type, key)] = cached
+        return cached
+
+    def apply(self, node):
+        """Apply to one node's inputs; returns True if anything changed"""
+        inputs = node['inputs']
+        class_type = node.get('class_type')
+        exact, patterns = self._plan(class_type)
+        changed = False
+        for key, rules in exact:
+            if key in inputs:
+                for rule in rules:
+                    changed |= _apply(rule, inputs, key)
+        if patterns:
+            for key in list(inputs):
+                for rule in self.pattern_rules(class_type, key):
+                    changed |= _apply(rule, inputs, key)
+        return changed
+
+
+def _apply(rule, inputs, key):
+    old = inputs[key]
+    # Links to other nodes are [node_id, slot]; never touch them
+    if isinstance(old, list):
+        return False
+    return _set(inputs, key, rule.new_value(old))
+
+
+def load_rules(path=RULES_FILE):
+    """Built-in rules plus any from config/sanitize_rules.json"""
+    rules = list(RULES)
+    try:
+        rules += json.loads(Path(path).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        pass
+    return rules
+
+
+def rules_fingerprint(rules):
+    """Changes whenever the rules do, so cached "already clean" hashes are discarded"""
+    return hashlib.sha256(json.dumps(rules, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+_compiled = {}
+
+
+def compiled(rules):
+    """RuleSet for a rule list, compiled once per process"""
+    hit = _compiled.get(id(rules))
+    if hit is not None and hit[0] is rules:
+        return hit[1]
+    key = rules_fingerprint(rules)
+    ruleset = _compiled[key][1] if key in _compiled else RuleSet(rules)
+    _compiled[key] = _compiled[id(rules)] = (rules, ruleset)
+    return ruleset
+
+
+def _set(inputs, key, value):
+    """Assign only when the value differs; returns True if it changed"""
+    if inputs.get(key) == value:
+        return False
+    inputs[key] = value
+    return True
+
+
+def sanitize_workflow(workflow, rules=None):
+    """Remove personal data from an API-format workflow in place; returns True if anything changed"""
+    ruleset = compiled(rules if rules is not None else RULES)
+    changed = False
+    for node in workflow.values():
+        if isinstance(node, dict) and isinstance(node.get('inputs'), dict):
+            changed |= ruleset.apply(node)
+    return changed
+
+
+def _atomic_write(path, data):
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def sanitize_file(path, check=False, rules=None):
+    """Sanitize one file; returns (path, changed, sha256 of the clean content, error)"""
+    path = Path(path)
+    try:
+        raw = path.read_bytes()
+        workflow = json.loads(raw)
+    except (OSError, ValueError) as e:
+        return str(path), False, '', str(e)
+    if not isinstance(workflow, dict) or not sanitize_workflow(workflow, rules):
+        return str(path), False, hashlib.sha256(raw).hexdigest(), ''
+    data = json.dumps(workflow, indent=2).encode('utf-8')
+    if not check:
+        _atomic_write(path, data)
+    return str(path), True, hashlib.sha256(data).hexdigest(), ''
+
 
 def sanitize_wan_workflow(filepath):
     """Sanitize Wan workflow by removing personal data"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        workflow = json.load(f)
-    
-    # Reset seeds to 0
-    for node_id, node in workflow.items():
-        if 'inputs' in node:
-            inputs = node['inputs']
-            # Reset seeds
-            if 'seed' in inputs:
-                inputs['seed'] = 0
-            if 'noise_seed' in inputs:
-                inputs['noise_seed'] = 0
-                
-            # Clean LoRA loader nodes
-            if node.get('class_type') == 'Power Lora Loader (rgthree)':
-                for i in range(2, 27):  # lora_2 through lora_26
-                    lora_key = f'lora_{i:02d}' if i < 10 else f'lora_{i}'
-                    if lora_key in inputs:
-                        inputs[lora_key] = {
-                            'on': False,
-                            'lora': 'None',
-                            'strength': 1
-                        }
-            
-            # Clean explicit text prompts
-            if 'text' in inputs and isinstance(inputs['text'], str):
-                if len(inputs['text']) > 200 or 'personal' in inputs['text'].lower():
-                    inputs['text'] = 'Enter your prompt here'
-            
-            # Clean file paths
-            if 'path' in inputs and isinstance(inputs['path'], str):
-                if 'D:\\' in inputs['path'] or 'personal' in inputs['path'].lower():
-                    inputs['path'] = ''
-            
-            # Clean image filenames with personal data
-            if 'image' in inputs and isinstance(inputs['image'], str):
-                if 'sendtoworkflow' in inputs['image'] or 'personal' in inputs['image'].lower():
-                    inputs['image'] = 'input_image.png'
-    
-    # Write back
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(workflow, f, indent=2)
-    
-    print(f'✓ Sanitized {filepath}')
+    _, changed, _, error = sanitize_file(filepath)
+    if error:
+        raise ValueError(f'{filepath}: {error}')
+    print(f'✓ Sanitized {filepath}' if changed else f'✓ Already clean {filepath}')
+
+
+def workflow_files(paths):
+    """JSON files to process: the given files, *.json in given folders, or the default tree"""
+    if not paths:
+        files = sorted(WORKFLOWS_ROOT.glob('*.json'))
+        if DOWNLOADED_WORKFLOWS.is_dir():
+            files += sorted(DOWNLOADED_WORKFLOWS.rglob('*.json'))
+    else:
+        files = []
+        for p in map(Path, paths):
+            files += sorted(p.rglob('*.json')) if p.is_dir() else [p]
+    # Skip our own cache and other dotfiles
+    return [f for f in files if not f.name.startswith('.')]
+
+
+def load_cache(path, fingerprint):
+    try:
+        cache = json.loads(path.read_text(encoding='utf-8'))
+        if cache.get('rules') == fingerprint:
+            return cache.get('files', {})
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {}
+
+
+def save_cache(path, fingerprint, files):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _atomic_write(path, json.dumps({'rules': fingerprint, 'files': files}, indent=1, sort_keys=True).encode('utf-8'))
+
+
+def sanitize_batch(files, check=False, workers=None, cache_path=CACHE_FILE, rules=None):
+    """Sanitize many files in a process pool, skipping ones whose hash says they are already clean
+
+    Returns (changed paths, error messages).
+    """
+    rules = rules if rules is not None else load_rules()
+    fingerprint = rules_fingerprint(rules)
+    cache = load_cache(cache_path, fingerprint) if cache_path else {}
+    pending = []
+    for path in files:
+        key = str(Path(path).resolve())
+        try:
+            digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+        except OSError:
+            pending.append(path)
+            continue
+        if cache.get(key) != digest:
+            pending.append(path)
+
+    changed, errors = [], []
+    if pending:
+        workers = workers or min(len(pending), os.cpu_count() or 1)
+        if workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(sanitize_file, pending, [check] * len(pending),
+                                        [rules] * len(pending)))
+        else:
+            results = [sanitize_file(path, check, rules) for path in pending]
+        for path, was_changed, digest, error in results:
+            if error:
+                errors.append(f'{path}: {error}')
+                continue
+            if was_changed:
+                changed.append(path)
+            # In check mode a dirty file is not clean yet, so do not remember it
+            if digest and not (check and was_changed):
+                cache[str(Path(path).resolve())] = digest
+
+    if cache_path:
+        save_cache(cache_path, fingerprint, cache)
+    return changed, errors
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Remove personal data (seeds, prompts, paths, LoRAs) from workflow JSONs')
+    parser.add_argument('paths', nargs='*', help=f'files or folders (default: {WORKFLOWS_ROOT} and downloaded workflows)')
+    parser.add_argument('--check', action='store_true', help='report files that need sanitizing and exit 1; write nothing')
+    parser.add_argument('--jobs', type=int, default=0, help='worker processes (default: one per CPU)')
+    parser.add_argument('--no-cache', action='store_true', help='process every file even if it was clean last time')
+    parser.add_argument('--rules', type=Path, default=RULES_FILE, help='extra rules JSON (default: config/sanitize_rules.json)')
+    args = parser.parse_args(argv)
+
+    try:
+        rules = load_rules(args.rules)
+        compiled(rules)
+    except (OSError, ValueError, re.error) as e:
+        print(f'✗ Bad rules: {e}', file=sys.stderr)
+        return 2
+    files = workflow_files(args.paths)
+    changed, errors = sanitize_batch(files, args.check, args.jobs or None, None if args.no_cache else CACHE_FILE, rules)
+    for path in changed:
+        print(f'{"✗ Needs sanitizing" if args.check else "✓ Sanitized"} {path}')
+    for error in errors:
+        print(f'✗ {error}', file=sys.stderr)
+    print(f'{len(files)} files checked, {len(changed)} {"dirty" if args.check else "rewritten"}, {len(errors)} errors')
+    if errors:
+        return 2
+    return 1 if args.check and changed else 0
+
 
 if __name__ == '__main__':
-    sanitize_wan_workflow(r'h:\00001.app\latest-release-150126\assets\workflows\Wan2.2_I2V.json')
-    sanitize_wan_workflow(r'h:\00001.app\latest-release-150126\assets\workflows\Wan2.2_T2V.json')
-    print('All Wan2.2 workflows sanitized!')
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,362 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import wave
+from pathlib import Path
+
+import numpy as np
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+VOICES_DIR = REPO_DIR / 'assets' / 'TTS'
+CACHE_DIR = VOICES_DIR / '.cache'
+INDEX_NAME = 'index.json'
+# Same rule as fanvue-hub/lib/voxcpm-client.ts: a folder name under VOICES_DIR, nothing that can leave it
+VOICE_NAME = re.compile(r'[\w-]+', re.ASCII)
+
+# VoxCPM's audio VAE works at 16 kHz; references are resampled to it once here
+ENGINE_RATE = 16000
+# Frames quieter than this (relative to the loudest frame) count as silence at the ends
+TRIM_DB = -40.0
+# Silence kept before the first and after the last voiced frame
+TRIM_MARGIN = 0.1
+TARGET_DBFS = -20.0
+PEAK_DBFS = -1.0
+N_FFT = 1024
+HOP = 256
+N_MELS = 80
+FMIN = 0.0
+FMAX = 8000.0
+
+# Bump when processing changes so every voice is rebuilt
+CACHE_VERSION = 1
+PARAMS = {'version': CACHE_VERSION, 'rate': ENGINE_RATE, 'trim_db': TRIM_DB, 'trim_margin': TRIM_MARGIN,
+          'target_dbfs': TARGET_DBFS, 'peak_dbfs': PEAK_DBFS, 'n_fft': N_FFT, 'hop': HOP, 'n_mels': N_MELS,
+          'fmin': FMIN, 'fmax': FMAX}
+
+
+def decode_wav(path):
+    """(mono float32 samples in [-1, 1], sample rate) from a PCM WAV"""
+    with wave.open(str(path), 'rb') as f:
+        channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        raw = f.readframes(f.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768
+    elif width == 3:
+        bytes3 = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = bytes3[:, 0] | (bytes3[:, 1] << 8) | (bytes3[:, 2] << 16)
+        samples = np.where(ints >= 1 << 23, ints - (1 << 24), ints).astype(np.float32) / (1 << 23)
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype='<i4').astype(np.float32) / (1 << 31)
+    else:
+        raise ValueError(f'{path}: unsupported sample width {width}')
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def resample(samples, rate, target):
+    """Band-limited resampling through the spectrum; exact for the few seconds a reference lasts"""
+    if rate == target or not len(samples):
+        return samples.astype(np.float32)
+    length = int(round(len(samples) * target / rate))
+    spectrum = np.fft.rfft(samples)
+    bins = length // 2 + 1
+    out = np.zeros(bins, dtype=spectrum.dtype)
+    keep = min(bins, len(spectrum))
+    out[:keep] = spectrum[:keep]
+    return (np.fft.irfft(out, length) * (length / len(samples))).astype(np.float32)
+
+
+def _frame_db(samples, frame):
+    count = max(len(samples) // frame, 1)
+    frames = np.resize(samples, count * frame).reshape(count, frame) if len(samples) >= frame \
+        else samples.reshape(1, -1)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1) + 1e-12)
+    return 20 * np.log10(rms)
+
+
+def trim_silence(samples, rate, threshold_db=TRIM_DB, margin=TRIM_MARGIN):
+    """Drop leading and trailing silence, keeping margin seconds around the speech"""
+    frame = max(rate // 100, 1)
+    db = _frame_db(samples, frame)
+    voiced = np.nonzero(db > db.max() + threshold_db)[0]
+    if not len(voiced):
+        return samples
+    pad = int(margin * rate)
+    start = max(voiced[0] * frame - pad, 0)
+    end = min((voiced[-1] + 1) * frame + pad, len(samples))
+    return samples[start:end]
+
+
+def loudness(samples, rate):
+    """RMS level in dBFS over the voiced 10 ms frames, so pauses do not drag it down"""
+    db = _frame_db(samples, max(rate // 100, 1))
+    gated = db[db > db.max() + TRIM_DB]
+    if not len(gated):
+        return -120.0
+    return float(10 * np.log10(np.mean(10 ** (gated / 10))))
+
+
+def normalize(samples, rate, target=TARGET_DBFS, peak=PEAK_DBFS):
+    """Scale to the target loudness, backing off if that would push peaks past peak dBFS"""
+    gain = 10 ** ((target - loudness(samples, rate)) / 20)
+    top = float(np.abs(samples).max()) if len(samples) else 0.0
+    if top * gain > 10 ** (peak / 20):
+        gain = 10 ** (peak / 20) / top
+    return (samples * gain).astype(np.float32)
+
+
+def _hz_to_mel(hz):
+    return 2595 * np.log10(1 + np.asarray(hz) / 700)
+
+
+def _mel_to_hz(mel):
+    return 700 * (10 ** (np.asarray(mel) / 2595) - 1)
+
+
+def mel_filters(rate=ENGINE_RATE, n_fft=N_FFT, n_mels=N_MELS, fmin=FMIN, fmax=FMAX):
+    """Triangular HTK-scale filterbank, (n_mels, n_fft // 2 + 1), each filter normalised to unit area"""
+    freqs = np.linspace(0, rate / 2, n_fft // 2 + 1)
+    edges = _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(min(fmax, rate / 2)), n_mels + 2))
+    lower, centre, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (freqs - lower) / (centre - lower)
+    falling = (upper - freqs) / (upper - centre)
+    filters = np.maximum(0, np.minimum(rising, falling))
+    return (filters * (2 / (upper - lower))).astype(np.float32)
+
+
+def mel_spectrogram(samples, rate=ENGINE_RATE):
+    """Log-mel magnitudes, (n_mels, frames), frames centred every HOP samples"""
+    padded = np.pad(samples, N_FFT // 2, mode='reflect' if len(samples) > N_FFT // 2 else 'constant')
+    if len(padded) < N_FFT:
+        padded = np.pad(padded, (0, N_FFT - len(padded)))
+    count = 1 + (len(padded) - N_FFT) // HOP
+    frames = np.lib.stride_tricks.as_strided(padded, shape=(count, N_FFT),
+                                             strides=(padded.strides[0] * HOP, padded.strides[0]))
+    magnitude = np.abs(np.fft.rfft(frames * np.hanning(N_FFT).astype(np.float32), axis=1))
+    mel = mel_filters(rate) @ magnitude.T
+    return np.log(np.maximum(mel, 1e-5)).astype(np.float32)
+
+
+def process(path):
+    """(processed samples at ENGINE_RATE, log-mel) for one reference WAV"""
+    samples, rate = decode_wav(path)
+    samples = resample(samples, rate, ENGINE_RATE)
+    samples = normalize(trim_silence(samples, ENGINE_RATE), ENGINE_RATE)
+    return samples, mel_spectrogram(samples)
+
+
+def _atomic_write(path, data):
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _save_npy(path, array):
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(tmp, path)
+
+
+def _save_wav(path, samples):
+    """16-bit PCM copy for engines that take a file rather than an array"""
+    tmp = path.with_name(path.name + '.tmp')
+    with wave.open(str(tmp), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(ENGINE_RATE)
+        f.writeframes((np.clip(samples, -1, 1) * 32767).astype('<i2').tobytes())
+    os.replace(tmp, path)
+
+
+def cache_key(data):
+    """Content hash of the WAV plus the processing settings"""
+    digest = hashlib.sha256(data)
+    digest.update(json.dumps(PARAMS, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:24]
+
+
+def find_voices(voices_dir=VOICES_DIR):
+    """{name: (wav, transcript or None)} for every voice folder; {name}.wav wins over other WAVs"""
+    voices = {}
+    if not voices_dir.is_dir():
+        return voices
+    for folder in sorted(voices_dir.iterdir()):
+        if not folder.is_dir() or folder.name.startswith('.'):
+            continue
+        wavs = sorted(folder.glob('*.wav'))
+        if not wavs:
+            continue
+        wav = folder / f'{folder.name}.wav' if (folder / f'{folder.name}.wav').is_file() else wavs[0]
+        text = wav.with_suffix('.txt')
+        voices[folder.name] = (wav, text if text.is_file() else None)
+    return voices
+
+
+class VoiceCache:
+    """Processed reference voices, rebuilt only when a WAV's content changes
+
+    index.json maps each voice to its source WAV (size, mtime, hash) and the
+    cache key of its files: <key>.audio.npy (float32 samples at ENGINE_RATE),
+    <key>.mel.npy (log-mel, n_mels x frames) and <key>.wav (the same audio as
+    16-bit PCM). The .npy files are opened memory-mapped, so loading a voice
+    costs no decoding and no copy.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, voices_dir=VOICES_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.voices_dir = Path(voices_dir)
+        self.index_path = self.cache_dir / INDEX_NAME
+        try:
+            self.index = json.loads(self.index_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self.index = {}
+        if self.index.get('params') != PARAMS:
+            self.index = {'params': PARAMS, 'voices': {}}
+
+    @property
+    def voices(self):
+        return self.index['voices']
+
+    def _files(self, key):
+        return {kind: self.cache_dir / f'{key}.{kind}' for kind in ('audio.npy', 'mel.npy', 'wav')}
+
+    def _fresh(self, entry, stat):
+        if not entry or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            return False
+        return all(p.is_file() for p in self._files(entry['key']).values())
+
+    def update(self, wav, name, text=None, force=False):
+        """Bring one voice up to date; returns 'cached', 'touched' (same content, new mtime) or 'built'"""
+        wav = Path(wav)
+        stat = wav.stat()
+        entry = self.voices.get(name)
+        transcript = text.read_text(encoding='utf-8').strip() if text else ''
+        if not force and self._fresh(entry, stat) and entry.get('wav') == str(wav):
+            entry['text'] = transcript
+            return 'cached'
+        data = wav.read_bytes()
+        key = cache_key(data)
+        state = 'touched'
+        if force or not entry or entry['key'] != key or not all(p.is_file() for p in self._files(key).values()):
+            samples, mel = process(wav)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            files = self._files(key)
+            _save_npy(files['audio.npy'], samples)
+            _save_npy(files['mel.npy'], mel)
+            _save_wav(files['wav'], samples)
+            entry = {'key': key, 'duration': round(len(samples) / ENGINE_RATE, 3), 'frames': int(mel.shape[1])}
+            state = 'built'
+        entry.update({'wav': str(wav), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                      'rate': ENGINE_RATE, 'text': transcript})
+        self.voices[name] = entry
+        return state
+
+    def build(self, names=None, force=False):
+        """Update the named voices (default: all of them); returns {name: state or error}"""
+        found = find_voices(self.voices_dir)
+        results = {}
+        for name in names or found:
+            if name not in found:
+                results[name] = f'no WAV in {self.voices_dir / name}'
+                continue
+            try:
+                wav, text = found[name]
+                results[name] = self.update(wav, name, text, force)
+            except (OSError, ValueError, EOFError, wave.Error) as e:
+                results[name] = str(e)
+        if not names:
+            for name in [n for n in self.voices if n not in found]:
+                del self.voices[name]
+                results[name] = 'removed'
+        self.prune()
+        self.save()
+        return results
+
+    def prune(self):
+        """Delete cache files no voice points at any more"""
+        live = {self.index_path.name}
+        for entry in self.voices.values():
+            live |= {p.name for p in self._files(entry['key']).values()}
+        if self.cache_dir.is_dir():
+            for path in self.cache_dir.iterdir():
+                if path.is_file() and path.name not in live:
+                    path.unlink()
+
+    def save(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        _atomic_write(self.index_path, json.dumps(self.index, indent=1, sort_keys=True).encode('utf-8'))
+
+    def add(self, name, wav, text=''):
+        """Copy a new reference into the voices folder and build only that voice"""
+        if not VOICE_NAME.fullmatch(name):
+            raise ValueError(f'invalid voice name {name!r}: use letters, digits, _ and -')
+        folder = self.voices_dir / name
+        folder.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(wav, folder / f'{name}.wav')
+        if text:
+            (folder / f'{name}.txt').write_text(text.strip() + '\n', encoding='utf-8')
+        return self.build([name])[name]
+
+    def load(self, name):
+        """{'audio', 'mel', 'text', 'rate', 'wav'} for a cached voice; arrays are read-only memmaps"""
+        entry = self.voices.get(name)
+        if entry is None:
+            raise KeyError(f'voice {name!r} is not cached; run: voice_cache.py build')
+        files = self._files(entry['key'])
+        return {'audio': np.load(files['audio.npy'], mmap_mode='r'), 'mel': np.load(files['mel.npy'], mmap_mode='r'),
+                'text': entry['text'], 'rate': entry['rate'], 'wav': files['wav']}
+
+
+def voice_name(value):
+    if not VOICE_NAME.fullmatch(value):
+        raise argparse.ArgumentTypeError(f'invalid voice name {value!r}: use letters, digits, _ and -')
+    return value
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Preprocess reference voices once: resample, trim, normalize, mel')
+    parser.add_argument('--voices', type=Path, default=VOICES_DIR, help='one folder per voice with a WAV and transcript')
+    parser.add_argument('--cache', type=Path, default=CACHE_DIR)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('build', help='process new and changed voices')
+    p.add_argument('names', nargs='*', help='only these voices (default: all)')
+    p.add_argument('--force', action='store_true', help='reprocess even if unchanged')
+    p = sub.add_parser('add', help='add a new voice and process only it')
+    p.add_argument('name', type=voice_name)
+    p.add_argument('wav', type=Path)
+    p.add_argument('--text', default='', help='transcript of the reference clip')
+    sub.add_parser('list', help='show cached voices')
+    args = parser.parse_args(argv)
+
+    cache = VoiceCache(args.cache, args.voices)
+    if args.command == 'list':
+        for name, entry in sorted(cache.voices.items()):
+            print(f'{name:12} {entry["duration"]:6.2f}s {entry["frames"]:5} frames  {entry["key"]}')
+        return 0
+    if args.command == 'add':
+        if not args.wav.is_file():
+            print(f'✗ {args.wav} not found', file=sys.stderr)
+            return 2
+        results = {args.name: cache.add(args.name, args.wav, args.text)}
+    else:
+        results = cache.build(args.names, args.force)
+    failed = 0
+    for name, state in results.items():
+        if state in ('cached', 'touched', 'built', 'removed'):
+            print(f'✓ {name}: {state}')
+        else:
+            failed += 1
+            print(f'✗ {name}: {state}', file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))